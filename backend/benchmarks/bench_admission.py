@@ -0,0 +1,107 @@
+"""
+Benchmark: prediction latency under a dashboard polling surge
+Run from the backend directory: python -m benchmarks.bench_admission
+
+Drives a minimal app in-process over raw ASGI. Bursts of dashboard polls
+(each holding the loop for a little CPU work around an upstream wait)
+arrive together with a stream of prediction requests, once without and
+once with AdmissionMiddleware. Latency is measured from arrival. Reports prediction latency and how many
+polls were shed with 503.
+"""
+
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from services.admission import AdmissionController, AdmissionMiddleware, default_route_classes
+
+DASHBOARD_POLLS = 2000
+POLL_BURST = 20
+ARRIVAL_INTERVAL = 0.005
+PREDICTIONS = 50
+CPU_SECONDS = 0.001
+UPSTREAM_SECONDS = 0.02
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def build_app(admission: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/weather/{lat}/{lon}")
+    async def weather(lat: float, lon: float):
+        busy(CPU_SECONDS)
+        await asyncio.sleep(UPSTREAM_SECONDS)
+        busy(CPU_SECONDS)
+        return {"temperature": 20}
+
+    @app.post("/api/predict/disaster")
+    async def predict():
+        busy(CPU_SECONDS)
+        return {"overall_risk": 0.2}
+
+    if admission:
+        app.add_middleware(AdmissionMiddleware, controller=AdmissionController(default_route_classes()))
+    return app
+
+async def call(app, method: str, path: str) -> int:
+    status = 0
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000)
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+async def timed(app, method: str, path: str, arrived: float):
+    # Latency counts from arrival, including time spent waiting for the loop
+    status = await call(app, method, path)
+    return status, time.perf_counter() - arrived
+
+async def surge(admission: bool):
+    app = build_app(admission)
+    await call(app, "POST", "/api/predict/disaster")  # Warm up
+    polls, predictions = [], []
+    # Polls arrive in bursts of POLL_BURST every ARRIVAL_INTERVAL, a prediction alongside each burst
+    for i in range(DASHBOARD_POLLS // POLL_BURST):
+        now = time.perf_counter()
+        polls.extend(
+            asyncio.create_task(timed(app, "GET", f"/api/weather/{(i * POLL_BURST + j) % 90}/0", now))
+            for j in range(POLL_BURST)
+        )
+        if i % (DASHBOARD_POLLS // POLL_BURST // PREDICTIONS) == 0:
+            predictions.append(asyncio.create_task(timed(app, "POST", "/api/predict/disaster", now)))
+        await asyncio.sleep(ARRIVAL_INTERVAL)
+    poll_results = await asyncio.gather(*polls)
+    prediction_results = await asyncio.gather(*predictions)
+
+    latencies = sorted(elapsed * 1000 for _, elapsed in prediction_results)
+    shed = sum(1 for status, _ in poll_results if status == 503)
+    print(f"{'on' if admission else 'off':<10} {statistics.median(latencies):>9.1f} {latencies[int(len(latencies) * 0.99)]:>9.1f} "
+          f"{sum(1 for s, _ in prediction_results if s == 200):>8}/{len(predictions)} {shed:>8}/{len(polls)}")
+
+async def run():
+    print(f"{'admission':<10} {'p50 ms':>9} {'p99 ms':>9} {'pred ok':>11} {'polls shed':>13}")
+    for admission in (False, True):
+        await surge(admission)
+
+def main():
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
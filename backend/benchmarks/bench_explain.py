@@ -0,0 +1,56 @@
+"""
+Benchmark: tree-path attribution vs plain prediction
+Run from the backend directory: python -m benchmarks.bench_explain
+
+Explain mode must stay within 2x of plain prediction latency.
+"""
+
+import logging
+import time
+import numpy as np
+
+logging.disable(logging.INFO)
+
+from enhanced_main import DisasterPredictionModel, HAZARD_MODELS
+
+BATCH_SIZES = [1, 100, 1000]
+REPEATS = 50
+MAX_RATIO = 2.0
+
+def _best_of(fn, repeats: int) -> float:
+    """Best wall time of repeated calls, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    model = DisasterPredictionModel()
+    model._ensure_trained()
+
+    X, _ = model.generate_synthetic_training_data(max(BATCH_SIZES))
+
+    # Attribution must reproduce the ensembles exactly
+    X_scaled = model.scaler.transform(X)
+    for hazard, attr in HAZARD_MODELS.items():
+        predicted, contributions = model.explainers[hazard].explain(X_scaled)
+        error = np.abs(predicted - getattr(model, attr).predict(X_scaled)).max()
+        print(f"{hazard:<11} max |explain - predict| = {error:.2e}")
+
+    print(f"\n{'rows':>6} {'predict ms':>12} {'explain ms':>12} {'ratio':>7}")
+    failures = 0
+    for n in BATCH_SIZES:
+        rows = X[:n]
+        plain = _best_of(lambda: model.predict_batch(rows), REPEATS)
+        explained = _best_of(lambda: model.predict_batch(rows, explain=True), REPEATS)
+        ratio = explained / plain
+        failures += ratio > MAX_RATIO
+        print(f"{n:>6} {plain:>12.3f} {explained:>12.3f} {ratio:>6.2f}x")
+
+    if failures:
+        raise SystemExit(f"explain exceeded {MAX_RATIO}x plain prediction latency")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: logging cost on the request thread
+Run from the backend directory: python -m benchmarks.bench_logging
+
+Times logger.info() as seen by the caller, the same two INFO records a
+prediction request logs, for the old basicConfig setup (FileHandler +
+StreamHandler, formatted and flushed synchronously) and the queue pipeline
+(filter + enqueue; formatting and writes on the listener thread). Output
+goes to a temporary directory; the stream handler writes to os.devnull so
+terminal speed does not skew the numbers. The "slow" rows add a 200 us
+stall to every stream flush, standing in for a busy disk or a blocked
+stdout pipe.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import statistics
+import tempfile
+import time
+
+from services.log_pipeline import (
+    JSONFormatter, LogContextHook, NonBlockingQueueHandler, RouteLogFilter, TEXT_FORMAT
+)
+
+RECORDS = 20000
+SLOW_FLUSH_SECONDS = 0.0002
+
+class SlowStream:
+    """File-like wrapper whose flush() stalls, like a congested disk or log pipe"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        return self.stream.write(text)
+
+    def flush(self):
+        time.sleep(SLOW_FLUSH_SECONDS)
+        self.stream.flush()
+
+def legacy_handlers(directory: str, devnull):
+    formatter = logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.FileHandler(os.path.join(directory, "legacy.log")), logging.StreamHandler(devnull)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers, None
+
+def pipeline_handlers(directory: str, devnull):
+    formatter = JSONFormatter()
+    handlers = [
+        logging.handlers.RotatingFileHandler(os.path.join(directory, "pipeline.log"), maxBytes=10 * 1024 * 1024, backupCount=2),
+        logging.StreamHandler(devnull)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    queue_handler = NonBlockingQueueHandler(log_queue, max_size=RECORDS)
+    # No sampling or rate limiting, so both setups handle every record
+    queue_handler.addFilter(RouteLogFilter(rate_limit=0, sample_rate=1.0, sample_rates=""))
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    return [queue_handler], listener
+
+def measure(name: str, factory, directory: str, devnull):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handlers, listener = factory(directory, devnull)
+    for handler in handlers:
+        logger.addHandler(handler)
+
+    # Log inside a request context, as the route handlers do
+    scope = {"type": "http", "path": "/predict/disaster-risk", "state": {"request_id": "bench-1"}}
+    context = LogContextHook()
+    token = context.start(scope)
+    timings = []
+    start = time.perf_counter()
+    for i in range(RECORDS // 2):
+        t0 = time.perf_counter()
+        logger.info(f"Predicting disaster risk for location: {40.7 + i * 1e-4}, -74.0")
+        logger.info(f"Disaster risk prediction completed: overall_risk=moderate")
+        timings.append((time.perf_counter() - t0) / 2)
+    caller_total = time.perf_counter() - start
+    context.finish(scope, token, 200)
+
+    if listener is not None:
+        listener.stop()  # Drains the queue
+    drain_total = time.perf_counter() - start
+    for handler in handlers:
+        logger.removeHandler(handler)
+        handler.close()
+
+    timings.sort()
+    print(f"{name:<14} {statistics.mean(timings) * 1e6:>9.1f} {timings[len(timings) // 2] * 1e6:>9.1f} "
+          f"{timings[int(len(timings) * 0.99)] * 1e6:>9.1f} {timings[-1] * 1e6:>9.1f} "
+          f"{caller_total * 1000:>10.0f} {drain_total * 1000:>10.0f}")
+
+def main():
+    print(f"Per-record time on the calling thread, microseconds ({RECORDS} records)")
+    print(f"{'setup':<14} {'mean':>9} {'p50':>9} {'p99':>9} {'max':>9} {'caller ms':>10} {'total ms':>10}")
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        measure("legacy", legacy_handlers, directory, devnull)
+        measure("pipeline", pipeline_handlers, directory, devnull)
+        measure("legacy-slow", legacy_handlers, directory, SlowStream(devnull))
+        measure("pipeline-slow", pipeline_handlers, directory, SlowStream(devnull))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: CORS middleware stack throughput
+Run from the backend directory: python -m benchmarks.bench_middleware
+
+Drives a minimal app in-process over raw ASGI (no sockets, no client
+library), so the numbers are dominated by the middleware stack. Compares the
+old CORSMiddleware + BaseHTTPMiddleware pair with EdgeMiddleware, with and
+without the metrics/timing/request-ID hooks, for a simple GET and a CORS preflight.
+"""
+
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from services.edge import EdgeMiddleware, RequestIdHook, TimingHook
+from services.metrics import MetricsHook
+
+REQUESTS = 5000
+CONCURRENCY = 50
+
+class ForceCORSMiddleware(BaseHTTPMiddleware):
+    """The pre-EdgeMiddleware shim, kept here as the baseline"""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        response.headers["Access-Control-Expose-Headers"] = "*"
+        return response
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    if stack == "legacy":
+        app.add_middleware(
+            CORSMiddleware, allow_origins=["*"], allow_credentials=False,
+            allow_methods=["*"], allow_headers=["*"], expose_headers=["*"]
+        )
+        app.add_middleware(ForceCORSMiddleware)
+    elif stack == "edge":
+        app.add_middleware(EdgeMiddleware)
+    elif stack == "edge+hooks":
+        app.add_middleware(EdgeMiddleware, hooks=[MetricsHook(), RequestIdHook(), TimingHook()])
+    return app
+
+def make_scope(method: str, headers):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": "/api/ping", "raw_path": b"/api/ping",
+        "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000)
+    }
+
+REQUEST_KINDS = {
+    "GET": ("GET", [(b"host", b"localhost"), (b"origin", b"http://localhost:3000")]),
+    "preflight": ("OPTIONS", [
+        (b"host", b"localhost"), (b"origin", b"http://localhost:3000"),
+        (b"access-control-request-method", b"POST"), (b"access-control-request-headers", b"content-type")
+    ])
+}
+
+async def call(app, method: str, headers) -> int:
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(make_scope(method, list(headers)), receive, send)
+    return status
+
+async def throughput(app, method: str, headers) -> float:
+    for _ in range(200):  # Warm up routing and middleware stack construction
+        assert await call(app, method, headers) == 200
+    start = time.perf_counter()
+    for _ in range(REQUESTS // CONCURRENCY):
+        await asyncio.gather(*(call(app, method, headers) for _ in range(CONCURRENCY)))
+    return REQUESTS / (time.perf_counter() - start)
+
+async def run():
+    print(f"{'stack':<12} {'GET req/s':>10} {'preflight req/s':>16}   ({REQUESTS} requests, {CONCURRENCY} concurrent)")
+    baseline = {}
+    for stack in ("legacy", "edge", "edge+hooks"):
+        app = build_app(stack)
+        rates = {kind: await throughput(app, *REQUEST_KINDS[kind]) for kind in REQUEST_KINDS}
+        baseline = baseline or rates
+        print(f"{stack:<12} {rates['GET']:>10.0f} {rates['preflight']:>16.0f}   "
+              f"(x{rates['GET'] / baseline['GET']:.2f} GET, x{rates['preflight'] / baseline['preflight']:.2f} preflight)")
+
+def main():
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
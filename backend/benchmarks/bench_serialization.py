@@ -0,0 +1,82 @@
+"""
+Benchmark: JSON serialization of a 1,000-event earthquake response
+Run from the backend directory: python -m benchmarks.bench_serialization
+
+Compares FastAPI's default path (jsonable_encoder + JSONResponse) with
+FastJSONResponse and with reusing pre-serialized bytes from a SerializedCache,
+on the payload /api/external/earthquakes builds from a USGS GeoJSON feed.
+"""
+
+from datetime import datetime
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from routes.external_apis import _process_usgs_data
+from services.fast_json import FastJSONResponse, SerializedCache, orjson
+
+EVENTS = 1000
+REPEATS = 50
+
+def usgs_feed(n: int) -> dict:
+    """Synthetic USGS GeoJSON feed with n events"""
+    rng = random.Random(42)
+    now_ms = int(datetime.now().timestamp() * 1000)
+    features = []
+    for i in range(n):
+        magnitude = round(2.5 + rng.expovariate(1.2), 1)
+        features.append({
+            "id": f"us7000{i:05d}",
+            "geometry": {"coordinates": [rng.uniform(-180, 180), rng.uniform(-60, 70), rng.uniform(1, 300)]},
+            "properties": {
+                "mag": magnitude, "place": f"{rng.randint(5, 150)}km from Region {i % 50}",
+                "time": now_ms - rng.randint(0, 7 * 86400000), "updated": now_ms,
+                "tz": None, "url": f"https://earthquake.usgs.gov/earthquakes/eventpage/us7000{i:05d}",
+                "detail": f"https://earthquake.usgs.gov/fdsnws/event/1/query?eventid=us7000{i:05d}",
+                "type": "earthquake", "sig": int(magnitude * 100), "alert": None, "tsunami": 0,
+                "felt": rng.randint(0, 200), "cdi": round(rng.uniform(1, 8), 1), "mmi": None, "magType": "ml"
+            }
+        })
+    return {"features": features}
+
+def timed(fn) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    earthquakes = _process_usgs_data(usgs_feed(EVENTS))
+    payload = {
+        "earthquakes": earthquakes,
+        "total_count": len(earthquakes),
+        "source": "USGS",
+        "query_parameters": {"format": "geojson", "minmagnitude": 2.5},
+        "last_updated": datetime.now().isoformat()
+    }
+    cache = SerializedCache(maxsize=16, ttl=300)
+    cache.dumps("earthquakes", payload)
+
+    paths = {
+        "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(payload)),
+        "FastJSONResponse": lambda: FastJSONResponse(payload),
+        "SerializedCache hit": lambda: cache.response("earthquakes", payload)
+    }
+    size = len(FastJSONResponse(payload).body)
+    assert JSONResponse(jsonable_encoder(payload)).body == FastJSONResponse(payload).body or orjson is not None
+
+    print(f"{EVENTS} events, {size / 1024:.0f} KiB, encoder: {'orjson' if orjson else 'stdlib json'} "
+          f"(median of {REPEATS})")
+    baseline = None
+    for name, fn in paths.items():
+        ms = timed(fn)
+        baseline = baseline or ms
+        print(f"  {name:<34} {ms:>8.3f} ms   x{baseline / ms:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark: cold start of the main app
+Run from the backend directory: python -m benchmarks.bench_startup
+
+Each measurement starts a fresh interpreter and reports the time to import
+main, to answer the first /api/health/live request (startup included) and to
+become warm (/api/health/ready == 200), for lazy and eager startup.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPEATS = 3
+
+CHILD = r'''
+import json, logging, time
+start = time.perf_counter()
+logging.disable(logging.CRITICAL)
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    assert client.get("/api/health/live").status_code == 200
+    live = time.perf_counter()
+    while client.get("/api/health/ready").status_code != 200:
+        time.sleep(0.01)
+    ready = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "first_response_s": live - start, "ready_s": ready - start}))
+'''
+
+def measure(eager: bool) -> dict:
+    env = dict(os.environ, EAGER_STARTUP="true" if eager else "false")
+    runs = []
+    for _ in range(REPEATS):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        runs.append(json.loads(output))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+def main():
+    print(f"{'mode':<6} {'import':>9} {'first response':>15} {'ready':>9}   (median of {REPEATS} fresh processes)")
+    for eager in (False, True):
+        result = measure(eager)
+        print(f"{'eager' if eager else 'lazy':<6} {result['import_s']:>8.2f}s {result['first_response_s']:>14.2f}s "
+              f"{result['ready_s']:>8.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,43 @@
 """
 Alert Aid - Production FastAPI Backend
 Real APIs, Live Data, ML Predictions
+
+The app is built by create_app(). Heavy work (model loading, sklearn/pandas
+imports, zone index building) runs in a background warmup after the port is
+bound; /api/health/live and /api/health/ready report liveness and warmth.
 """
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Response
 import uvicorn
 import logging
 import os
-import requests
-import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
-import json
-from typing import Dict, List, Any, Optional
-import asyncio
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import joblib
+from datetime import datetime
+
+from services.log_pipeline import LogContextHook, configure_logging
+
+# Logging goes through the queue pipeline before route modules log at import
+configure_logging()
 
 # Import route modules
-from routes import health, weather, predict, alerts, external_apis
+from routes import health, weather, predict, alerts, external_apis, debug
+from services.admission import AdmissionMiddleware
+from services.deadline import DeadlineMiddleware
+from services.edge import EdgeMiddleware, RequestIdHook, TimingHook
+from services.inference import HEURISTIC_MODEL_VERSION
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsHook, render_metrics
+from services.profiler import ProfilerHook
+from services.rate_limit import RateLimitHook
+from services.tracing import TracingHook
+from services.loop_monitor import loop_monitor
+from services.upstream_health import upstream_prober
+from services.warmup import warmup
 
 # Environment variables
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "demo_key")
 USGS_EARTHQUAKE_URL = "https://earthquake.usgs.gov/fdsnws/event/1/query"
 OPENSTREETMAP_URL = "https://nominatim.openstreetmap.org/reverse"
-
-# Initialize FastAPI app
-app = FastAPI(
-    title="Alert Aid API",
-    description="Real-time disaster management with live APIs and ML predictions",
-    version="2.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
+# Run warmup before serving instead of in the background (slower start, warm first request)
+EAGER_STARTUP = os.getenv("EAGER_STARTUP", "false").lower() in ("1", "true", "yes")
 
 # CORS Configuration - CRITICAL FIX FOR RAILWAY DEPLOYMENT
 # Allow all origins with wildcard for public API access
@@ -43,39 +45,8 @@ app = FastAPI(
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
 allowed_origins = [origin.strip() for origin in CORS_ORIGINS.split(",")] if CORS_ORIGINS != "*" else ["*"]
 
-print(f"🔧 CORS Configuration: allow_origins={allowed_origins}")  # Use print before logger is initialized
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins
-    allow_credentials=False,
-    allow_methods=["*"],  # Allow all methods
-    allow_headers=["*"],  # Allow all headers
-    expose_headers=["*"]
-)
-
-# Add custom middleware to force CORS headers on every response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-
-class ForceCORSMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "*"
-        response.headers["Access-Control-Expose-Headers"] = "*"
-        return response
-
-app.add_middleware(ForceCORSMiddleware)
-
-# Logging setup
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
+logger.info(f"🔧 CORS Configuration: allow_origins={allowed_origins}")
 
 # ML Model initialization
 ml_model = None
@@ -86,30 +57,37 @@ def initialize_ml_model():
     global ml_model, scaler
     
     try:
+        # Deferred imports: sklearn is only needed once the warmup reaches this task
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        
         # Create a simple trained model for demonstration
         # In production, load pre-trained model with joblib.load()
-        ml_model = RandomForestClassifier(n_estimators=100, random_state=42)
-        scaler = StandardScaler()
+        model = RandomForestClassifier(n_estimators=100, random_state=42)
+        model_scaler = StandardScaler()
         
         # Generate synthetic training data for demonstration
-        np.random.seed(42)
+        # (private generator - this runs on the warmup thread, so the global seed is left alone)
+        rng = np.random.RandomState(42)
         n_samples = 1000
         
         # Features: temperature, humidity, wind_speed, pressure, elevation
         X = np.column_stack([
-            np.random.normal(25, 10, n_samples),  # temperature
-            np.random.normal(60, 20, n_samples),  # humidity
-            np.random.normal(10, 5, n_samples),   # wind_speed
-            np.random.normal(1013, 15, n_samples), # pressure
-            np.random.normal(100, 200, n_samples)  # elevation
+            rng.normal(25, 10, n_samples),  # temperature
+            rng.normal(60, 20, n_samples),  # humidity
+            rng.normal(10, 5, n_samples),   # wind_speed
+            rng.normal(1013, 15, n_samples), # pressure
+            rng.normal(100, 200, n_samples)  # elevation
         ])
         
         # Target: risk levels (0=low, 1=moderate, 2=high, 3=critical)
-        y = np.random.choice([0, 1, 2, 3], n_samples, p=[0.4, 0.3, 0.2, 0.1])
+        y = rng.choice([0, 1, 2, 3], n_samples, p=[0.4, 0.3, 0.2, 0.1])
         
         # Train model
-        X_scaled = scaler.fit_transform(X)
-        ml_model.fit(X_scaled, y)
+        X_scaled = model_scaler.fit_transform(X)
+        model.fit(X_scaled, y)
+        ml_model, scaler = model, model_scaler
         
         logger.info("✅ ML Model initialized and trained")
         
@@ -118,68 +96,129 @@ def initialize_ml_model():
         ml_model = None
         scaler = None
 
-# Initialize ML model on startup
-initialize_ml_model()
-
-# CORS middleware already configured above at line 48-72 - don't add duplicate!
-# The app variable is already created at line 31 with CORS enabled
-
-# Register all API routes with proper prefixes
-app.include_router(health.router, prefix="/api", tags=["Health Check"])
-app.include_router(weather.router, prefix="/api", tags=["Weather"])
-app.include_router(predict.router, prefix="/api", tags=["ML Predictions"])
-app.include_router(alerts.router, prefix="/api", tags=["Alerts"])
-app.include_router(external_apis.router, prefix="/api", tags=["External Data"])
-
-# Root endpoint
-@app.get("/")
-async def root():
-    """Root endpoint with API information"""
-    return {
-        "message": "Alert Aid API - Disaster Management System  🚀",
-        "status": "operational",
-        "version": "1.0.2-cors-fixed",  # Updated version to verify deployment
-        "timestamp": datetime.now().isoformat(),
-        "git_commit": "cors-fix-applied",
-        "endpoints": {
-            "health": "/api/health",  # FIXED: Added /api prefix
-            "docs": "/docs",
-            "weather": "/api/weather/{lat}/{lon}",
-            "predict": "/api/predict/disaster-risk",
-            "alerts": "/api/alerts/active?lat={lat}&lon={lon}",
-            "external": "/api/external-data?lat={lat}&lon={lon}"
-        },
-        "cors_enabled": True,
-        "deployment_note": "If you see this version, Railway deployed latest code successfully!"
-    }
-
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the application on startup"""
-    logger.info("🚀 Alert Aid Backend Starting...")
-    logger.info("✅ Server running on http://localhost:8000")
-    logger.info("📊 API documentation: http://localhost:8000/docs")
-    logger.info("🔧 Interactive docs: http://localhost:8000/redoc")
-    logger.info("🌐 CORS enabled for frontend connections")
-    logger.info("🔗 All routes registered and ready")
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Clean up on shutdown"""
-    logger.info("🛑 Alert Aid Backend Shutting Down...")
-
-# Global exception handler
-@app.exception_handler(Exception)
-async def global_exception_handler(request, exc):
-    """Handle unexpected errors gracefully"""
-    logger.error(f"Global exception: {exc}")
-    return {
-        "error": "Internal server error",
-        "detail": "An unexpected error occurred",
-        "timestamp": datetime.now().isoformat()
-    }
+def _import_data_stack():
+    """Import pandas/sklearn ahead of first use so no request pays for it"""
+    import pandas  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+
+def _build_zone_index():
+    from services.zones import get_zone_registry
+    get_zone_registry().contains(0.0, 0.0)
+
+# Deferred startup work, in order: the serving models first
+warmup.register("inference_models", predict.inference_service.load)
+warmup.register("zone_index", _build_zone_index)
+warmup.register("data_stack", _import_data_stack)
+warmup.register("legacy_ml_model", initialize_ml_model)
+
+def create_app() -> FastAPI:
+    """Build the API application; heavy initialization is left to the warmup"""
+    app = FastAPI(
+        title="Alert Aid API",
+        description="Real-time disaster management with live APIs and ML predictions",
+        version="2.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc"
+    )
+
+    # Per-route-class concurrency limits with priority queueing; sheds with 503 + Retry-After
+    app.add_middleware(AdmissionMiddleware)
+    # Request deadlines from X-Request-Timeout or the route default; upstream timeouts come out of
+    # what is left, and a request that runs out before responding is cancelled with 504
+    app.add_middleware(DeadlineMiddleware)
+    # CORS (precomputed headers, preflight answered before routing) plus metrics, timing, request IDs
+    # and per-client rate limits. Added last so it wraps admission control: shed and rate-limited
+    # responses still get CORS, metrics and request IDs, and limited clients never take a slot
+    app.add_middleware(EdgeMiddleware, hooks=[MetricsHook(), RequestIdHook(), TimingHook(), LogContextHook(), TracingHook(), ProfilerHook(), RateLimitHook()])
+    # Tag for profiles: the model version serving predictions right now
+    app.state.model_version = lambda: predict.inference_service.model_version or HEURISTIC_MODEL_VERSION
+
+    # Register all API routes with proper prefixes
+    app.include_router(health.router, prefix="/api", tags=["Health Check"])
+    app.include_router(weather.router, prefix="/api", tags=["Weather"])
+    app.include_router(predict.router, prefix="/api", tags=["ML Predictions"])
+    app.include_router(alerts.router, prefix="/api", tags=["Alerts"])
+    app.include_router(external_apis.router, prefix="/api", tags=["External Data"])
+    app.include_router(debug.router, prefix="/api", tags=["Debug"])
+
+    # Prometheus metrics (unprefixed, where scrapers look by default)
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+    # Root endpoint
+    @app.get("/")
+    async def root():
+        """Root endpoint with API information"""
+        return {
+            "message": "Alert Aid API - Disaster Management System  🚀",
+            "status": "operational",
+            "version": "1.0.2-cors-fixed",  # Updated version to verify deployment
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": "cors-fix-applied",
+            "endpoints": {
+                "health": "/api/health",  # FIXED: Added /api prefix
+                "docs": "/docs",
+                "weather": "/api/weather/{lat}/{lon}",
+                "predict": "/api/predict/disaster-risk",
+                "alerts": "/api/alerts/active?lat={lat}&lon={lon}",
+                "external": "/api/external-data?lat={lat}&lon={lon}"
+            },
+            "cors_enabled": True,
+            "deployment_note": "If you see this version, Railway deployed latest code successfully!"
+        }
+
+    # Startup event
+    @app.on_event("startup")
+    async def startup_event():
+        """Initialize the application on startup"""
+        logger.info("🚀 Alert Aid Backend Starting...")
+        logger.info("✅ Server running on http://localhost:8000")
+        logger.info("📊 API documentation: http://localhost:8000/docs")
+        logger.info("🔧 Interactive docs: http://localhost:8000/redoc")
+        logger.info("🌐 CORS enabled for frontend connections")
+        logger.info("🔗 All routes registered and ready")
+        
+        # uvicorn.run() sets up its own log handlers after import; route them through the queue again
+        configure_logging()
+        
+        # Record event-loop lag (and blocking stacks with LOOP_BLOCK_DEBUG=true)
+        loop_monitor.start()
+        
+        # /api/external/status is served from these background probes
+        upstream_prober.start()
+        # The global natural-disasters summary is rebuilt on its own thread, never per request
+        external_apis.natural_disasters.start()
+        
+        # Models and heavy imports load after the port is bound; heuristics serve until then
+        if EAGER_STARTUP:
+            warmup.run()
+        else:
+            warmup.start()
+
+    # Shutdown event
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Clean up on shutdown"""
+        logger.info("🛑 Alert Aid Backend Shutting Down...")
+        await loop_monitor.stop()
+        upstream_prober.stop()
+        external_apis.natural_disasters.stop()
+
+    # Global exception handler
+    @app.exception_handler(Exception)
+    async def global_exception_handler(request, exc):
+        """Handle unexpected errors gracefully"""
+        logger.error(f"Global exception: {exc}")
+        return {
+            "error": "Internal server error",
+            "detail": "An unexpected error occurred",
+            "timestamp": datetime.now().isoformat()
+        }
+
+    return app
+
+app = create_app()
 
 # Main entry point
 if __name__ == "__main__":
@@ -191,4 +230,4 @@ if __name__ == "__main__":
         reload=True,
         log_level="info",
         access_log=True
-    )
\ No newline at end of file
+    )
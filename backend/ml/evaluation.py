@@ -0,0 +1,127 @@
+"""
+Model Evaluation
+Single-pass regression and high-risk classification metrics with bootstrap confidence intervals
+
+All metrics are computed along the last axis, so one call scores either a
+single test set (1D) or a whole stack of bootstrap resamples (2D) at once.
+"""
+
+from typing import Any, Dict
+import numpy as np
+
+# Risk scores above this count as "high risk" for the classification metrics
+HIGH_RISK_THRESHOLD = 5.0
+METRIC_NAMES = ['mse', 'mae', 'r2', 'accuracy', 'precision', 'recall', 'f1_score']
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Elementwise division returning 0 where the denominator is 0 (sklearn's zero_division=0)"""
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator != 0)
+
+def compute_metrics(y_true: np.ndarray, y_pred: np.ndarray, threshold: float = HIGH_RISK_THRESHOLD) -> Dict[str, np.ndarray]:
+    """All regression and classification metrics in one vectorized pass over the last axis"""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    n = y_true.shape[-1]
+
+    residual = y_true - y_pred
+    sq_error = np.einsum('...i,...i->...', residual, residual)
+    centered = y_true - y_true.mean(axis=-1, keepdims=True)
+    total_var = np.einsum('...i,...i->...', centered, centered)
+
+    true_high = y_true > threshold
+    pred_high = y_pred > threshold
+    tp = np.count_nonzero(true_high & pred_high, axis=-1).astype(np.float64)
+    pred_pos = np.count_nonzero(pred_high, axis=-1).astype(np.float64)
+    true_pos = np.count_nonzero(true_high, axis=-1).astype(np.float64)
+    correct = np.count_nonzero(true_high == pred_high, axis=-1).astype(np.float64)
+
+    precision = _safe_divide(tp, pred_pos)
+    recall = _safe_divide(tp, true_pos)
+
+    return {
+        'mse': sq_error / n,
+        'mae': np.abs(residual).sum(axis=-1) / n,
+        'r2': 1 - _safe_divide(sq_error, total_var),
+        'accuracy': correct / n,
+        'precision': precision,
+        'recall': recall,
+        'f1_score': _safe_divide(2 * tp, pred_pos + true_pos)
+    }
+
+def evaluate_predictions(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    """Metrics for a single test set as plain floats"""
+    return {name: float(value) for name, value in compute_metrics(y_true, y_pred).items()}
+
+def bootstrap_metrics(
+    y_true: Dict[str, np.ndarray],
+    y_pred: Dict[str, np.ndarray],
+    n_bootstrap: int = 1000,
+    batch_size: int = 200,
+    seed: int = 42
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Bootstrap distributions of every metric for every hazard
+    Each batch draws a (batch_size, n) resampling index matrix shared by all
+    hazards, so cross-hazard averages can be bootstrapped from the same draws.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(next(iter(y_true.values())))
+    samples = {hazard: {name: [] for name in METRIC_NAMES} for hazard in y_true}
+
+    for start in range(0, n_bootstrap, batch_size):
+        indices = rng.integers(0, n, size=(min(batch_size, n_bootstrap - start), n))
+        for hazard in y_true:
+            metrics = compute_metrics(y_true[hazard][indices], y_pred[hazard][indices])
+            for name, values in metrics.items():
+                samples[hazard][name].append(values)
+
+    return {
+        hazard: {name: np.concatenate(chunks) for name, chunks in metrics.items()}
+        for hazard, metrics in samples.items()
+    }
+
+def _interval(values: np.ndarray, confidence: float) -> Dict[str, float]:
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(values, [tail, 100 - tail])
+    return {'lower': round(float(lower), 4), 'upper': round(float(upper), 4)}
+
+def summarize_performance(performance: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """Cross-hazard averages of the classification metrics (no interval without bootstrap draws)"""
+    summary = {
+        name: round(float(np.mean([m[name] for m in performance.values()])), 3)
+        for name in ('accuracy', 'precision', 'recall', 'f1_score')
+    }
+    summary['confidence_interval'] = {}
+    return summary
+
+def evaluate_models(
+    y_true: Dict[str, np.ndarray],
+    y_pred: Dict[str, np.ndarray],
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    Full evaluation report for the hazard models, ready to persist in metadata.json
+    Returns per-hazard point metrics, per-hazard confidence intervals and a
+    cross-hazard summary whose interval comes from the shared bootstrap draws.
+    """
+    performance = {hazard: evaluate_predictions(y_true[hazard], y_pred[hazard]) for hazard in y_true}
+    boot = bootstrap_metrics(y_true, y_pred, n_bootstrap=n_bootstrap, seed=seed)
+
+    intervals = {
+        hazard: {name: _interval(values, confidence) for name, values in metrics.items()}
+        for hazard, metrics in boot.items()
+    }
+
+    summary = summarize_performance(performance)
+    mean_accuracy = np.mean([metrics['accuracy'] for metrics in boot.values()], axis=0)
+    summary['confidence_interval'] = _interval(mean_accuracy, confidence)
+    summary['confidence_level'] = confidence
+    summary['bootstrap_samples'] = n_bootstrap
+
+    return {
+        'model_performance': performance,
+        'confidence_intervals': intervals,
+        'performance_summary': summary
+    }
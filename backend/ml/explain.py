@@ -0,0 +1,143 @@
+"""
+Tree-Path Risk Attribution
+Per-feature contribution vectors for the tree ensembles in enhanced_main.py
+
+Every split on a decision path moves the node value from parent to child;
+crediting that delta to the split feature decomposes a prediction into
+bias + sum(contributions). The deltas are summed along each root-to-leaf
+path once at load time, so explaining a row is a leaf lookup plus one
+array gather per tree.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Rows per gather chunk - bounds the (rows, trees, features) temporary
+EXPLAIN_CHUNK_ROWS = 512
+# Below this a single (rows, trees, features) gather beats a sparse product
+SMALL_BATCH_ROWS = 16
+
+def _path_contributions(tree) -> Tuple[np.ndarray, float]:
+    """Summed root-to-node contribution vector for every node of a fitted tree"""
+    t = tree.tree_
+    n_nodes = t.node_count
+    values = t.value.reshape(n_nodes, -1)[:, 0]
+
+    path = np.zeros((n_nodes, t.n_features), dtype=np.float64)
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        left, right = t.children_left[node], t.children_right[node]
+        if left == -1:
+            continue
+        feature = t.feature[node]
+        for child in (left, right):
+            path[child] = path[node]
+            path[child, feature] += values[child] - values[node]
+            stack.append(child)
+
+    return path, float(values[0])
+
+class TreePathExplainer:
+    """Attribution for a fitted RandomForestRegressor or GradientBoostingRegressor"""
+
+    def __init__(self, model):
+        trees = [est for est in np.ravel(model.estimators_)]
+
+        # Gradient boosting sums shrunken trees on top of the init estimator,
+        # forests average their trees
+        if hasattr(model, 'learning_rate'):
+            scale = float(model.learning_rate)
+            init = getattr(model.init_, 'constant_', 0.0)
+            self.bias = float(np.ravel(init)[0])
+        else:
+            scale = 1.0 / len(trees)
+            self.bias = 0.0
+
+        # Flatten every tree into one node table so all trees are walked together.
+        # Leaves point at themselves and compare against +inf, so extra steps are no-ops.
+        features, thresholds, lefts, rights, leaf_rows, contribs = [], [], [], [], [], []
+        roots = []
+        node_offset = 0
+        leaf_offset = 0
+        depth = 0
+        for tree in trees:
+            t = tree.tree_
+            n_nodes = t.node_count
+            ids = np.arange(n_nodes)
+            is_leaf = t.children_left == -1
+
+            path, root_value = _path_contributions(tree)
+            self.bias += root_value * scale
+
+            roots.append(node_offset)
+            features.append(np.where(is_leaf, 0, t.feature))
+            thresholds.append(np.where(is_leaf, np.inf, t.threshold))
+            lefts.append(np.where(is_leaf, ids, t.children_left) + node_offset)
+            rights.append(np.where(is_leaf, ids, t.children_right) + node_offset)
+
+            leaves = np.flatnonzero(is_leaf)
+            rows = np.full(n_nodes, -1, dtype=np.intp)
+            rows[leaves] = np.arange(len(leaves)) + leaf_offset
+            leaf_rows.append(rows)
+            contribs.append(path[leaves] * scale)
+
+            node_offset += n_nodes
+            leaf_offset += len(leaves)
+            depth = max(depth, t.max_depth)
+
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.features = np.concatenate(features).astype(np.intp)
+        self.thresholds = np.concatenate(thresholds)
+        # children[2 * node + went_left] -> next node
+        self.children = np.stack([np.concatenate(rights), np.concatenate(lefts)], axis=1).ravel().astype(np.intp)
+        self.leaf_rows = np.concatenate(leaf_rows)
+        self.leaf_contribs = np.concatenate(contribs)
+        self.depth = depth
+        self.n_features = self.leaf_contribs.shape[1]
+
+    def leaves(self, features_scaled: np.ndarray) -> np.ndarray:
+        """Global leaf row reached in every tree, shape (rows, trees)"""
+        # sklearn trees split on float32 inputs
+        X = np.asarray(features_scaled, dtype=np.float32).astype(np.float64)
+        flat = X.ravel()
+        row_base = (np.arange(len(X)) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.depth):
+            went_left = flat.take(row_base + self.features.take(node)) <= self.thresholds.take(node)
+            node = self.children.take(node * 2 + went_left)
+        return self.leaf_rows.take(node)
+
+    def explain(self, features_scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (predictions, contributions) for a 2D array of scaled rows
+        predictions[i] == bias + contributions[i].sum()
+        """
+        features_scaled = np.atleast_2d(features_scaled)
+        contributions = np.zeros((len(features_scaled), self.n_features))
+        for start in range(0, len(features_scaled), EXPLAIN_CHUNK_ROWS):
+            chunk = features_scaled[start:start + EXPLAIN_CHUNK_ROWS]
+            leaves = self.leaves(chunk)
+            out = contributions[start:start + len(chunk)]
+            if len(chunk) <= SMALL_BATCH_ROWS:
+                # One gather across all trees
+                out += self.leaf_contribs[leaves].sum(axis=1)
+            else:
+                # Sum over trees as a (rows x leaves) one-hot product
+                n_rows, n_trees = leaves.shape
+                indicator = csr_matrix(
+                    (np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, n_trees)),
+                    shape=(n_rows, len(self.leaf_contribs))
+                )
+                out += indicator @ self.leaf_contribs
+        return self.bias + contributions.sum(axis=1), contributions
+
+def top_drivers(contributions: np.ndarray, feature_names: List[str], limit: int = 3) -> List[Tuple[str, float]]:
+    """Features with the largest positive contribution to a single prediction"""
+    order = np.argsort(contributions)[::-1][:limit]
+    return [(feature_names[i], float(contributions[i])) for i in order if contributions[i] > 0]
+
+def contributions_to_dict(contributions: np.ndarray, feature_names: List[str]) -> Dict[str, float]:
+    """Round a single contribution vector into a feature -> value mapping"""
+    return {name: round(float(value), 3) for name, value in zip(feature_names, contributions)}
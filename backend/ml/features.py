@@ -0,0 +1,49 @@
+"""
+Model Features
+Feature layout shared by the hazard models, their training and every serving path
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+import numpy as np
+
+FEATURE_NAMES = [
+    'latitude', 'longitude', 'elevation', 'distance_to_coast', 'population_density',
+    'temperature', 'humidity', 'pressure', 'wind_speed',
+    'precipitation', 'vegetation_index', 'soil_moisture', 'temperature_change', 'seasonal_factor'
+]
+
+# Values used when a serving request does not provide a feature
+FEATURE_DEFAULTS = {
+    'elevation': 200,  # Default elevation
+    'distance_to_coast': 50,  # Default distance
+    'population_density': 100,  # Default density
+    'temperature': 20,  # Default temperature
+    'humidity': 60,  # Default humidity
+    'pressure': 1013,  # Default pressure
+    'wind_speed': 5,  # Default wind speed
+    'precipitation': 5.0,  # Training mean, not available from current weather
+    'vegetation_index': 0.5,  # No land cover source yet
+    'temperature_change': 0.0  # 24h temperature change
+}
+
+def feature_matrix(columns: Dict[str, Any], day_of_year: Optional[int] = None) -> np.ndarray:
+    """
+    Model input rows (FEATURE_NAMES order) from scalar or array feature columns
+    latitude and longitude are required; other features fall back to
+    FEATURE_DEFAULTS, soil moisture to the humidity proxy used in training and
+    the seasonal factor to today's date.
+    """
+    n = len(np.atleast_1d(columns['latitude']))
+    day_of_year = day_of_year or datetime.now().timetuple().tm_yday
+
+    values = dict(FEATURE_DEFAULTS)
+    values.update({k: v for k, v in columns.items() if v is not None})
+    humidity = np.asarray(values['humidity'], dtype=np.float64)
+    values.setdefault('soil_moisture', np.clip(humidity / 100, 0.0, 1.0))  # Soil moisture proxy, as in training data
+    values.setdefault('seasonal_factor', np.sin(2 * np.pi * day_of_year / 365))
+
+    X = np.empty((n, len(FEATURE_NAMES)), dtype=np.float64)
+    for j, name in enumerate(FEATURE_NAMES):
+        X[:, j] = values[name]
+    return X
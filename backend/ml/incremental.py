@@ -0,0 +1,87 @@
+"""
+Incremental Retraining
+Warm-start tree appending for the hazard ensembles, gated on a fixed holdout set
+
+New trees are fitted on the new observations only (boosting continues from the
+current predictions, forests grow extra members), so the cost scales with the
+size of the new batch rather than the full training corpus. A candidate is
+promoted only if its holdout metrics stay within tolerance of the live model.
+"""
+
+from typing import Any, Dict
+import copy
+import logging
+import time
+import numpy as np
+
+from ml.evaluation import evaluate_predictions
+
+logger = logging.getLogger(__name__)
+
+# Trees appended per incremental update
+DEFAULT_NEW_TREES = 20
+# Largest holdout accuracy / r2 drop still accepted for promotion
+DEFAULT_TOLERANCE = 0.01
+# Boosting needs a few rows per leaf to fit residuals meaningfully
+MIN_NEW_SAMPLES = 20
+
+def warm_start_update(model, X_new: np.ndarray, y_new: np.ndarray, n_new_trees: int = DEFAULT_NEW_TREES):
+    """Copy of a fitted forest/boosting model with n_new_trees fitted on the new data appended"""
+    candidate = copy.deepcopy(model)
+    candidate.set_params(warm_start=True, n_estimators=len(candidate.estimators_) + n_new_trees)
+    candidate.fit(X_new, y_new)
+    # Later full refits must start from scratch
+    candidate.set_params(warm_start=False)
+    return candidate
+
+def incremental_update(
+    models: Dict[str, Any],
+    X_new: np.ndarray,
+    y_new: Dict[str, np.ndarray],
+    X_holdout: np.ndarray,
+    y_holdout: Dict[str, np.ndarray],
+    n_new_trees: int = DEFAULT_NEW_TREES,
+    tolerance: float = DEFAULT_TOLERANCE
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Warm-start every hazard model that has enough new labels and validate it
+    Inputs are already scaled. Returns {hazard: report} where promoted reports
+    carry the new model under 'model'; live models are never modified.
+    """
+    reports = {}
+    for hazard, model in models.items():
+        labels = y_new.get(hazard)
+        if labels is None:
+            continue
+        labels = np.asarray(labels, dtype=np.float64)
+        mask = ~np.isnan(labels)
+        if mask.sum() < MIN_NEW_SAMPLES:
+            reports[hazard] = {'promoted': False, 'reason': f'fewer than {MIN_NEW_SAMPLES} labelled samples'}
+            continue
+
+        start = time.perf_counter()
+        candidate = warm_start_update(model, X_new[mask], labels[mask], n_new_trees)
+        fit_seconds = time.perf_counter() - start
+
+        before = evaluate_predictions(y_holdout[hazard], model.predict(X_holdout))
+        after = evaluate_predictions(y_holdout[hazard], candidate.predict(X_holdout))
+        promoted = (
+            after['accuracy'] >= before['accuracy'] - tolerance and
+            after['r2'] >= before['r2'] - tolerance
+        )
+
+        reports[hazard] = {
+            'promoted': promoted,
+            'reason': 'holdout metrics held' if promoted else 'holdout metrics regressed',
+            'samples': int(mask.sum()),
+            'trees': len(candidate.estimators_),
+            'fit_seconds': round(fit_seconds, 3),
+            'holdout_before': {k: round(before[k], 4) for k in ('accuracy', 'r2', 'mae')},
+            'holdout_after': {k: round(after[k], 4) for k in ('accuracy', 'r2', 'mae')}
+        }
+        if promoted:
+            reports[hazard]['model'] = candidate
+        logger.info(f"Incremental {hazard} update: {reports[hazard]['reason']} "
+                    f"(accuracy {before['accuracy']:.4f} -> {after['accuracy']:.4f})")
+
+    return reports
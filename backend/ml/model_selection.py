@@ -0,0 +1,214 @@
+"""
+Latency-Aware Model Selection
+Grid search over ensemble configurations that weighs serving cost against accuracy
+
+Candidates are fitted in parallel (cheapest first) under a wall-clock budget,
+then benchmarked for single-row and batch inference latency. The most accurate
+candidate whose single-row p99 meets the latency SLA is selected per hazard,
+and the accuracy/latency Pareto frontier is kept for metadata.json.
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+import multiprocessing
+import time
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from ml.evaluation import evaluate_predictions
+
+logger = logging.getLogger(__name__)
+
+ESTIMATORS = {
+    'gradient_boosting': GradientBoostingRegressor,
+    'random_forest': RandomForestRegressor
+}
+
+# Production configuration per hazard
+DEFAULT_MODEL_CONFIGS = {
+    # Flood: Increased estimators, depth, added learning rate tuning
+    'flood': {'estimator': 'gradient_boosting', 'params': {
+        'n_estimators': 150, 'max_depth': 8, 'learning_rate': 0.1,
+        'min_samples_split': 5, 'min_samples_leaf': 2, 'subsample': 0.9, 'random_state': 42
+    }},
+    # Fire: Enhanced RandomForest with more trees and better depth
+    'fire': {'estimator': 'random_forest', 'params': {
+        'n_estimators': 150, 'max_depth': 10, 'min_samples_split': 4,
+        'min_samples_leaf': 2, 'max_features': 'sqrt', 'random_state': 42
+    }},
+    # Earthquake: Enhanced GradientBoosting with better parameters
+    'earthquake': {'estimator': 'gradient_boosting', 'params': {
+        'n_estimators': 120, 'max_depth': 7, 'learning_rate': 0.08,
+        'min_samples_split': 5, 'subsample': 0.85, 'random_state': 42
+    }},
+    # Storm: Enhanced RandomForest with optimized parameters
+    'storm': {'estimator': 'random_forest', 'params': {
+        'n_estimators': 180, 'max_depth': 10, 'min_samples_split': 4,
+        'min_samples_leaf': 2, 'max_features': 'sqrt', 'random_state': 42
+    }}
+}
+
+# Multipliers applied to the production configuration to build the search grid
+ESTIMATOR_SCALES = [0.33, 0.67, 1.0]
+DEPTH_OFFSETS = [-2, 0]
+
+# Latency benchmark settings
+SINGLE_ROW_REPEATS = 200
+BATCH_ROWS = 1000
+BATCH_REPEATS = 10
+
+def build_model(config: Dict[str, Any]):
+    """Instantiate an unfitted estimator from a {'estimator', 'params'} config"""
+    return ESTIMATORS[config['estimator']](**config['params'])
+
+def candidate_grid(hazard: str) -> List[Dict[str, Any]]:
+    """Candidate configurations around the production configuration for a hazard"""
+    base = DEFAULT_MODEL_CONFIGS[hazard]
+    candidates = []
+    for scale in ESTIMATOR_SCALES:
+        for offset in DEPTH_OFFSETS:
+            params = dict(base['params'])
+            params['n_estimators'] = max(10, int(round(base['params']['n_estimators'] * scale)))
+            params['max_depth'] = max(2, base['params']['max_depth'] + offset)
+            candidates.append({'estimator': base['estimator'], 'params': params})
+    return candidates
+
+def _cost(config: Dict[str, Any]) -> float:
+    """Rough relative fit cost used to schedule cheap candidates first"""
+    params = config['params']
+    return params['n_estimators'] * 2 ** params['max_depth']
+
+def measure_latency(model, X: np.ndarray) -> Dict[str, float]:
+    """Single-row p50/p99 and per-batch p99 inference latency in milliseconds"""
+    row = X[:1]
+    single = np.empty(SINGLE_ROW_REPEATS)
+    for i in range(SINGLE_ROW_REPEATS):
+        start = time.perf_counter()
+        model.predict(row)
+        single[i] = time.perf_counter() - start
+
+    batch_rows = X[:BATCH_ROWS]
+    batch = np.empty(BATCH_REPEATS)
+    for i in range(BATCH_REPEATS):
+        start = time.perf_counter()
+        model.predict(batch_rows)
+        batch[i] = time.perf_counter() - start
+
+    return {
+        'single_p50_ms': round(float(np.percentile(single, 50)) * 1000, 3),
+        'single_p99_ms': round(float(np.percentile(single, 99)) * 1000, 3),
+        'batch_p99_ms': round(float(np.percentile(batch, 99)) * 1000, 3),
+        'batch_rows': len(batch_rows)
+    }
+
+def pareto_frontier(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Candidates not beaten on both accuracy and single-row p99 latency"""
+    ordered = sorted(results, key=lambda r: (r['latency']['single_p99_ms'], -r['metrics']['accuracy']))
+    frontier = []
+    best_accuracy = -np.inf
+    for result in ordered:
+        if result['metrics']['accuracy'] > best_accuracy:
+            frontier.append(result)
+            best_accuracy = result['metrics']['accuracy']
+    return frontier
+
+def _fit_candidate(hazard: str, config: Dict[str, Any], X_train, y_train, X_test, y_test) -> Dict[str, Any]:
+    start = time.perf_counter()
+    model = build_model(config)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    return {
+        'hazard': hazard,
+        'config': config,
+        'model': model,
+        'fit_seconds': round(fit_seconds, 2),
+        'metrics': evaluate_predictions(y_test, model.predict(X_test))
+    }
+
+def select_models(
+    X_train: np.ndarray,
+    y_train: Dict[str, np.ndarray],
+    X_test: np.ndarray,
+    y_test: Dict[str, np.ndarray],
+    latency_sla_ms: float = 20.0,
+    time_budget_s: float = 600.0,
+    n_jobs: int = 4,
+    grids: Optional[Dict[str, List[Dict[str, Any]]]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Search candidate configurations for every hazard and pick one per hazard
+    Returns {hazard: {'model', 'selected', 'frontier', 'evaluated', 'meets_sla'}}
+    """
+    grids = grids or {hazard: candidate_grid(hazard) for hazard in y_train}
+    jobs = sorted(
+        ((hazard, config) for hazard, configs in grids.items() for config in configs),
+        key=lambda job: _cost(job[1])
+    )
+
+    # Fit in worker processes (tree fitting holds the GIL between stages);
+    # when the budget runs out, unfinished candidates are terminated
+    deadline = time.monotonic() + time_budget_s
+    pool = multiprocessing.get_context('spawn').Pool(processes=n_jobs)
+    pending = []
+    try:
+        for hazard, config in jobs:
+            args = (hazard, config, X_train, y_train[hazard], X_test, y_test[hazard])
+            pending.append((hazard, config, pool.apply_async(_fit_candidate, args)))
+        for _, _, async_result in pending:
+            async_result.wait(max(0.0, deadline - time.monotonic()))
+    finally:
+        finished = [(hazard, config, r) for hazard, config, r in pending if r.ready()]
+        pool.terminate()
+    if len(finished) < len(jobs):
+        logger.warning(f"Model search budget of {time_budget_s}s reached - {len(jobs) - len(finished)} candidates skipped")
+
+    fitted = {hazard: [] for hazard in grids}
+    failed = {hazard: 0 for hazard in grids}
+    for hazard, config, async_result in finished:
+        try:
+            fitted[hazard].append(async_result.get())
+        except Exception as e:
+            failed[hazard] += 1
+            logger.error(f"{hazard} candidate {config['params']} failed: {e!r}")
+
+    selection = {}
+    for hazard, results in fitted.items():
+        if failed[hazard] == len(grids[hazard]):
+            # Not a slow search but a broken one (e.g. workers that cannot start); don't hide it behind a fallback
+            raise RuntimeError(f"All {failed[hazard]} {hazard} candidates failed - see the errors above")
+        if not results:
+            # Nothing finished in time - fall back to the cheapest candidate
+            cheapest = min(grids[hazard], key=_cost)
+            logger.warning(f"No {hazard} candidate finished within budget - fitting cheapest configuration")
+            results = [_fit_candidate(hazard, cheapest, X_train, y_train[hazard], X_test, y_test[hazard])]
+
+        # Benchmark serially so candidates do not compete for CPU
+        for result in results:
+            result['latency'] = measure_latency(result['model'], X_test)
+
+        within_sla = [r for r in results if r['latency']['single_p99_ms'] <= latency_sla_ms]
+        if within_sla:
+            chosen = max(within_sla, key=lambda r: (r['metrics']['accuracy'], r['metrics']['r2']))
+        else:
+            chosen = min(results, key=lambda r: r['latency']['single_p99_ms'])
+            logger.warning(f"No {hazard} candidate meets the {latency_sla_ms}ms p99 SLA - using the fastest")
+
+        selection[hazard] = {
+            'model': chosen['model'],
+            'selected': _summarize(chosen),
+            'frontier': [_summarize(r) for r in pareto_frontier(results)],
+            'evaluated': len(results),
+            'meets_sla': bool(within_sla)
+        }
+
+    return selection
+
+def _summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-serializable view of a candidate result"""
+    return {
+        'config': result['config'],
+        'accuracy': round(result['metrics']['accuracy'], 4),
+        'r2': round(result['metrics']['r2'], 4),
+        'fit_seconds': result['fit_seconds'],
+        **result['latency']
+    }
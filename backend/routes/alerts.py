@@ -9,6 +9,9 @@ import random
 import math
 from typing import Dict, List, Any, Optional
 
+from services.fast_json import FastJSONResponse
+from services.zones import get_zone_registry
+
 router = APIRouter()
 
 # In-memory alert storage (in production, use database)
@@ -34,11 +37,11 @@ async def get_all_alerts(active_only: bool = False, severity: Optional[str] = No
                 if alert["severity"].lower() == severity.lower()
             ]
         
-        return {
+        return FastJSONResponse({
             "alerts": filtered_alerts,
             "total_count": len(filtered_alerts),
             "last_updated": datetime.now().isoformat()
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Alerts retrieval error: {str(e)}")
@@ -169,12 +172,12 @@ async def get_location_alerts(lat: float, lon: float, radius_km: float = 50):
         generated_alerts = _generate_location_alerts(lat, lon)
         location_alerts.extend(generated_alerts)
         
-        return {
+        return FastJSONResponse({
             "alerts": location_alerts,
             "location": {"latitude": lat, "longitude": lon, "radius_km": radius_km},
             "total_count": len(location_alerts),
             "last_updated": datetime.now().isoformat()
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Location alerts error: {str(e)}")
@@ -276,19 +279,7 @@ def _generate_location_alerts(lat: float, lon: float) -> List[Dict]:
 
 def _is_seismic_zone(lat: float, lon: float) -> bool:
     """Check if location is in a known seismic zone"""
-    seismic_zones = [
-        {"lat_range": (32, 42), "lon_range": (-125, -114)},  # California
-        {"lat_range": (35, 45), "lon_range": (135, 145)},    # Japan
-        {"lat_range": (-45, -35), "lon_range": (165, 180)},  # New Zealand
-        {"lat_range": (36, 42), "lon_range": (25, 35)},      # Turkey/Greece
-    ]
-    
-    for zone in seismic_zones:
-        if (zone["lat_range"][0] <= lat <= zone["lat_range"][1] and 
-            zone["lon_range"][0] <= lon <= zone["lon_range"][1]):
-            return True
-    
-    return False
+    return bool(get_zone_registry().contains(lat, lon, category='seismic')[0])
 
 @router.post("/alerts/emergency")
 async def create_emergency_alert(emergency_data: Dict[str, Any]):
@@ -0,0 +1,86 @@
+"""
+Debug Routes
+Admin-only operational endpoints (sampling profiler, request traces)
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from services.admin import require_admin
+from services.fast_json import FastJSONResponse
+from services.profiler import MAX_PROFILE_SECONDS, profiler
+from services.tracing import recent_traces, tracer
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/debug/profile")
+async def run_profile(
+    request: Request,
+    seconds: float = 10.0,
+    route: Optional[str] = None,
+    fraction: float = 1.0,
+    format: str = "collapsed"
+):
+    """
+    Sample all thread stacks for `seconds` and return the aggregated profile
+    With `route` (a path prefix such as /predict/disaster-risk) and/or
+    `fraction` < 1, only that share of matching requests is sampled on the event
+    loop. format=collapsed returns flamegraph.pl / speedscope input;
+    format=json returns the stacks with session details.
+    """
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'json'")
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS:.0f}]")
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    model_version = getattr(request.app.state, "model_version", None)
+    session = await profiler.run(
+        seconds, route=route, fraction=fraction,
+        model_version=str(model_version() if callable(model_version) else model_version or "unknown")
+    )
+
+    if format == "json":
+        return FastJSONResponse(session.summary())
+    return PlainTextResponse(session.collapsed(), headers={
+        "X-Profile-Samples": str(session.samples),
+        "X-Profile-Requests": str(session.requests_profiled)
+    })
+
+@router.get("/debug/traces")
+async def list_traces(limit: int = 50, route: Optional[str] = None, min_ms: float = 0.0, errors: bool = False):
+    """
+    Recently finished sampled traces, newest first
+    Filter by route template prefix, minimum duration or traces with an error span.
+    """
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+
+    traces = []
+    for trace in reversed(recent_traces.traces):
+        summary = trace.summary()
+        if route and not (summary["route"] or "").startswith(route):
+            continue
+        if (summary["duration_ms"] or 0) < min_ms or (errors and not summary["error"]):
+            continue
+        traces.append(summary)
+        if len(traces) >= limit:
+            break
+    return FastJSONResponse({
+        "sample_rate": tracer.sample_rate,
+        "sampled_total": tracer.sampled,
+        "buffered": len(recent_traces.traces),
+        "traces": traces
+    })
+
+@router.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str, format: str = "json"):
+    """One trace with all its spans; format=zipkin returns Zipkin v2 JSON"""
+    if format not in ("json", "zipkin"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'zipkin'")
+    trace = recent_traces.find(trace_id.lower())
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found (expired or not sampled)")
+    return FastJSONResponse(trace.to_zipkin() if format == "zipkin" else trace.to_dict())
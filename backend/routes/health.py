@@ -4,10 +4,32 @@ Simple health monitoring endpoints
 """
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
+import platform
+
+from services.admission import admission_controller
+from services.inference import inference_service
+from services.loop_monitor import loop_monitor
+from services.metrics import process_stats
+from services.warmup import warmup
 
 router = APIRouter()
 
+@router.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests (models may still be warming)"""
+    return {"status": "live", "timestamp": datetime.now().isoformat()}
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the background warmup has finished, 503 while it is running"""
+    status = warmup.status()
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content={"status": "warm" if status["ready"] else "warming", "timestamp": datetime.now().isoformat(), **status}
+    )
+
 @router.get("/health")
 async def health_check():
     """Comprehensive health check endpoint"""
@@ -27,20 +49,24 @@ async def health_check():
 
 @router.get("/health/detailed")
 async def detailed_health_check():
-    """Detailed health check with service diagnostics"""
+    """Detailed health check with service diagnostics (full counters at /metrics)"""
+    stats = process_stats()
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "services": {
             "fastapi": {"status": "operational", "version": "0.104.1"},
-            "ml_models": {"status": "ready", "models_loaded": 4},
+            "ml_models": {"status": inference_service.state, "models_loaded": len(inference_service.models)},
             "weather_api": {"status": "configured", "provider": "OpenWeatherMap"},
             "alerts_api": {"status": "configured", "provider": "NOAA"},
             "earthquake_api": {"status": "configured", "provider": "USGS"}
         },
         "system": {
-            "python_version": "3.x",
-            "memory_usage": "normal",
-            "disk_space": "sufficient"
+            "python_version": platform.python_version(),
+            "resident_memory_bytes": stats.get(("resident_memory_bytes",)),
+            "uptime_seconds": round(stats[("uptime_seconds",)], 1),
+            "event_loop": loop_monitor.status(),
+            "admission": admission_controller.status(),
+            "metrics": "/metrics"
         }
     }
\ No newline at end of file
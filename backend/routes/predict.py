@@ -3,391 +3,251 @@ Prediction API Routes
 Handles disaster prediction using enhanced ML models
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+import json
 import random
-import math
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from services.hazard_engine import InputHashNoise
+from services.inference import inference_service
+from services.metadata_service import CachedResource
+from services.response_cache import DETERMINISTIC_PREDICTIONS, ResponseCache, current_bucket, request_key
+from services.risk_grid import GRID_BASE_CONDITIONS, risk_grid
 
 router = APIRouter()
 
+# Defaults for missing prediction inputs
+INPUT_DEFAULTS = {
+    "temperature": 20,
+    "humidity": 50,
+    "wind_speed": 5,
+    "pressure": 1013,
+    "latitude": 0,
+    "longitude": 0
+}
+MAX_BATCH_LOCATIONS = 10000
+
+METADATA_PATH = Path(__file__).parent.parent / "models" / "metadata.json"
+
+# Serialized responses per time bucket (grids are large, so they get a smaller cache)
+prediction_cache = ResponseCache("prediction", maxsize=1024)
+grid_cache = ResponseCache("risk_grid", maxsize=64)
+
 @router.post("/predict/disaster")
-async def predict_disaster(data: Dict[str, Any]):
+async def predict_disaster(data: Dict[str, Any], request: Request):
     """
     Enhanced disaster prediction using multiple factors
     Accepts: temperature, humidity, wind_speed, pressure, location data
     """
     try:
-        # Extract prediction inputs
-        temperature = data.get("temperature", 20)
-        humidity = data.get("humidity", 50)
-        wind_speed = data.get("wind_speed", 5)
-        pressure = data.get("pressure", 1013)
-        latitude = data.get("latitude", 0)
-        longitude = data.get("longitude", 0)
-        
-        # Enhanced prediction algorithm
-        predictions = _enhanced_disaster_prediction(
-            temperature, humidity, wind_speed, pressure, latitude, longitude
-        )
-        
-        return {
-            "predictions": predictions,
-            "confidence_level": _calculate_overall_confidence(predictions),
-            "prediction_time": datetime.now().isoformat(),
-            "model_version": "v2.1_enhanced",
-            "input_data": {
-                "temperature": temperature,
-                "humidity": humidity,
-                "wind_speed": wind_speed,
-                "pressure": pressure,
-                "coordinates": [latitude, longitude]
-            }
-        }
+        bucket = current_bucket()
+        key = ("disaster", request_key(data), inference_service.generation)
+        return await prediction_cache.respond(request, key, lambda: _disaster_prediction(data, bucket), bucket)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction service error: {str(e)}")
 
-def _enhanced_disaster_prediction(temp: float, humidity: float, wind: float, pressure: float, lat: float, lon: float) -> List[Dict]:
-    """Enhanced ML-style disaster prediction algorithm"""
-    
-    predictions = []
-    
-    # Wildfire prediction (enhanced)
-    wildfire_risk = _calculate_wildfire_risk(temp, humidity, wind, lat)
-    if wildfire_risk > 0.1:
-        predictions.append({
-            "type": "wildfire",
-            "probability": round(wildfire_risk, 3),
-            "severity": _get_severity_level(wildfire_risk),
-            "time_window": "24-72 hours",
-            "factors": _get_wildfire_factors(temp, humidity, wind),
-            "recommended_actions": _get_wildfire_actions(wildfire_risk)
-        })
-    
-    # Flood prediction (enhanced)
-    flood_risk = _calculate_flood_risk(humidity, pressure, temp, lat)
-    if flood_risk > 0.1:
-        predictions.append({
-            "type": "flood",
-            "probability": round(flood_risk, 3),
-            "severity": _get_severity_level(flood_risk),
-            "time_window": "6-48 hours",
-            "factors": _get_flood_factors(humidity, pressure, temp),
-            "recommended_actions": _get_flood_actions(flood_risk)
-        })
-    
-    # Severe weather prediction
-    storm_risk = _calculate_storm_risk(wind, pressure, humidity, temp)
-    if storm_risk > 0.15:
-        predictions.append({
-            "type": "severe_weather",
-            "probability": round(storm_risk, 3),
-            "severity": _get_severity_level(storm_risk),
-            "time_window": "3-24 hours",
-            "factors": _get_storm_factors(wind, pressure, humidity),
-            "recommended_actions": _get_storm_actions(storm_risk)
-        })
-    
-    # Earthquake prediction (geological)
-    earthquake_risk = _calculate_earthquake_risk(lat, lon)
-    if earthquake_risk > 0.05:
-        predictions.append({
-            "type": "earthquake",
-            "probability": round(earthquake_risk, 3),
-            "severity": _get_severity_level(earthquake_risk),
-            "time_window": "geological timescale",
-            "factors": ["tectonic_activity", "geological_history", "seismic_patterns"],
-            "recommended_actions": _get_earthquake_actions(earthquake_risk)
-        })
-    
-    # If no high risks, provide low-risk status
-    if not predictions:
-        predictions.append({
-            "type": "low_risk",
-            "probability": 0.05,
-            "severity": "minimal",
-            "time_window": "current",
-            "factors": ["stable_conditions"],
-            "recommended_actions": ["maintain_normal_vigilance", "monitor_weather_updates"]
-        })
-    
-    return predictions
-
-def _calculate_wildfire_risk(temp: float, humidity: float, wind: float, lat: float) -> float:
-    """Calculate wildfire risk using enhanced factors"""
-    
-    # Base risk from temperature (higher temp = higher risk)
-    temp_factor = max(0, (temp - 20) / 30)  # Normalized 20-50°C range
-    
-    # Humidity factor (lower humidity = higher risk)
-    humidity_factor = max(0, (70 - humidity) / 70)  # Inverted humidity
-    
-    # Wind factor (higher wind = higher risk)
-    wind_factor = min(1, wind / 25)  # Normalized wind speed
-    
-    # Latitude factor (certain latitudes more prone)
-    lat_factor = 1.0
-    if 30 <= abs(lat) <= 50:  # Fire-prone latitudes
-        lat_factor = 1.3
-    elif abs(lat) < 10:  # Tropical areas
-        lat_factor = 0.7
-    
-    # Seasonal factor
-    month = datetime.now().month
-    seasonal_factor = 1.0
-    if month in [6, 7, 8, 9]:  # Fire season
-        seasonal_factor = 1.4
-    elif month in [12, 1, 2]:  # Winter
-        seasonal_factor = 0.6
-    
-    # Combined risk calculation
-    base_risk = (temp_factor * 0.3 + humidity_factor * 0.4 + wind_factor * 0.3)
-    final_risk = base_risk * lat_factor * seasonal_factor
-    
-    # Add some randomness for realism
-    final_risk += random.uniform(-0.1, 0.1)
-    
-    return max(0, min(1, final_risk))
-
-def _calculate_flood_risk(humidity: float, pressure: float, temp: float, lat: float) -> float:
-    """Calculate flood risk using meteorological factors"""
-    
-    # High humidity increases flood risk
-    humidity_factor = min(1, (humidity - 50) / 40)  # Normalized 50-90% range
-    
-    # Low pressure indicates storm systems
-    pressure_factor = max(0, (1020 - pressure) / 20)
-    
-    # Temperature differential can cause severe weather
-    temp_factor = 0.3 if 5 <= temp <= 35 else 0.1
-    
-    # Coastal and low-lying areas
-    coastal_factor = 1.2 if abs(lat) < 45 else 1.0
-    
-    # Seasonal factor
-    month = datetime.now().month
-    seasonal_factor = 1.3 if month in [5, 6, 7, 8, 9, 10] else 0.8
-    
-    base_risk = (humidity_factor * 0.4 + pressure_factor * 0.4 + temp_factor * 0.2)
-    final_risk = base_risk * coastal_factor * seasonal_factor
-    
-    # Add randomness
-    final_risk += random.uniform(-0.08, 0.08)
-    
-    return max(0, min(1, final_risk))
+def _jitter_source(conditions: Dict[str, Any], bucket: int) -> Optional[InputHashNoise]:
+    """Input-derived jitter in deterministic mode, random jitter otherwise"""
+    return InputHashNoise(conditions, bucket) if DETERMINISTIC_PREDICTIONS else None
+
+async def _disaster_prediction(data: Dict[str, Any], bucket: int) -> Dict[str, Any]:
+    """Prediction for one location from the trained models, or the heuristics as fallback"""
+    # Extract prediction inputs
+    conditions = {key: data.get(key, default) for key, default in INPUT_DEFAULTS.items()}
+    
+    assessment, inference = await inference_service.assess(
+        conditions, heuristic_kwargs={"rng": _jitter_source(conditions, bucket)}
+    )
+    
+    return {
+        "predictions": assessment.predictions(0),
+        "confidence_level": str(assessment.confidence[0]),
+        "prediction_time": datetime.now().isoformat(),
+        "model_version": inference["model_version"],
+        "inference": inference,
+        "input_data": {
+            "temperature": conditions["temperature"],
+            "humidity": conditions["humidity"],
+            "wind_speed": conditions["wind_speed"],
+            "pressure": conditions["pressure"],
+            "coordinates": [conditions["latitude"], conditions["longitude"]]
+        }
+    }
 
-def _calculate_storm_risk(wind: float, pressure: float, humidity: float, temp: float) -> float:
-    """Calculate severe weather/storm risk"""
-    
-    # High wind speeds
-    wind_factor = min(1, wind / 30)
-    
-    # Low pressure systems
-    pressure_factor = max(0, (1020 - pressure) / 25)
-    
-    # High humidity for storm formation
-    humidity_factor = min(1, (humidity - 60) / 30)
-    
-    # Temperature instability
-    temp_factor = 0.4 if 15 <= temp <= 40 else 0.2
-    
-    base_risk = (wind_factor * 0.35 + pressure_factor * 0.35 + humidity_factor * 0.2 + temp_factor * 0.1)
-    
-    # Add randomness
-    base_risk += random.uniform(-0.1, 0.1)
-    
-    return max(0, min(1, base_risk))
+@router.post("/predict/disaster/batch")
+async def predict_disaster_batch(data: Dict[str, Any], request: Request):
+    """
+    Disaster prediction for many locations in one vectorized pass
+    Accepts: {"locations": [{temperature, humidity, wind_speed, pressure, latitude, longitude}, ...]}
+    """
+    locations = data.get("locations")
+    if not isinstance(locations, list) or not locations:
+        raise HTTPException(status_code=400, detail="'locations' must be a non-empty list")
+    if len(locations) > MAX_BATCH_LOCATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_LOCATIONS} locations per batch")
 
-def _calculate_earthquake_risk(lat: float, lon: float) -> float:
-    """Calculate earthquake risk based on geological factors"""
-    
-    # Known high-risk zones (simplified)
-    risk_zones = [
-        {"lat_range": (32, 42), "lon_range": (-125, -114), "risk": 0.4},  # California
-        {"lat_range": (35, 45), "lon_range": (135, 145), "risk": 0.5},    # Japan
-        {"lat_range": (-45, -35), "lon_range": (165, 180), "risk": 0.3},  # New Zealand
-        {"lat_range": (36, 42), "lon_range": (25, 35), "risk": 0.25},     # Turkey/Greece
+    try:
+        bucket = current_bucket()
+        key = ("disaster-batch", request_key(locations), inference_service.generation)
+        return await prediction_cache.respond(request, key, lambda: _batch_prediction(locations, bucket), bucket)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction service error: {str(e)}")
+
+async def _batch_prediction(locations: List[Dict[str, Any]], bucket: int) -> Dict[str, Any]:
+    """Predictions for many locations in one vectorized pass (trained models or heuristics)"""
+    conditions = {
+        key: [location.get(key, default) for location in locations]
+        for key, default in INPUT_DEFAULTS.items()
+    }
+    assessment, inference = await inference_service.assess(
+        conditions, heuristic_kwargs={"rng": _jitter_source(conditions, bucket)}
+    )
+    
+    results = [
+        {
+            "coordinates": [conditions["latitude"][i], conditions["longitude"][i]],
+            "predictions": assessment.predictions(i),
+            "confidence_level": str(assessment.confidence[i])
+        }
+        for i in range(assessment.size)
     ]
     
-    base_risk = 0.02  # Global baseline
-    
-    for zone in risk_zones:
-        if (zone["lat_range"][0] <= lat <= zone["lat_range"][1] and 
-            zone["lon_range"][0] <= lon <= zone["lon_range"][1]):
-            base_risk = max(base_risk, zone["risk"])
-    
-    # Add distance decay from fault lines (simplified)
-    fault_distance_factor = random.uniform(0.7, 1.3)
-    
-    final_risk = base_risk * fault_distance_factor
-    
-    # Add geological randomness
-    final_risk += random.uniform(-0.02, 0.02)
-    
-    return max(0, min(1, final_risk))
+    return {
+        "results": results,
+        "count": len(results),
+        "prediction_time": datetime.now().isoformat(),
+        "model_version": inference["model_version"],
+        "inference": inference
+    }
 
-def _get_severity_level(probability: float) -> str:
-    """Convert probability to severity level"""
-    if probability >= 0.7:
-        return "critical"
-    elif probability >= 0.5:
-        return "high"
-    elif probability >= 0.3:
-        return "moderate"
-    elif probability >= 0.1:
-        return "low"
-    else:
-        return "minimal"
-
-def _calculate_overall_confidence(predictions: List[Dict]) -> str:
-    """Calculate overall confidence in predictions"""
-    if not predictions:
-        return "low"
-    
-    max_prob = max(pred["probability"] for pred in predictions)
-    
-    if max_prob >= 0.6:
-        return "high"
-    elif max_prob >= 0.3:
-        return "medium"
-    else:
-        return "low"
-
-def _get_wildfire_factors(temp: float, humidity: float, wind: float) -> List[str]:
-    """Get contributing factors for wildfire risk"""
-    factors = []
-    if temp > 30:
-        factors.append("high_temperature")
-    if humidity < 30:
-        factors.append("low_humidity")
-    if wind > 15:
-        factors.append("strong_winds")
-    if not factors:
-        factors.append("moderate_conditions")
-    return factors
-
-def _get_flood_factors(humidity: float, pressure: float, temp: float) -> List[str]:
-    """Get contributing factors for flood risk"""
-    factors = []
-    if humidity > 80:
-        factors.append("high_humidity")
-    if pressure < 1005:
-        factors.append("low_pressure_system")
-    if temp > 25:
-        factors.append("thunderstorm_conditions")
-    if not factors:
-        factors.append("stable_conditions")
-    return factors
-
-def _get_storm_factors(wind: float, pressure: float, humidity: float) -> List[str]:
-    """Get contributing factors for storm risk"""
-    factors = []
-    if wind > 20:
-        factors.append("high_winds")
-    if pressure < 1010:
-        factors.append("pressure_drop")
-    if humidity > 75:
-        factors.append("moisture_buildup")
-    if not factors:
-        factors.append("calm_conditions")
-    return factors
-
-def _get_wildfire_actions(risk: float) -> List[str]:
-    """Get recommended actions for wildfire risk"""
-    if risk >= 0.6:
-        return ["evacuate_high_risk_areas", "emergency_services_alert", "fire_suppression_ready"]
-    elif risk >= 0.3:
-        return ["increase_fire_watch", "prepare_evacuation_routes", "limit_outdoor_activities"]
-    else:
-        return ["monitor_conditions", "maintain_fire_safety_measures"]
-
-def _get_flood_actions(risk: float) -> List[str]:
-    """Get recommended actions for flood risk"""
-    if risk >= 0.6:
-        return ["evacuate_flood_zones", "sandbag_operations", "emergency_shelters_open"]
-    elif risk >= 0.3:
-        return ["flood_watch_active", "secure_loose_items", "avoid_low_areas"]
-    else:
-        return ["monitor_water_levels", "check_drainage_systems"]
-
-def _get_storm_actions(risk: float) -> List[str]:
-    """Get recommended actions for storm risk"""
-    if risk >= 0.6:
-        return ["severe_weather_warning", "seek_indoor_shelter", "avoid_travel"]
-    elif risk >= 0.3:
-        return ["weather_watch", "secure_outdoor_items", "monitor_updates"]
-    else:
-        return ["normal_weather_precautions", "stay_informed"]
-
-def _get_earthquake_actions(risk: float) -> List[str]:
-    """Get recommended actions for earthquake risk"""
-    if risk >= 0.4:
-        return ["earthquake_preparedness_high", "secure_heavy_objects", "review_evacuation_plans"]
-    elif risk >= 0.2:
-        return ["earthquake_awareness", "emergency_kit_ready", "building_inspections"]
-    else:
-        return ["basic_earthquake_preparedness", "know_safety_procedures"]
+@router.get("/predict/inference/status")
+async def get_inference_status():
+    """Which inference path is serving predictions, and how often each path was used"""
+    return inference_service.status()
 
 @router.get("/predict/ml-metrics")
-async def get_ml_metrics():
+async def get_ml_metrics(request: Request):
     """Get ML model performance metrics from metadata.json"""
     try:
-        import json
-        from pathlib import Path
-        
-        metadata_path = Path(__file__).parent.parent / "models" / "metadata.json"
-        
-        if metadata_path.exists():
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-                
-            if 'model_performance' in metadata:
-                return {
-                    "success": True,
-                    "metrics": metadata['model_performance'],
-                    "model_version": metadata.get('model_version', 'unknown'),
-                    "last_trained": metadata.get('last_trained', 'unknown')
-                }
-        
-        # Fallback metrics if file doesn't exist
-        return {
-            "success": False,
-            "metrics": {
-                "flood": {"accuracy": 0.977, "precision": 0.858, "recall": 0.781, "f1_score": 0.818},
-                "fire": {"accuracy": 0.970, "precision": 0.739, "recall": 0.492, "f1_score": 0.591},
-                "earthquake": {"accuracy": 0.999, "precision": 0.0, "recall": 0.0, "f1_score": 0.0},
-                "storm": {"accuracy": 0.977, "precision": 0.860, "recall": 0.565, "f1_score": 0.682}
-            },
-            "model_version": "2.1.0",
-            "last_trained": "unknown"
-        }
+        return ml_metrics_resource.respond(request)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching ML metrics: {str(e)}")
 
+def _ml_metrics() -> Dict[str, Any]:
+    """ML metrics payload, read from metadata.json only when the file changes"""
+    if METADATA_PATH.exists():
+        with open(METADATA_PATH, 'r') as f:
+            metadata = json.load(f)
+            
+        if 'model_performance' in metadata:
+            return {
+                "success": True,
+                "metrics": metadata['model_performance'],
+                "model_version": metadata.get('model_version', 'unknown'),
+                "last_trained": metadata.get('last_trained', 'unknown')
+            }
+    
+    # Fallback metrics if file doesn't exist
+    return {
+        "success": False,
+        "metrics": {
+            "flood": {"accuracy": 0.977, "precision": 0.858, "recall": 0.781, "f1_score": 0.818},
+            "fire": {"accuracy": 0.970, "precision": 0.739, "recall": 0.492, "f1_score": 0.591},
+            "earthquake": {"accuracy": 0.999, "precision": 0.0, "recall": 0.0, "f1_score": 0.0},
+            "storm": {"accuracy": 0.977, "precision": 0.860, "recall": 0.565, "f1_score": 0.682}
+        },
+        "model_version": "2.1.0",
+        "last_trained": "unknown"
+    }
+
+ml_metrics_resource = CachedResource(_ml_metrics, watch_path=METADATA_PATH)
+
 @router.get("/predict/risk-assessment/{lat}/{lon}")
-async def get_risk_assessment(lat: float, lon: float):
+async def get_risk_assessment(lat: float, lon: float, request: Request):
     """Get comprehensive risk assessment for a location"""
     try:
-        # Default environmental conditions for assessment
-        base_conditions = {
-            "temperature": 22 + random.uniform(-5, 8),
-            "humidity": 55 + random.uniform(-15, 25),
-            "wind_speed": 8 + random.uniform(-3, 12),
-            "pressure": 1013 + random.uniform(-10, 10),
-            "latitude": lat,
-            "longitude": lon
-        }
-        
-        prediction_result = await predict_disaster(base_conditions)
+        bucket = current_bucket()
+        key = ("risk-assessment", lat, lon, inference_service.generation)
+        return await prediction_cache.respond(request, key, lambda: _risk_assessment(lat, lon, bucket), bucket)
         
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Risk assessment error: {str(e)}")
+
+async def _risk_assessment(lat: float, lon: float, bucket: int) -> Dict[str, Any]:
+    """Assessment under varied default conditions, derived from the location in deterministic mode"""
+    if DETERMINISTIC_PREDICTIONS:
+        noise = InputHashNoise({"latitude": lat, "longitude": lon}, bucket)
+        uniform = lambda low, high: float(noise.uniform(low, high, 1)[0])
+    else:
+        uniform = random.uniform
+    
+    # Default environmental conditions for assessment
+    base_conditions = {
+        "temperature": 22 + uniform(-5, 8),
+        "humidity": 55 + uniform(-15, 25),
+        "wind_speed": 8 + uniform(-3, 12),
+        "pressure": 1013 + uniform(-10, 10),
+        "latitude": lat,
+        "longitude": lon
+    }
+    
+    prediction_result = await _disaster_prediction(base_conditions, bucket)
+    
+    return {
+        "location": {"latitude": lat, "longitude": lon},
+        "risk_assessment": prediction_result,
+        "assessment_time": datetime.now().isoformat(),
+        "assessment_type": "location_based"
+    }
+
+@router.get("/predict/risk-grid")
+async def get_risk_grid(
+    request: Request,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    resolution: float = 0.1,
+    encoding: str = "uint8",
+    temperature: float = GRID_BASE_CONDITIONS["temperature"],
+    humidity: float = GRID_BASE_CONDITIONS["humidity"],
+    wind_speed: float = GRID_BASE_CONDITIONS["wind_speed"],
+    pressure: float = GRID_BASE_CONDITIONS["pressure"]
+):
+    """
+    Dense per-hazard risk raster over a bounding box
+    Each hazard's grid is base64-encoded (rows south to north, columns west to
+    east); multiply decoded values by `scale` to get probabilities.
+    """
+    conditions = {
+        "temperature": temperature,
+        "humidity": humidity,
+        "wind_speed": wind_speed,
+        "pressure": pressure
+    }
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    bucket = current_bucket()
+
+    def compute() -> Dict[str, Any]:
+        grid = risk_grid(*bbox, resolution, conditions, encoding, bucket)
         return {
-            "location": {"latitude": lat, "longitude": lon},
-            "risk_assessment": prediction_result,
-            "assessment_time": datetime.now().isoformat(),
-            "assessment_type": "location_based"
+            **grid,
+            "conditions": conditions,
+            "prediction_time": datetime.now().isoformat(),
+            "model_version": "v2.1_enhanced"
         }
-        
+
+    try:
+        key = ("risk-grid", bbox, resolution, encoding, tuple(conditions.values()))
+        # Tile scoring is CPU-bound; keep it off the event loop
+        return await grid_cache.respond(request, key, lambda: run_in_threadpool(compute), bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Risk assessment error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Risk grid error: {str(e)}")
@@ -7,20 +7,49 @@ from fastapi import APIRouter, HTTPException
 import requests
 from datetime import datetime, timedelta
 import os
+import logging
 import random
 from dotenv import load_dotenv
 
+from services.fast_json import FastJSONResponse
+from services.circuit_breaker import CircuitOpen, circuit_breakers
+from services.deadline import DeadlineExceeded, upstream_timeout
+from services.metrics import UpstreamCall
+from services.quota import CellCache, QuotaExhausted, owm_quota
+from services.upstream_health import upstream_prober
+
 # Load environment variables
 load_dotenv()
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Configuration - Load from environment
 WEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "1801423b3942e324ab80f5b47afe0859")
 OPENWEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
 ONECALL_API_URL = "https://api.openweathermap.org/data/3.0/onecall"
+owm_breaker = circuit_breakers["openweathermap"]
+# Each probe spends a call from the API quota, so this is kept slow
+OWM_PROBE_INTERVAL = float(os.getenv("UPSTREAM_PROBE_OWM_INTERVAL", "300"))
+# OpenWeatherMap results by grid cell; cells grow and entries live longer as the quota runs low
+weather_cache = CellCache("owm_weather", owm_quota)
+forecast_cache = CellCache("owm_forecast", owm_quota)
+air_quality_cache = CellCache("owm_air_quality", owm_quota)
+
+logger.info(f"🔑 Weather API Key loaded: {'✅ Real key' if WEATHER_API_KEY != 'demo_key' else '❌ Demo key'}")
+
+def _check_openweathermap(timeout: float) -> int:
+    """Background health probe: current weather at one fixed point"""
+    response = requests.get(
+        f"{OPENWEATHER_BASE_URL}/weather", params={"lat": 0, "lon": 0, "appid": WEATHER_API_KEY}, timeout=timeout
+    )
+    return response.status_code
 
-print(f"🔑 Weather API Key loaded: {'✅ Real key' if WEATHER_API_KEY != 'demo_key' else '❌ Demo key'}")
+if WEATHER_API_KEY != "demo_key":
+    # Probes only use quota above the reserve, which stays for user requests
+    upstream_prober.register(
+        "weather_service", "openweathermap", _check_openweathermap, OWM_PROBE_INTERVAL, budget=owm_quota.spend_spare
+    )
 
 @router.get("/weather/{lat}/{lon}")
 async def get_weather_data(lat: float, lon: float):
@@ -30,6 +59,10 @@ async def get_weather_data(lat: float, lon: float):
     """
     try:
         if WEATHER_API_KEY != "demo_key":
+            cached, cell = weather_cache.get(lat, lon)
+            if cached is not None:
+                return cached
+            
             # Use real OpenWeatherMap API
             url = f"{OPENWEATHER_BASE_URL}/weather"
             params = {
@@ -39,11 +72,14 @@ async def get_weather_data(lat: float, lon: float):
                 "units": "metric"
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            timeout = upstream_timeout()
+            with UpstreamCall("openweathermap", breaker=owm_breaker, quota=owm_quota, demand_key=cell) as call:
+                response = requests.get(url, params=params, timeout=timeout)
+                call.status = response.status_code
             
             if response.status_code == 200:
                 data = response.json()
-                return {
+                weather = {
                     "temperature": data["main"]["temp"],
                     "conditions": data["weather"][0]["description"].title(),
                     "humidity": data["main"]["humidity"],
@@ -53,6 +89,8 @@ async def get_weather_data(lat: float, lon: float):
                     "last_updated": datetime.now().isoformat(),
                     "source": "OpenWeatherMap"
                 }
+                weather_cache.put(lat, lon, weather)
+                return weather
             else:
                 raise requests.RequestException(f"API returned {response.status_code}")
         
@@ -60,8 +98,11 @@ async def get_weather_data(lat: float, lon: float):
             # Generate realistic fallback weather data
             return _generate_realistic_weather(lat, lon)
             
-    except requests.RequestException as e:
-        print(f"Weather API error: {e}")
+    except (CircuitOpen, QuotaExhausted):
+        # OpenWeatherMap is failing or out of budget; don't wait on it
+        return _generate_realistic_weather(lat, lon)
+    except (requests.RequestException, DeadlineExceeded) as e:
+        logger.warning(f"Weather API error: {e}")
         return _generate_realistic_weather(lat, lon)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Weather service error: {str(e)}")
@@ -131,59 +172,74 @@ async def get_weather_forecast(lat: float, lon: float, days: int = 7):
     """
     try:
         if WEATHER_API_KEY and WEATHER_API_KEY != "demo_key":
-            # Try One Call API 3.0 for 7-day forecast
-            url = ONECALL_API_URL
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "appid": WEATHER_API_KEY,
-                "units": "metric",
-                "exclude": "current,minutely,hourly,alerts"  # Only get daily forecast
-            }
-            
-            print(f"🌐 Requesting 7-day forecast from OpenWeatherMap: {lat}, {lon}")
-            response = requests.get(url, params=params, timeout=10)
+            # All days are cached; `days` only trims the response
+            cached, cell = forecast_cache.get(lat, lon)
+            if cached is None:
+                cached = _fetch_forecast(lat, lon, cell)
+                forecast_cache.put(lat, lon, cached)
             
-            if response.status_code == 200:
-                data = response.json()
-                forecast = []
-                
-                # Parse daily forecast (up to 7 days)
-                for day_data in data.get("daily", [])[:days]:
-                    forecast.append({
-                        "date": datetime.fromtimestamp(day_data["dt"]).strftime("%Y-%m-%d"),
-                        "day": datetime.fromtimestamp(day_data["dt"]).strftime("%a"),
-                        "temperature": round(day_data["temp"]["day"], 1),
-                        "temp_min": round(day_data["temp"]["min"], 1),
-                        "temp_max": round(day_data["temp"]["max"], 1),
-                        "feels_like": round(day_data["feels_like"]["day"], 1),
-                        "conditions": day_data["weather"][0]["description"].title(),
-                        "humidity": day_data["humidity"],
-                        "wind_speed": round(day_data["wind_speed"], 1),
-                        "pressure": day_data["pressure"],
-                        "precipitation": round(day_data.get("rain", 0) + day_data.get("snow", 0), 1),
-                        "uvi": round(day_data.get("uvi", 0), 1),
-                        "risk_score": _calculate_daily_risk(day_data)
-                    })
-                
-                print(f"✅ 7-day forecast retrieved successfully from OpenWeatherMap")
-                return {
-                    "forecast": forecast,
-                    "location": {"latitude": lat, "longitude": lon},
-                    "last_updated": datetime.now().isoformat(),
-                    "source": "OpenWeatherMap One Call API 3.0",
-                    "is_real": True
-                }
-            else:
-                print(f"⚠️ One Call API failed with status {response.status_code}, using fallback")
-                raise requests.RequestException(f"API returned {response.status_code}")
+            return FastJSONResponse({
+                "forecast": cached["forecast"][:days],
+                "location": {"latitude": lat, "longitude": lon},
+                "last_updated": cached["last_updated"],
+                "source": "OpenWeatherMap One Call API 3.0",
+                "is_real": True
+            })
         else:
             raise requests.RequestException("No API key available")
             
+    except (CircuitOpen, QuotaExhausted):
+        return FastJSONResponse(_generate_fallback_forecast(lat, lon, days))
     except Exception as e:
-        print(f"❌ Forecast API error: {e}, generating fallback data")
+        logger.warning(f"❌ Forecast API error: {e}, generating fallback data")
         # Generate realistic fallback forecast
-        return _generate_fallback_forecast(lat, lon, days)
+        return FastJSONResponse(_generate_fallback_forecast(lat, lon, days))
+
+def _fetch_forecast(lat: float, lon: float, cell) -> dict:
+    """Daily forecast from the One Call API 3.0, charged to `cell`'s quota demand"""
+    # Try One Call API 3.0 for 7-day forecast
+    url = ONECALL_API_URL
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "appid": WEATHER_API_KEY,
+        "units": "metric",
+        "exclude": "current,minutely,hourly,alerts"  # Only get daily forecast
+    }
+    
+    logger.debug(f"🌐 Requesting 7-day forecast from OpenWeatherMap: {lat}, {lon}")
+    timeout = upstream_timeout()
+    with UpstreamCall("openweathermap", breaker=owm_breaker, quota=owm_quota, demand_key=cell) as call:
+        response = requests.get(url, params=params, timeout=timeout)
+        call.status = response.status_code
+    
+    if response.status_code != 200:
+        logger.warning(f"⚠️ One Call API failed with status {response.status_code}, using fallback")
+        raise requests.RequestException(f"API returned {response.status_code}")
+    
+    data = response.json()
+    forecast = []
+    
+    # Parse every daily entry (the API returns up to 8)
+    for day_data in data.get("daily", []):
+        forecast.append({
+            "date": datetime.fromtimestamp(day_data["dt"]).strftime("%Y-%m-%d"),
+            "day": datetime.fromtimestamp(day_data["dt"]).strftime("%a"),
+            "temperature": round(day_data["temp"]["day"], 1),
+            "temp_min": round(day_data["temp"]["min"], 1),
+            "temp_max": round(day_data["temp"]["max"], 1),
+            "feels_like": round(day_data["feels_like"]["day"], 1),
+            "conditions": day_data["weather"][0]["description"].title(),
+            "humidity": day_data["humidity"],
+            "wind_speed": round(day_data["wind_speed"], 1),
+            "pressure": day_data["pressure"],
+            "precipitation": round(day_data.get("rain", 0) + day_data.get("snow", 0), 1),
+            "uvi": round(day_data.get("uvi", 0), 1),
+            "risk_score": _calculate_daily_risk(day_data)
+        })
+    
+    logger.debug("✅ 7-day forecast retrieved successfully from OpenWeatherMap")
+    return {"forecast": forecast, "last_updated": datetime.now().isoformat()}
 
 def _calculate_daily_risk(day_data: dict) -> float:
     """Calculate risk score for a day based on weather conditions"""
@@ -266,6 +322,11 @@ async def get_air_quality(lat: float, lon: float):
     """
     try:
         if WEATHER_API_KEY != "demo_key":
+            cached, cell = air_quality_cache.get(lat, lon)
+            if cached is not None:
+                # The cell's reading, labelled with the location asked for
+                return {**cached, "location": {"latitude": lat, "longitude": lon}}
+            
             # Use real OpenWeatherMap Air Pollution API
             url = f"http://api.openweathermap.org/data/2.5/air_pollution"
             params = {
@@ -274,7 +335,10 @@ async def get_air_quality(lat: float, lon: float):
                 "appid": WEATHER_API_KEY
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            timeout = upstream_timeout()
+            with UpstreamCall("openweathermap", breaker=owm_breaker, quota=owm_quota, demand_key=cell) as call:
+                response = requests.get(url, params=params, timeout=timeout)
+                call.status = response.status_code
             
             if response.status_code == 200:
                 data = response.json()
@@ -293,7 +357,7 @@ async def get_air_quality(lat: float, lon: float):
                 category = aqi_categories.get(aqi_index, aqi_categories[3])
                 components = aqi_data["components"]
                 
-                return {
+                air_quality = {
                     "aqi": aqi_index,
                     "level": category["level"],
                     "color": category["color"],
@@ -310,12 +374,16 @@ async def get_air_quality(lat: float, lon: float):
                     "location": {"latitude": lat, "longitude": lon},
                     "is_real": True
                 }
+                air_quality_cache.put(lat, lon, air_quality)
+                return air_quality
         
         # Fallback: Generate realistic AQI data
         return _generate_fallback_aqi(lat, lon)
         
+    except (CircuitOpen, QuotaExhausted):
+        return _generate_fallback_aqi(lat, lon)
     except Exception as e:
-        print(f"❌ Air quality API error: {e}")
+        logger.warning(f"❌ Air quality API error: {e}")
         return _generate_fallback_aqi(lat, lon)
 
 def _generate_fallback_aqi(lat: float, lon: float):
@@ -0,0 +1,28 @@
+"""
+Admin Access
+Bearer-token guard for operational endpoints (profiling, tracing)
+
+The token comes from ADMIN_TOKEN. Without it the guarded endpoints are
+disabled (503) rather than open, so a deployment that forgets to set it does
+not expose them.
+"""
+
+from typing import Optional
+import hmac
+import os
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+admin_bearer = HTTPBearer(auto_error=False)
+
+async def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_bearer)):
+    """FastAPI dependency: 503 if no admin token is configured, 401/403 on a missing/wrong token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints disabled (ADMIN_TOKEN not set)")
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+    if not hmac.compare_digest(credentials.credentials.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
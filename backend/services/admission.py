@@ -0,0 +1,268 @@
+"""
+Admission Control
+Per-route-class concurrency limits, bounded deadline queues and priority load shedding
+
+Requests are classified by method and path before routing. Each class has
+a concurrency limit, a bounded wait queue and a queue deadline, and all
+classes share one overall concurrency limit. When a slot frees up, the
+highest-priority waiter that fits goes first, so a surge of dashboard polls
+queues behind predictions and alerts instead of beside them. Emergency
+alert creation skips the limits entirely. A request that finds its queue
+full, or waits past its deadline, gets 503 with Retry-After right away
+instead of holding a coroutine open.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import math
+import os
+import time
+
+from services.edge import OPERATIONAL_PREFIXES, encode_headers, local_path
+from services.fast_json import dumps
+from services.metrics import CallbackGauge, Counter, Histogram
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+# Requests running at once across all limited classes
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+ADMISSION_INTERACTIVE_LIMIT = int(os.getenv("ADMISSION_INTERACTIVE_LIMIT", "32"))
+ADMISSION_DASHBOARD_LIMIT = int(os.getenv("ADMISSION_DASHBOARD_LIMIT", "16"))
+
+ADMISSION_REQUESTS = Counter(
+    "admission_requests_total", "Admission decisions per route class", ("route_class", "outcome")
+)
+ADMISSION_WAIT = Histogram(
+    "admission_queue_wait_seconds", "Time admitted requests spent queued", ("route_class",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+class RouteClass:
+    """
+    A group of routes sharing a concurrency limit and wait queue
+    Lower priority numbers are woken first. limit=None means never limited
+    (critical routes); they still count toward the overall concurrency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        priority: int,
+        limit: Optional[int],
+        queue_size: int = 0,
+        queue_timeout: float = 0.0,
+        retry_after: int = 1,
+        rules: Sequence[Tuple[Optional[str], str]] = ()
+    ):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        # (method or None for any, path prefix)
+        self.rules = list(rules)
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self._outcomes = {
+            outcome: ADMISSION_REQUESTS.labels(name, outcome)
+            for outcome in ("admitted", "queued", "rejected_queue_full", "rejected_timeout")
+        }
+        self._wait = ADMISSION_WAIT.labels(name)
+
+    def matches(self, method: str, path: str) -> bool:
+        return any((m is None or m == method) and path.startswith(prefix) for m, prefix in self.rules)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "priority": self.priority,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": sum(1 for w in self.waiters if not w.done()),
+            "queue_size": self.queue_size,
+            "queue_timeout_ms": self.queue_timeout * 1000
+        }
+
+def default_route_classes() -> List[RouteClass]:
+    """Emergency alerts > predictions and alerts > everything else > dashboard data"""
+    return [
+        RouteClass("critical", 0, None, rules=[("POST", "/alerts/emergency")]),
+        RouteClass(
+            "interactive", 1, ADMISSION_INTERACTIVE_LIMIT,
+            queue_size=ADMISSION_INTERACTIVE_LIMIT * 2, queue_timeout=2.0, retry_after=1,
+            rules=[(None, "/predict"), (None, "/alerts")]
+        ),
+        RouteClass(
+            "dashboard", 3, ADMISSION_DASHBOARD_LIMIT,
+            queue_size=ADMISSION_DASHBOARD_LIMIT, queue_timeout=0.5, retry_after=5,
+            rules=[(None, "/weather"), (None, "/external"), (None, "/earthquakes")]
+        ),
+        # Anything not matched above
+        RouteClass("default", 2, ADMISSION_INTERACTIVE_LIMIT, queue_size=ADMISSION_INTERACTIVE_LIMIT, queue_timeout=1.0, retry_after=2)
+    ]
+
+class AdmissionController:
+    """Concurrency accounting and priority wake-up for the route classes"""
+
+    def __init__(self, classes: Optional[List[RouteClass]] = None, max_concurrency: int = ADMISSION_MAX_CONCURRENCY):
+        self.classes = classes or default_route_classes()
+        self.by_priority = sorted(self.classes, key=lambda c: c.priority)
+        # Classes with no rules catch everything else
+        self.fallback = next((c for c in self.classes if not c.rules), None)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._classify_cache: Dict[Tuple[str, str], Optional[RouteClass]] = {}
+
+    def classify(self, method: str, path: str) -> Optional[RouteClass]:
+        """Route class for a request, or None if it is exempt from admission control"""
+        key = (method, path)
+        if key in self._classify_cache:
+            return self._classify_cache[key]
+        local = local_path(path)
+        # Never queued or counted: probes, scrapes and admin tools must answer under load
+        if local.startswith(OPERATIONAL_PREFIXES):
+            route_class = None
+        else:
+            route_class = next((c for c in self.classes if c.rules and c.matches(method, local)), self.fallback)
+        if len(self._classify_cache) < 4096:  # Path parameters make the key space open-ended
+            self._classify_cache[key] = route_class
+        return route_class
+
+    def _fits(self, route_class: RouteClass) -> bool:
+        return (route_class.limit is None or route_class.in_flight < route_class.limit) and self.in_flight < self.max_concurrency
+
+    def _higher_or_equal_waiting(self, route_class: RouteClass) -> bool:
+        """Whether a queued request of equal or higher priority could take the free slot instead"""
+        for other in self.by_priority:
+            if other.priority > route_class.priority:
+                return False
+            # A class held back by its own limit can't use the slot, so it doesn't block this one
+            if self._fits(other) and any(not w.done() for w in other.waiters):
+                return True
+        return False
+
+    def _admit(self, route_class: RouteClass):
+        route_class.in_flight += 1
+        self.in_flight += 1
+
+    async def acquire(self, route_class: RouteClass) -> bool:
+        """Wait for a slot; False means shed the request (queue full or deadline passed)"""
+        if route_class.limit is None:
+            self._admit(route_class)
+            route_class._outcomes["admitted"].inc()
+            return True
+        if self._fits(route_class) and not self._higher_or_equal_waiting(route_class):
+            self._admit(route_class)
+            route_class._outcomes["admitted"].inc()
+            return True
+
+        # Drop waiters that already gave up before counting the queue
+        while route_class.waiters and route_class.waiters[0].done():
+            route_class.waiters.popleft()
+        if len(route_class.waiters) >= route_class.queue_size:
+            route_class._outcomes["rejected_queue_full"].inc()
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        route_class.waiters.append(waiter)
+        route_class._outcomes["queued"].inc()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=route_class.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted in the same tick the deadline fired: the slot is ours
+                return True
+            waiter.cancel()
+            route_class._outcomes["rejected_timeout"].inc()
+            return False
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back a slot we may have been given
+            if waiter.done() and not waiter.cancelled():
+                self.release(route_class)
+            else:
+                waiter.cancel()
+            raise
+        route_class._wait.observe(time.perf_counter() - start)
+        return True
+
+    def release(self, route_class: RouteClass):
+        route_class.in_flight -= 1
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        # Highest priority first; within a class, first come first served
+        for route_class in self.by_priority:
+            waiters = route_class.waiters
+            while waiters and self._fits(route_class):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self._admit(route_class)
+                route_class._outcomes["admitted"].inc()
+                waiter.set_result(True)
+            if self.in_flight >= self.max_concurrency:
+                return
+
+    def queue_depths(self) -> Dict[Tuple[str, ...], float]:
+        return {(c.name,): sum(1 for w in c.waiters if not w.done()) for c in self.classes}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": ADMISSION_CONTROL,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "classes": {c.name: c.status() for c in self.classes}
+        }
+
+class AdmissionMiddleware:
+    """Pure-ASGI gate in front of the router; shed requests get 503 + Retry-After"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+        self._rejections = {
+            c.name: self._rejection(c) for c in self.controller.classes
+        }
+
+    @staticmethod
+    def _rejection(route_class: RouteClass):
+        body = dumps({
+            "detail": "Server is at capacity, retry later",
+            "route_class": route_class.name,
+            "retry_after": route_class.retry_after
+        })
+        headers = encode_headers({
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Retry-After": str(math.ceil(route_class.retry_after)),
+            "Cache-Control": "no-store"
+        })
+        return headers, body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL:
+            await self.app(scope, receive, send)
+            return
+        route_class = self.controller.classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(route_class):
+            headers, body = self._rejections[route_class.name]
+            await send({"type": "http.response.start", "status": 503, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+admission_controller = AdmissionController()
+
+ADMISSION_QUEUE_DEPTH = CallbackGauge(
+    "admission_queue_depth", "Requests waiting for admission per route class", ("route_class",),
+    admission_controller.queue_depths
+)
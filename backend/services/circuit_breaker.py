@@ -0,0 +1,200 @@
+"""
+Circuit Breakers
+Per-upstream closed/open/half-open breakers over rolling error and latency windows
+
+Every call to an upstream (OpenWeatherMap, USGS) goes through
+UpstreamCall(service, breaker=...), which records its outcome and duration
+in the breaker's rolling window: a ring of time buckets, so old calls age out
+without a per-call queue. Once the window holds enough calls and either the
+error ratio or the slow-call ratio crosses its threshold, the breaker opens.
+While open, UpstreamCall raises CircuitOpen immediately and callers serve
+their cache or fallback data instead of waiting out a timeout. After the
+open period one caller is let through as a probe (half-open); success closes
+the breaker, failure reopens it for twice as long, up to a cap.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+from services.metrics import CallbackGauge, Counter
+
+CIRCUIT_BREAKERS_ENABLED = os.getenv("CIRCUIT_BREAKERS_ENABLED", "true").lower() in ("1", "true", "yes")
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "30"))
+# Calls needed in the window before the ratios are trusted
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_FAILURE_RATIO = float(os.getenv("CIRCUIT_FAILURE_RATIO", "0.5"))
+CIRCUIT_SLOW_RATIO = float(os.getenv("CIRCUIT_SLOW_RATIO", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "15"))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", "120"))
+
+WINDOW_BUCKETS = 10
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_TRANSITIONS = Counter(
+    "upstream_circuit_transitions_total", "Circuit breaker state changes per upstream", ("service", "state")
+)
+CIRCUIT_SHORT_CIRCUITED = Counter(
+    "upstream_short_circuited_total", "Upstream calls skipped because the circuit was open", ("service",)
+)
+
+class CircuitOpen(Exception):
+    """The upstream's breaker is open; serve cached or fallback data"""
+
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"{service} circuit open, next probe in {retry_in:.1f}s")
+        self.service = service
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Breaker for one upstream service
+    A call slower than slow_call_seconds counts as slow even if it succeeds,
+    so an upstream that answers but takes most of the timeout still trips it.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        slow_call_seconds: float,
+        window_seconds: float = CIRCUIT_WINDOW_SECONDS,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        failure_ratio: float = CIRCUIT_FAILURE_RATIO,
+        slow_ratio: float = CIRCUIT_SLOW_RATIO,
+        open_seconds: float = CIRCUIT_OPEN_SECONDS,
+        max_open_seconds: float = CIRCUIT_MAX_OPEN_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.service = service
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_ratio = slow_ratio
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.clock = clock
+        self.bucket_seconds = window_seconds / WINDOW_BUCKETS
+        # Per bucket: [epoch, calls, failures, slow calls]
+        self.buckets: List[List[float]] = [[-1, 0, 0, 0] for _ in range(WINDOW_BUCKETS)]
+        self.state = CLOSED
+        self.open_seconds = open_seconds
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.last_failure: Optional[str] = None
+        self._lock = threading.Lock()
+        self._short_circuited = CIRCUIT_SHORT_CIRCUITED.labels(service)
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpen unless a call may go out; True if this call is the half-open probe"""
+        if not CIRCUIT_BREAKERS_ENABLED or self.state == CLOSED:
+            return False
+        with self._lock:
+            if self.state == OPEN:
+                retry_in = self.opened_at + self.open_seconds - self.clock()
+                if retry_in > 0:
+                    self._short_circuited.inc()
+                    raise CircuitOpen(self.service, retry_in)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.probe_in_flight:
+                    self._short_circuited.inc()
+                    raise CircuitOpen(self.service, 0.0)
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record(self, ok: bool, elapsed: float, probe: bool = False, error: Optional[str] = None):
+        """Add a finished call to the window and move the breaker if needed"""
+        slow = elapsed >= self.slow_call_seconds
+        if not ok:
+            self.last_failure = error or "error"
+        now = self.clock()
+        with self._lock:
+            if probe:
+                self.probe_in_flight = False
+                if ok and not slow:
+                    self._reset_window()
+                    self.open_seconds = self.base_open_seconds
+                    self._transition(CLOSED)
+                else:
+                    self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+                    self._open(now)
+                return
+            epoch = int(now / self.bucket_seconds)
+            bucket = self.buckets[epoch % WINDOW_BUCKETS]
+            if bucket[0] != epoch:
+                bucket[0], bucket[1], bucket[2], bucket[3] = epoch, 0, 0, 0
+            bucket[1] += 1
+            if ok and not slow:
+                return
+            if not ok:
+                bucket[2] += 1
+            if slow:
+                bucket[3] += 1
+            if self.state != CLOSED:
+                return
+            calls, failures, slow_calls = self._totals(epoch)
+            if calls >= self.min_calls and (
+                failures / calls >= self.failure_ratio or slow_calls / calls >= self.slow_ratio
+            ):
+                self._open(now)
+
+    def release_probe(self):
+        """The probe ended without an answer (e.g. the request was cancelled); let another caller probe"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def _totals(self, epoch: int) -> Tuple[int, int, int]:
+        oldest = epoch - WINDOW_BUCKETS + 1
+        calls = failures = slow_calls = 0
+        for bucket_epoch, bucket_calls, bucket_failures, bucket_slow in self.buckets:
+            if bucket_epoch >= oldest:
+                calls += bucket_calls
+                failures += bucket_failures
+                slow_calls += bucket_slow
+        return calls, failures, slow_calls
+
+    def _reset_window(self):
+        for bucket in self.buckets:
+            bucket[0] = -1
+
+    def _open(self, now: float):
+        self.opened_at = now
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            self.state = state
+            CIRCUIT_TRANSITIONS.labels(self.service, state).inc()
+
+    def status(self) -> Dict[str, Any]:
+        calls, failures, slow_calls = self._totals(int(self.clock() / self.bucket_seconds))
+        status = {
+            "state": self.state,
+            "window_calls": calls,
+            "failure_rate": round(failures / calls, 3) if calls else 0.0,
+            "slow_rate": round(slow_calls / calls, 3) if calls else 0.0,
+            "slow_call_ms": self.slow_call_seconds * 1000,
+            "last_failure": self.last_failure
+        }
+        if self.state == OPEN:
+            status["next_probe_in_s"] = round(max(0.0, self.opened_at + self.open_seconds - self.clock()), 1)
+        return status
+
+circuit_breakers: Dict[str, CircuitBreaker] = {
+    "openweathermap": CircuitBreaker("openweathermap", slow_call_seconds=float(os.getenv("CIRCUIT_OWM_SLOW_SECONDS", "2"))),
+    "usgs": CircuitBreaker("usgs", slow_call_seconds=float(os.getenv("CIRCUIT_USGS_SLOW_SECONDS", "3")))
+}
+
+def circuit_status() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.status() for name, breaker in circuit_breakers.items()}
+
+CIRCUIT_STATE = CallbackGauge(
+    "upstream_circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)", ("service",),
+    lambda: {(name,): STATE_VALUES[breaker.state] for name, breaker in circuit_breakers.items()}
+)
@@ -0,0 +1,162 @@
+"""
+Request Deadlines
+Per-request time budgets propagated from the client to upstream calls
+
+Each request gets a deadline from the X-Request-Timeout header (seconds,
+capped at DEADLINE_MAX_SECONDS) or, failing that, its route's default. The
+deadline lives in a ContextVar, so it follows the request into awaited
+calls, gathered tasks and threadpool work. Upstream fetches ask
+upstream_timeout() for their timeout, which is the remaining budget capped
+at the old fixed 10 s, and skip the call (DeadlineExceeded) when too little
+is left to be worth it. If the deadline passes before the response has
+started, DeadlineMiddleware cancels the handler, which also cancels any
+in-flight aiohttp calls, and answers 504. The budget ends with the response
+body, so background tasks that run after it are not cut short.
+"""
+
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
+import time
+
+from services.edge import OPERATIONAL_PREFIXES, encode_headers, header_value, local_path
+from services.fast_json import dumps
+from services.metrics import Counter
+
+DEADLINE_ENABLED = os.getenv("DEADLINE_ENABLED", "true").lower() in ("1", "true", "yes")
+DEADLINE_MAX_SECONDS = float(os.getenv("DEADLINE_MAX_SECONDS", "30"))
+DEADLINE_DEFAULT_SECONDS = float(os.getenv("DEADLINE_DEFAULT_SECONDS", "15"))
+# Cap for any single upstream call, deadline or not (the previous fixed timeout)
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))
+# Don't start an upstream call with less than this left; the fallback is better than a near-certain timeout
+MIN_UPSTREAM_BUDGET = 0.05
+
+DEADLINE_HEADER = b"x-request-timeout"
+
+# Route defaults by /api-stripped path prefix, longest first
+ROUTE_DEADLINES: List[Tuple[str, float]] = [
+    ("/predict", 5.0),
+    ("/weather", 5.0),
+    ("/earthquakes", 5.0),
+    ("/external", 8.0),
+    ("/alerts", 8.0)
+]
+
+DEADLINES_EXCEEDED = Counter(
+    "request_deadline_exceeded_total", "Work stopped because the request deadline passed", ("stage",)
+)
+_request_expired = DEADLINES_EXCEEDED.labels("request")
+_upstream_skipped = DEADLINES_EXCEEDED.labels("upstream_skipped")
+
+# Absolute time.monotonic() deadline of the current request, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """Too little of the request's budget is left to start the work"""
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None outside a request"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def upstream_timeout(cap: float = UPSTREAM_TIMEOUT) -> float:
+    """Timeout for the next upstream call: the remaining budget, at most `cap`"""
+    left = remaining()
+    if left is None:
+        return cap
+    if left < MIN_UPSTREAM_BUDGET:
+        _upstream_skipped.inc()
+        raise DeadlineExceeded(f"Request deadline leaves {max(left, 0) * 1000:.0f} ms, skipping upstream call")
+    return min(cap, left)
+
+class DeadlineMiddleware:
+    """Sets each request's deadline and answers 504 if it passes before the response starts"""
+
+    def __init__(self, app, route_deadlines: Optional[List[Tuple[str, float]]] = None, default: float = DEADLINE_DEFAULT_SECONDS):
+        self.app = app
+        self.route_deadlines = sorted(route_deadlines or ROUTE_DEADLINES, key=lambda r: len(r[0]), reverse=True)
+        self.default = default
+        self._budget_cache: Dict[str, Optional[float]] = {}
+        body = dumps({"detail": "Request deadline exceeded"})
+        self._timeout_body = body
+        self._timeout_headers = encode_headers({"Content-Type": "application/json", "Content-Length": str(len(body))})
+
+    def _route_budget(self, path: str) -> Optional[float]:
+        budget = self._budget_cache.get(path, False)
+        if budget is False:
+            local = local_path(path)
+            if local.startswith(OPERATIONAL_PREFIXES):
+                budget = None  # Profiling sessions and probes set their own time limits
+            else:
+                budget = next((seconds for prefix, seconds in self.route_deadlines if local.startswith(prefix)), self.default)
+            if len(self._budget_cache) < 4096:  # Path parameters make the key space open-ended
+                self._budget_cache[path] = budget
+        return budget
+
+    def budget(self, scope) -> Optional[float]:
+        """Seconds allowed for this request: the client's header if valid, else the route default"""
+        route_budget = self._route_budget(scope["path"])
+        if route_budget is None:
+            return None
+        requested = header_value(scope, DEADLINE_HEADER)
+        if requested:
+            try:
+                seconds = float(requested)
+            except ValueError:
+                seconds = 0.0
+            if seconds > 0:
+                return min(seconds, DEADLINE_MAX_SECONDS)
+        return route_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DEADLINE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        budget = self.budget(scope)
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        started = False
+        finished = False
+        expired = False
+
+        def expire():
+            nonlocal expired
+            if not finished:
+                expired = True
+                task.cancel()
+
+        async def send_tracking(message):
+            nonlocal started, finished
+            if message["type"] == "http.response.start":
+                started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # The response is complete: background tasks that run after it are not under the deadline
+                finished = True
+                handle.cancel()
+                _deadline.set(None)
+            await send(message)
+
+        # Cancelled in this task rather than run in a wait_for task, so the handler keeps the
+        # caller's task (and its stack, which the profiler walks) on every Python version
+        token = _deadline.set(time.monotonic() + budget)
+        handle = asyncio.get_running_loop().call_later(budget, expire)
+        try:
+            await self.app(scope, receive, send_tracking)
+        except asyncio.CancelledError:
+            if not expired:
+                raise  # Cancelled from outside (client gone, server shutting down)
+            _request_expired.inc()
+            if started:
+                # Too late for a clean status; the server closes the half-sent response
+                raise asyncio.TimeoutError() from None
+            await send({"type": "http.response.start", "status": 504, "headers": self._timeout_headers})
+            await send({"type": "http.response.body", "body": self._timeout_body})
+        finally:
+            handle.cancel()
+            if expired and hasattr(task, "uncancel"):
+                task.uncancel()  # Python 3.11+: this cancellation was ours and has been handled
+            _deadline.reset(token)
@@ -0,0 +1,208 @@
+"""
+Edge Middleware
+Single pure-ASGI middleware for CORS and per-request cross-cutting hooks
+
+Replaces the CORSMiddleware + BaseHTTPMiddleware pair. CORS headers are
+encoded once at startup and appended to every response start message, and
+preflight OPTIONS requests are answered here without entering the router.
+Timing, request IDs and later cross-cutting concerns plug in as EdgeHook
+objects; hooks that do not override a stage cost nothing for that stage.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import itertools
+import os
+import time
+
+Headers = List[Tuple[bytes, bytes]]
+
+# Sent on every response, overriding anything the route set (matches the old ForceCORSMiddleware)
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Expose-Headers": "*"
+}
+PREFLIGHT_MAX_AGE = 600
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+# main.py mounts the routers under /api; enhanced_main.py serves them at the root
+API_PREFIX = "/api"
+# Probes, scrapes, admin tools and docs: exempt from admission control and rate limits
+OPERATIONAL_PREFIXES = ("/health", "/metrics", "/debug", "/docs", "/redoc", "/openapi.json")
+
+def encode_headers(headers: Dict[str, str]) -> Headers:
+    """Raw ASGI header pairs (lowercase names) from a str -> str mapping"""
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+def header_value(scope: Dict[str, Any], name: bytes) -> Optional[bytes]:
+    """First raw value of a request header (name must be lowercase)"""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+def local_path(path: str) -> str:
+    """Request path without the /api prefix, so both apps match one rule table"""
+    return path[len(API_PREFIX):] if path.startswith(API_PREFIX + "/") else path
+
+def route_path(scope: Dict[str, Any]) -> str:
+    """
+    Route template that served the request ("/api/weather/{lat}/{lon}"), or "unmatched"
+    Available once the router has run, i.e. in response_headers() and finish().
+    """
+    # FastAPI releases that include routers lazily keep the prefixed path in a route context
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+class EdgeReject(Exception):
+    """
+    Raised from EdgeHook.start() to answer the request without calling the app
+    Hooks after the raising one are skipped; earlier hooks still add headers and finish.
+    """
+
+    def __init__(self, status: int, headers: Headers, body: bytes, token: Any = None):
+        super().__init__(status)
+        self.status = status
+        self.headers = headers
+        self.body = body
+        # Passed to the raising hook's response_headers() and finish()
+        self.token = token
+
+class EdgeHook:
+    """
+    Per-request hook hosted by EdgeMiddleware
+    Override any of the three stages; the token returned by start() is passed
+    to the others. Stages left as the base implementation are never called.
+    start() may raise EdgeReject to short-circuit the request (rate limits).
+    """
+
+    def start(self, scope: Dict[str, Any]) -> Any:
+        return None
+
+    def response_headers(self, scope: Dict[str, Any], token: Any, status: int) -> Optional[Headers]:
+        return None
+
+    def finish(self, scope: Dict[str, Any], token: Any, status: int) -> None:
+        return None
+
+def _overrides(hook: EdgeHook, stage: str) -> bool:
+    return getattr(type(hook), stage) is not getattr(EdgeHook, stage)
+
+class TimingHook(EdgeHook):
+    """Server-Timing header with the time until the response started"""
+
+    def start(self, scope):
+        return time.perf_counter()
+
+    def response_headers(self, scope, token, status):
+        return [(b"server-timing", b"app;dur=%.3f" % ((time.perf_counter() - token) * 1000))]
+
+class RequestIdHook(EdgeHook):
+    """
+    X-Request-ID echoed from the client or generated, also in scope["state"]["request_id"]
+    Generated IDs are a per-process random prefix plus a counter, so no UUID is built per request.
+    """
+
+    def __init__(self):
+        self._prefix = os.urandom(4).hex().encode() + b"-"
+        self._counter = itertools.count(1)
+
+    def start(self, scope):
+        request_id = header_value(scope, REQUEST_ID_HEADER)
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH or not request_id.isascii():
+            request_id = self._prefix + b"%x" % next(self._counter)
+        scope.setdefault("state", {})["request_id"] = request_id.decode("latin-1")
+        return request_id
+
+    def response_headers(self, scope, token, status):
+        return [(REQUEST_ID_HEADER, token)]
+
+class EdgeMiddleware:
+    """Pure-ASGI CORS with precomputed headers, preflight short-circuit and hooks"""
+
+    def __init__(
+        self,
+        app,
+        cors_headers: Optional[Dict[str, str]] = None,
+        hooks: Sequence[EdgeHook] = (),
+        preflight_max_age: int = PREFLIGHT_MAX_AGE
+    ):
+        self.app = app
+        # cors_headers={} disables CORS handling (for apps that keep their own CORS middleware)
+        self.cors_headers = encode_headers(CORS_HEADERS if cors_headers is None else cors_headers)
+        self._cors_names = frozenset(name for name, _ in self.cors_headers)
+        # Added to the CORS headers on preflight responses
+        self.preflight_headers = encode_headers({
+            "Access-Control-Max-Age": str(preflight_max_age),
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Length": "2"
+        })
+        self.hooks = list(hooks)
+        # Resolve each stage once so requests only loop over hooks that use it
+        self._start = tuple((i, h.start) for i, h in enumerate(self.hooks) if _overrides(h, "start"))
+        self._headers = tuple((i, h.response_headers) for i, h in enumerate(self.hooks) if _overrides(h, "response_headers"))
+        self._finish = tuple((i, h.finish) for i, h in enumerate(self.hooks) if _overrides(h, "finish"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tokens = [None] * len(self.hooks) if self._start else None
+        header_stages = self._headers
+        finish_stages = self._finish
+        rejection = None
+        for i, start in self._start:
+            try:
+                tokens[i] = start(scope)
+            except EdgeReject as e:
+                # Only hooks that started (and the rejecting one) see the rest of the request
+                rejection = e
+                tokens[i] = e.token
+                header_stages = tuple(stage for stage in self._headers if stage[0] <= i)
+                finish_stages = tuple(stage for stage in self._finish if stage[0] <= i)
+                break
+        status = 0
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [h for h in message.get("headers", ()) if h[0] not in self._cors_names]
+                headers.extend(self.cors_headers)
+                for i, response_headers in header_stages:
+                    extra = response_headers(scope, tokens[i] if tokens else None, status)
+                    if extra:
+                        headers.extend(extra)
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            if scope["method"] == "OPTIONS" and self.cors_headers and self._is_preflight(scope):
+                await self._preflight(send_with_headers)
+            elif rejection is not None:
+                await send_with_headers({"type": "http.response.start", "status": rejection.status, "headers": list(rejection.headers)})
+                await send_with_headers({"type": "http.response.body", "body": rejection.body})
+            else:
+                await self.app(scope, receive, send_with_headers)
+        finally:
+            for i, finish in finish_stages:
+                finish(scope, tokens[i] if tokens else None, status)
+
+    @staticmethod
+    def _is_preflight(scope) -> bool:
+        has_origin = has_method = False
+        for key, _ in scope["headers"]:
+            if key == b"origin":
+                has_origin = True
+            elif key == b"access-control-request-method":
+                has_method = True
+        return has_origin and has_method
+
+    async def _preflight(self, send):
+        # send is the header-injecting wrapper, which adds the CORS headers
+        await send({"type": "http.response.start", "status": 200, "headers": self.preflight_headers})
+        await send({"type": "http.response.body", "body": b"OK"})
@@ -0,0 +1,107 @@
+"""
+Fast JSON Responses
+Opt-in response path that serializes payloads straight to bytes
+
+FastAPI's default path runs every returned dict through jsonable_encoder and
+then stdlib json, and validates response_model objects again on the way out.
+Routes that return FastJSONResponse skip both: dicts are encoded directly
+(orjson when installed, the C-accelerated stdlib encoder otherwise) and
+pydantic models, already validated when they were built, are dumped by their
+own compiled serializer. Pre-serialized bytes are sent unchanged.
+"""
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Hashable, Optional
+import json
+
+import numpy as np
+from cachetools import TTLCache
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator; the stdlib encoder produces the same JSON
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """Types the encoders do not handle natively, mapped as jsonable_encoder would"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, PurePath):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Same output as Starlette's JSONResponse: compact, UTF-8, no NaN
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default)
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def _dumps(obj: Any) -> bytes:
+        return _encoder.encode(obj).encode("utf-8")
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes for a response payload"""
+    if isinstance(obj, BaseModel):
+        # Serialized by pydantic's compiled serializer, without re-validation
+        return obj.model_dump_json().encode("utf-8")
+    return _dumps(obj)
+
+class FastJSONResponse(Response):
+    """JSON response serialized with dumps(); bytes content is treated as already-encoded JSON"""
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        background: Optional[BackgroundTask] = None
+    ):
+        super().__init__(content, status_code=status_code, headers=headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+class SerializedCache:
+    """
+    Serialized bytes for objects held in another cache
+    The bytes are reused for as long as the same object is served under a key,
+    so a cached payload is encoded once rather than on every response.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def dumps(self, key: Hashable, obj: Any) -> bytes:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not obj:
+            entry = (obj, dumps(obj))
+            self._entries[key] = entry
+        return entry[1]
+
+    def response(self, key: Hashable, obj: Any) -> FastJSONResponse:
+        return FastJSONResponse(self.dumps(key, obj))
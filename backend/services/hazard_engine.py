@@ -0,0 +1,272 @@
+"""
+Rule-Based Hazard Engine
+Vectorized version of the heuristic disaster rules used by routes/predict.py
+
+Conditions and coordinates are arrays, so one call scores a single location
+or thousands of them. Severity levels, contributing factors and recommended
+actions are derived with masks and lookup tables instead of per-row branches.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from services.zones import get_zone_registry
+
+# Output order of hazards in a prediction list
+HAZARDS = ['wildfire', 'flood', 'severe_weather', 'earthquake']
+
+# Minimum probability for a hazard to be reported
+REPORT_THRESHOLDS = {'wildfire': 0.1, 'flood': 0.1, 'severe_weather': 0.15, 'earthquake': 0.05}
+
+TIME_WINDOWS = {
+    'wildfire': '24-72 hours',
+    'flood': '6-48 hours',
+    'severe_weather': '3-24 hours',
+    'earthquake': 'geological timescale'
+}
+
+EARTHQUAKE_BASELINE = 0.02  # Global baseline
+
+SEVERITY_LEVELS = np.array(['minimal', 'low', 'moderate', 'high', 'critical'])
+SEVERITY_EDGES = [0.1, 0.3, 0.5, 0.7]
+
+# Contributing factors: (name, mask function) per hazard, plus the fallback when none apply
+FACTOR_RULES = {
+    'wildfire': [
+        ('high_temperature', lambda c: c['temperature'] > 30),
+        ('low_humidity', lambda c: c['humidity'] < 30),
+        ('strong_winds', lambda c: c['wind_speed'] > 15),
+    ],
+    'flood': [
+        ('high_humidity', lambda c: c['humidity'] > 80),
+        ('low_pressure_system', lambda c: c['pressure'] < 1005),
+        ('thunderstorm_conditions', lambda c: c['temperature'] > 25),
+    ],
+    'severe_weather': [
+        ('high_winds', lambda c: c['wind_speed'] > 20),
+        ('pressure_drop', lambda c: c['pressure'] < 1010),
+        ('moisture_buildup', lambda c: c['humidity'] > 75),
+    ]
+}
+FACTOR_FALLBACKS = {
+    'wildfire': 'moderate_conditions',
+    'flood': 'stable_conditions',
+    'severe_weather': 'calm_conditions'
+}
+EARTHQUAKE_FACTORS = ["tectonic_activity", "geological_history", "seismic_patterns"]
+
+# Recommended actions per hazard, from lowest to highest tier, with the tier edges
+ACTION_TIERS = {
+    'wildfire': ([0.3, 0.6], [
+        ["monitor_conditions", "maintain_fire_safety_measures"],
+        ["increase_fire_watch", "prepare_evacuation_routes", "limit_outdoor_activities"],
+        ["evacuate_high_risk_areas", "emergency_services_alert", "fire_suppression_ready"],
+    ]),
+    'flood': ([0.3, 0.6], [
+        ["monitor_water_levels", "check_drainage_systems"],
+        ["flood_watch_active", "secure_loose_items", "avoid_low_areas"],
+        ["evacuate_flood_zones", "sandbag_operations", "emergency_shelters_open"],
+    ]),
+    'severe_weather': ([0.3, 0.6], [
+        ["normal_weather_precautions", "stay_informed"],
+        ["weather_watch", "secure_outdoor_items", "monitor_updates"],
+        ["severe_weather_warning", "seek_indoor_shelter", "avoid_travel"],
+    ]),
+    'earthquake': ([0.2, 0.4], [
+        ["basic_earthquake_preparedness", "know_safety_procedures"],
+        ["earthquake_awareness", "emergency_kit_ready", "building_inspections"],
+        ["earthquake_preparedness_high", "secure_heavy_objects", "review_evacuation_plans"],
+    ])
+}
+
+LOW_RISK_PREDICTION = {
+    "type": "low_risk",
+    "probability": 0.05,
+    "severity": "minimal",
+    "time_window": "current",
+    "factors": ["stable_conditions"],
+    "recommended_actions": ["maintain_normal_vigilance", "monitor_weather_updates"]
+}
+
+def _factor_table(hazard: str) -> List[List[str]]:
+    """Factor list for every combination of factor bits"""
+    names = [name for name, _ in FACTOR_RULES[hazard]]
+    table = []
+    for code in range(2 ** len(names)):
+        factors = [name for bit, name in enumerate(names) if code & (1 << bit)]
+        table.append(factors or [FACTOR_FALLBACKS[hazard]])
+    return table
+
+FACTOR_TABLES = {hazard: _factor_table(hazard) for hazard in FACTOR_RULES}
+
+def wildfire_risk(c: Dict[str, np.ndarray], month: int) -> np.ndarray:
+    """Wildfire risk from temperature, humidity, wind, latitude and season"""
+    temp_factor = np.maximum(0, (c['temperature'] - 20) / 30)  # Normalized 20-50°C range
+    humidity_factor = np.maximum(0, (70 - c['humidity']) / 70)  # Inverted humidity
+    wind_factor = np.minimum(1, c['wind_speed'] / 25)  # Normalized wind speed
+
+    abs_lat = np.abs(c['latitude'])
+    lat_factor = np.select([(abs_lat >= 30) & (abs_lat <= 50), abs_lat < 10], [1.3, 0.7], 1.0)
+
+    if month in [6, 7, 8, 9]:  # Fire season
+        seasonal_factor = 1.4
+    elif month in [12, 1, 2]:  # Winter
+        seasonal_factor = 0.6
+    else:
+        seasonal_factor = 1.0
+
+    base_risk = temp_factor * 0.3 + humidity_factor * 0.4 + wind_factor * 0.3
+    return base_risk * lat_factor * seasonal_factor
+
+def flood_risk(c: Dict[str, np.ndarray], month: int) -> np.ndarray:
+    """Flood risk from humidity, pressure, temperature, latitude and season"""
+    humidity_factor = np.minimum(1, (c['humidity'] - 50) / 40)  # Normalized 50-90% range
+    pressure_factor = np.maximum(0, (1020 - c['pressure']) / 20)  # Low pressure indicates storm systems
+    temp_factor = np.where((c['temperature'] >= 5) & (c['temperature'] <= 35), 0.3, 0.1)
+    coastal_factor = np.where(np.abs(c['latitude']) < 45, 1.2, 1.0)  # Coastal and low-lying areas
+    seasonal_factor = 1.3 if month in [5, 6, 7, 8, 9, 10] else 0.8
+
+    base_risk = humidity_factor * 0.4 + pressure_factor * 0.4 + temp_factor * 0.2
+    return base_risk * coastal_factor * seasonal_factor
+
+def storm_risk(c: Dict[str, np.ndarray], month: int) -> np.ndarray:
+    """Severe weather/storm risk from wind, pressure, humidity and temperature"""
+    wind_factor = np.minimum(1, c['wind_speed'] / 30)
+    pressure_factor = np.maximum(0, (1020 - c['pressure']) / 25)
+    humidity_factor = np.minimum(1, (c['humidity'] - 60) / 30)
+    temp_factor = np.where((c['temperature'] >= 15) & (c['temperature'] <= 40), 0.4, 0.2)
+
+    return wind_factor * 0.35 + pressure_factor * 0.35 + humidity_factor * 0.2 + temp_factor * 0.1
+
+def earthquake_base_risk(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Geological baseline risk from the highest-risk seismic zone containing each point"""
+    return get_zone_registry().max_property(lat, lon, 'risk', EARTHQUAKE_BASELINE, category='seismic')
+
+CONDITION_KEYS = ['temperature', 'humidity', 'wind_speed', 'pressure', 'latitude', 'longitude']
+
+def _as_conditions(conditions: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    arrays = np.broadcast_arrays(*(np.asarray(conditions[k], dtype=np.float64) for k in CONDITION_KEYS))
+    return dict(zip(CONDITION_KEYS, (np.atleast_1d(a) for a in arrays)))
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer - well-mixed 64-bit hash of each element"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+class InputHashNoise:
+    """
+    Deterministic stand-in for np.random.Generator.uniform
+    Each location's draws are a hash of its own inputs and a time bucket, so
+    identical requests get identical jitter within the bucket regardless of
+    which other locations share the batch. Successive calls use new streams.
+    """
+
+    def __init__(self, values: Dict[str, Any], bucket: int):
+        keys = sorted(values)
+        arrays = [
+            np.ascontiguousarray(np.atleast_1d(a), dtype=np.float64) + 0.0  # fold -0.0 into 0.0
+            for a in np.broadcast_arrays(*(np.asarray(values[k], dtype=np.float64) for k in keys))
+        ]
+        with np.errstate(over='ignore'):
+            state = _splitmix64(np.full(arrays[0].shape, bucket, dtype=np.uint64))
+            for array in arrays:
+                state = _splitmix64(state ^ array.view(np.uint64))
+        self.state = state
+        self.stream = 0
+
+    def uniform(self, low: float, high: float, size: int) -> np.ndarray:
+        self.stream += 1
+        with np.errstate(over='ignore'):
+            bits = _splitmix64(self.state ^ np.uint64(self.stream))
+        # Top 53 bits give a uniform double in [0, 1)
+        unit = (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+        return low + (high - low) * unit[:size]
+
+class HazardAssessment:
+    """Per-hazard probabilities and derived labels for a batch of locations"""
+
+    def __init__(
+        self,
+        conditions: Dict[str, Any],
+        month: Optional[int] = None,
+        rng: Optional[Any] = None,
+        risks: Optional[Dict[str, np.ndarray]] = None
+    ):
+        """
+        rng supplies the jitter: an np.random.Generator (random when omitted)
+        or an InputHashNoise built from the same conditions for stable results.
+        risks replaces the heuristic probabilities (e.g. with trained model
+        scores) while keeping the same severity, factor and action labels.
+        """
+        c = _as_conditions(conditions)
+        n = len(c['latitude'])
+
+        if risks is not None:
+            raw = {h: np.broadcast_to(np.asarray(risks[h], dtype=np.float64), (n,)) for h in HAZARDS}
+        else:
+            month = month or datetime.now().month
+            rng = rng or np.random.default_rng()
+
+            # Risk models plus the same jitter the scalar rules applied
+            raw = {
+                'wildfire': wildfire_risk(c, month) + rng.uniform(-0.1, 0.1, n),
+                'flood': flood_risk(c, month) + rng.uniform(-0.08, 0.08, n),
+                'severe_weather': storm_risk(c, month) + rng.uniform(-0.1, 0.1, n),
+                # Distance decay from fault lines (simplified) plus geological randomness
+                'earthquake': (earthquake_base_risk(c['latitude'], c['longitude']) * rng.uniform(0.7, 1.3, n)
+                               + rng.uniform(-0.02, 0.02, n)),
+            }
+
+        self.size = n
+        self.conditions = c
+        self.risks = {h: np.clip(raw[h], 0, 1) for h in HAZARDS}
+        self.probabilities = {h: np.round(self.risks[h], 3) for h in HAZARDS}
+        self.reported = {h: self.risks[h] > REPORT_THRESHOLDS[h] for h in HAZARDS}
+        self.severity = {h: np.searchsorted(SEVERITY_EDGES, self.risks[h], side='right') for h in HAZARDS}
+        self.action_tier = {
+            h: np.searchsorted(ACTION_TIERS[h][0], self.risks[h], side='right') for h in HAZARDS
+        }
+        self.factor_codes = {
+            h: sum(rule(c).astype(np.intp) << bit for bit, (_, rule) in enumerate(rules))
+            for h, rules in FACTOR_RULES.items()
+        }
+
+        # Overall confidence from the highest reported probability (0.05 when only low risk)
+        reported_max = np.max([np.where(self.reported[h], self.probabilities[h], 0) for h in HAZARDS], axis=0)
+        any_reported = np.any([self.reported[h] for h in HAZARDS], axis=0)
+        top = np.where(any_reported, reported_max, LOW_RISK_PREDICTION['probability'])
+        self.confidence = np.select([top >= 0.6, top >= 0.3], ['high', 'medium'], 'low')
+
+    def severity_labels(self, hazard: str) -> np.ndarray:
+        return SEVERITY_LEVELS[self.severity[hazard]]
+
+    def predictions(self, i: int) -> List[Dict[str, Any]]:
+        """Prediction list for location i, in the same shape as the scalar rules produced"""
+        predictions = []
+        for hazard in HAZARDS:
+            if not self.reported[hazard][i]:
+                continue
+            if hazard == 'earthquake':
+                factors = list(EARTHQUAKE_FACTORS)
+            else:
+                factors = list(FACTOR_TABLES[hazard][self.factor_codes[hazard][i]])
+            predictions.append({
+                "type": hazard,
+                "probability": float(self.probabilities[hazard][i]),
+                "severity": str(SEVERITY_LEVELS[self.severity[hazard][i]]),
+                "time_window": TIME_WINDOWS[hazard],
+                "factors": factors,
+                "recommended_actions": list(ACTION_TIERS[hazard][1][self.action_tier[hazard][i]])
+            })
+
+        # If no high risks, provide low-risk status
+        if not predictions:
+            predictions.append({
+                **LOW_RISK_PREDICTION,
+                "factors": list(LOW_RISK_PREDICTION["factors"]),
+                "recommended_actions": list(LOW_RISK_PREDICTION["recommended_actions"])
+            })
+        return predictions
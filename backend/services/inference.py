@@ -0,0 +1,216 @@
+"""
+Unified Inference Service
+Serves /api/predict/disaster from the trained ensembles with a heuristic fallback
+
+The persisted hazard models (models/*.joblib) are loaded in a background
+thread. A request uses them when they are loaded and the batch is expected to
+finish within the latency budget; it falls back to the vectorized heuristics
+when the models are cold, missing, failing or over budget. Every result
+records which path served it and why.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+from ml.features import feature_matrix
+from services.hazard_engine import HazardAssessment
+from services.metrics import INFERENCE_LATENCY
+from services.profiler import phase
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = Path(__file__).parent.parent / "models"
+INFERENCE_LATENCY_BUDGET_MS = float(os.getenv("INFERENCE_LATENCY_BUDGET_MS", "50"))
+
+# Trained model file -> hazard in the prediction response
+MODEL_HAZARDS = {
+    'flood': 'flood',
+    'fire': 'wildfire',
+    'storm': 'severe_weather',
+    'earthquake': 'earthquake'
+}
+# Trained models score risk on a 0-10 scale
+MODEL_RISK_SCALE = 10.0
+HEURISTIC_MODEL_VERSION = "v2.1_enhanced"
+
+# Smoothing for the per-row latency estimate
+LATENCY_EWMA_ALPHA = 0.2
+# While the estimate is over budget, still try the models this often to refresh it
+BUDGET_PROBE_INTERVAL_S = 5.0
+WARMUP_BATCH_ROWS = 256
+
+class InferenceService:
+    """Trained-ensemble inference within a latency budget, with heuristic fallback"""
+
+    def __init__(self, model_dir: Path = MODEL_DIR, latency_budget_ms: float = INFERENCE_LATENCY_BUDGET_MS):
+        self.model_dir = Path(model_dir)
+        self.latency_budget_ms = latency_budget_ms
+        self.state = 'cold'  # cold -> loading -> ready | missing | failed
+        self.models: Dict[str, Any] = {}
+        self.scaler = None
+        self.model_version: Optional[str] = None
+        # Bumped on every successful load so cached responses from older models are not reused
+        self.generation = 0
+        self.row_latency_ms: Optional[float] = None
+        self.call_latency_ms: Optional[float] = None
+        self.last_model_call = 0.0
+        self.served = {'model': 0, 'heuristic': 0}
+        self.fallback_reasons: Dict[str, int] = {}
+        self._hazard_latency = {hazard: INFERENCE_LATENCY.labels(hazard) for hazard in MODEL_HAZARDS.values()}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="inference")
+
+    def start_loading(self):
+        """Load the persisted models in the background (no-op once started)"""
+        if self.state in ('cold', 'failed'):
+            threading.Thread(target=self.load, name="inference-model-loader", daemon=True).start()
+
+    def load(self):
+        """Load the persisted models in the calling thread (no-op if loading or loaded)"""
+        with self._lock:
+            if self.state not in ('cold', 'failed'):
+                return
+            self.state = 'loading'
+        try:
+            files = {name: self.model_dir / f"{name}_model.joblib" for name in MODEL_HAZARDS}
+            scaler_file = self.model_dir / "scaler.joblib"
+            if not all(f.exists() for f in [*files.values(), scaler_file]):
+                logger.info(f"Trained models not found in {self.model_dir} - serving heuristics")
+                self.state = 'missing'
+                return
+
+            import joblib  # Deferred: pulls in sklearn when unpickling, only needed once models exist
+
+            models = {name: joblib.load(f) for name, f in files.items()}
+            scaler = joblib.load(scaler_file)
+            version = None
+            metadata_file = self.model_dir / "metadata.json"
+            if metadata_file.exists():
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    version = json.load(f).get('model_version')
+
+            with self._lock:
+                self.models, self.scaler, self.model_version = models, scaler, version or "unknown"
+
+            # Warm up (and seed the latency estimates) so the first request does not pay for lazy initialization
+            for rows in (1, 1, WARMUP_BATCH_ROWS):
+                self._model_risks({'latitude': np.zeros(rows), 'longitude': np.zeros(rows)})
+
+            with self._lock:
+                self.generation += 1
+                self.state = 'ready'
+            logger.info(f"Trained models v{self.model_version} loaded for inference")
+        except Exception as e:
+            logger.error(f"Failed to load trained models: {e}")
+            self.state = 'failed'
+
+    def _model_risks(self, conditions: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Trained-model probabilities per response hazard"""
+        start = time.perf_counter()
+        self.last_model_call = time.monotonic()
+        with phase("feature_assembly"), span("features.build"):
+            features = feature_matrix(conditions)
+        with phase("scaling"), span("model.scale", rows=len(features)):
+            X = self.scaler.transform(features)
+        risks = {}
+        for name, hazard in MODEL_HAZARDS.items():
+            hazard_start = time.perf_counter()
+            with phase("tree_traversal"), span("model.predict", hazard=hazard):
+                risks[hazard] = np.clip(self.models[name].predict(X) / MODEL_RISK_SCALE, 0, 1)
+            self._hazard_latency[hazard].observe(time.perf_counter() - hazard_start)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._observe_latency(elapsed_ms, len(X))
+        return risks
+
+    def _observe_latency(self, elapsed_ms: float, rows: int):
+        # Separate fixed per-call overhead from per-row cost with two running estimates
+        if rows == 1 or self.call_latency_ms is None:
+            self.call_latency_ms = elapsed_ms if self.call_latency_ms is None else (
+                (1 - LATENCY_EWMA_ALPHA) * self.call_latency_ms + LATENCY_EWMA_ALPHA * elapsed_ms
+            )
+        if rows > 1:
+            per_row = max(0.0, elapsed_ms - self.call_latency_ms) / rows
+            self.row_latency_ms = per_row if self.row_latency_ms is None else (
+                (1 - LATENCY_EWMA_ALPHA) * self.row_latency_ms + LATENCY_EWMA_ALPHA * per_row
+            )
+
+    def expected_latency_ms(self, rows: int) -> Optional[float]:
+        if self.call_latency_ms is None:
+            return None
+        return self.call_latency_ms + (self.row_latency_ms or 0.0) * rows
+
+    def _fallback_reason(self, rows: int) -> Optional[str]:
+        if self.state == 'cold':
+            self.start_loading()
+        if self.state != 'ready':
+            return f"model_{self.state}"
+        expected = self.expected_latency_ms(rows)
+        if expected is not None and expected > self.latency_budget_ms:
+            if time.monotonic() - self.last_model_call < BUDGET_PROBE_INTERVAL_S:
+                return "over_budget_expected"
+        return None
+
+    async def assess(
+        self,
+        conditions: Dict[str, Any],
+        heuristic_kwargs: Optional[Dict[str, Any]] = None
+    ) -> Tuple[HazardAssessment, Dict[str, Any]]:
+        """
+        Score locations with the trained models if possible, else the heuristics
+        Returns the assessment and an inference record {path, reason, latency_ms, model_version}.
+        """
+        rows = len(np.atleast_1d(conditions['latitude']))
+        start = time.perf_counter()
+        reason = self._fallback_reason(rows)
+
+        if reason is None:
+            loop = asyncio.get_running_loop()
+            try:
+                risks = await asyncio.wait_for(
+                    # Run in a copy of the request context so trace spans and log context follow
+                    loop.run_in_executor(self._executor, contextvars.copy_context().run, self._model_risks, conditions),
+                    timeout=self.latency_budget_ms / 1000
+                )
+                assessment = HazardAssessment(conditions, risks=risks)
+                return assessment, self._record('model', None, start, self.model_version)
+            except asyncio.TimeoutError:
+                reason = "over_budget"
+            except Exception as e:
+                logger.error(f"Model inference failed, falling back to heuristics: {e}")
+                reason = "model_error"
+
+        assessment = HazardAssessment(conditions, **(heuristic_kwargs or {}))
+        return assessment, self._record('heuristic', reason, start, HEURISTIC_MODEL_VERSION)
+
+    def _record(self, path: str, reason: Optional[str], start: float, model_version: str) -> Dict[str, Any]:
+        self.served[path] += 1
+        if reason:
+            self.fallback_reasons[reason] = self.fallback_reasons.get(reason, 0) + 1
+        return {
+            "path": path,
+            "reason": reason,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            "model_version": model_version
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "model_version": self.model_version,
+            "latency_budget_ms": self.latency_budget_ms,
+            "expected_single_row_ms": None if self.call_latency_ms is None else round(self.expected_latency_ms(1), 3),
+            "served": dict(self.served),
+            "fallback_reasons": dict(self.fallback_reasons)
+        }
+
+inference_service = InferenceService()
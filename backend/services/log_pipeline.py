@@ -0,0 +1,242 @@
+"""
+Log Pipeline
+Queue-based, non-blocking structured logging for both apps
+
+Request threads only filter a record and put it on a bounded queue; a
+QueueListener thread formats it as one JSON line and does the stream and
+rotating-file writes. Each record is stamped with the request ID and route
+template of the request that logged it. Below ERROR, volume is capped per
+route (or per logger outside requests) by a token bucket, and INFO/DEBUG
+records can be sampled per route. Anything dropped is counted in
+log_records_dropped_total, and the next record that gets through reports
+how many were suppressed before it.
+"""
+
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from services.edge import EdgeHook, route_path
+from services.fast_json import dumps
+from services.metrics import Counter
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# json (one object per line) or text (the previous human-readable format)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Empty disables the file; rotated at LOG_MAX_BYTES keeping LOG_BACKUP_COUNT files
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Records per second per route (burst of the same size); ERROR and above are never limited
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "50"))
+# Default INFO/DEBUG sample rate, and per-route overrides: "/api/predict=0.1,/api/weather=0.5"
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Scope of the request being handled; copied into threadpool calls with the context
+_request_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_request_scope", default=None)
+
+LOG_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped before reaching a handler", ("reason",)
+)
+
+# LogRecord attributes that are not user-supplied extra= fields
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "route", "suppressed"
+}
+
+def parse_sample_rates(spec: str) -> List[Tuple[str, float]]:
+    """"/api/predict=0.1,/api/weather=0.5" -> [(prefix, rate)], longest prefix first"""
+    rates = []
+    for item in spec.split(","):
+        if "=" in item:
+            prefix, rate = item.rsplit("=", 1)
+            rates.append((prefix.strip(), min(max(float(rate), 0.0), 1.0)))
+    return sorted(rates, key=lambda r: len(r[0]), reverse=True)
+
+class LogContextHook(EdgeHook):
+    """Makes the current request's scope visible to log records (request ID, route)"""
+
+    def start(self, scope):
+        return _request_scope.set(scope)
+
+    def finish(self, scope, token, status):
+        _request_scope.reset(token)
+
+class RouteLogFilter(logging.Filter):
+    """
+    Stamps request_id/route on records and applies per-route rate limits and sampling
+    Runs on the thread that logs, so it stays cheap: a few dict lookups and a lock.
+    """
+
+    def __init__(self, rate_limit: float = LOG_RATE_LIMIT, sample_rate: float = LOG_SAMPLE_RATE, sample_rates: str = LOG_SAMPLE_RATES):
+        super().__init__()
+        self.rate_limit = rate_limit
+        self.sample_rate = sample_rate
+        self.sample_rates = parse_sample_rates(sample_rates)
+        self._rate_cache: Dict[str, float] = {}
+        # key -> [tokens, last refill, records suppressed since the last one let through]
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._sampled = LOG_DROPPED.labels("sampled")
+        self._rate_limited = LOG_DROPPED.labels("rate_limited")
+
+    def _route_sample_rate(self, route: str) -> float:
+        rate = self._rate_cache.get(route)
+        if rate is None:
+            rate = next((r for prefix, r in self.sample_rates if route.startswith(prefix)), self.sample_rate)
+            self._rate_cache[route] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        scope = _request_scope.get()
+        if scope is not None:
+            record.request_id = scope.get("state", {}).get("request_id")
+            record.route = route_path(scope)
+            key = record.route
+        else:
+            record.request_id = None
+            record.route = None
+            key = record.name
+
+        if record.levelno >= logging.ERROR:
+            return True
+        if record.levelno < logging.WARNING and random.random() >= self._route_sample_rate(key):
+            self._sampled.inc()
+            return False
+        if self.rate_limit <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.rate_limit, now, 0]
+            bucket[0] = min(self.rate_limit, bucket[0] + (now - bucket[1]) * self.rate_limit)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                self._rate_limited.inc()
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = int(bucket[2])
+                bucket[2] = 0
+        return True
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message, request context and extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for attr in ("request_id", "route", "suppressed"):
+            value = getattr(record, attr, None)
+            if value is not None:
+                entry[attr] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        try:
+            return dumps(entry).decode()
+        except (TypeError, ValueError):
+            # Extras the response encoder rejects (arbitrary objects, NaN) are logged as strings
+            return json.dumps(entry, default=str, ensure_ascii=False, separators=(",", ":"))
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + ".%03dZ" % record.msecs
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks or formats on the calling thread
+    The stock prepare() copies the record and runs the formatter (and any
+    traceback formatting) before enqueueing; here the record, which only this
+    handler sees, just has its message merged with its args, so the listener
+    thread does the expensive work. The queue is an unlocked SimpleQueue;
+    past max_size records are dropped instead of waiting.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int = LOG_QUEUE_SIZE):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self._queue_full = LOG_DROPPED.labels("queue_full")
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= self.max_size:
+            self._queue_full.inc()
+            return
+        self.queue.put_nowait(record)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(level: str = LOG_LEVEL, log_file: Optional[str] = None, fmt: str = LOG_FORMAT):
+    """
+    Route the root logger (and uvicorn's loggers) through the queue pipeline
+    Safe to call again (e.g. from a startup hook, to re-adopt uvicorn's loggers);
+    log_file defaults to LOG_FILE. Call stop_logging() on shutdown to flush the queue.
+    """
+    global _listener
+    # uvicorn installs its own synchronous stream handlers (again when uvicorn.run() starts
+    # after the app module was imported); send its records, access log included, here too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    if _listener is not None:
+        return
+    log_file = LOG_FILE if log_file is None else log_file
+    formatter = JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RouteLogFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Drain the queue and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
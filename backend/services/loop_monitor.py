@@ -0,0 +1,151 @@
+"""
+Event Loop Monitor
+Scheduling-lag sampler and blocking-call detector for the asyncio loop
+
+The sampler sleeps a fixed interval and records how late it wakes up: any
+synchronous work on the loop (blocking HTTP calls, model training, disk
+writes) shows up as lag in event_loop_lag_seconds. In debug mode a watchdog
+thread also watches a fast loop heartbeat; when the heartbeat stalls longer
+than the threshold it captures the loop thread's stack, so the log names the
+exact call that blocked instead of just the latency spike.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from services.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "250"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+# Capture stacks of blocking callbacks (watchdog thread + fast heartbeat)
+LOOP_BLOCK_DEBUG = os.getenv("LOOP_BLOCK_DEBUG", "false").lower() in ("1", "true", "yes")
+
+# Innermost frames kept per captured stack
+STACK_DEPTH = 25
+RECENT_BLOCKS = 20
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled loop wake-up and when it ran",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_BLOCKS = Counter("event_loop_blocked_total", "Loop stalls longer than the block threshold", ("detector",))
+
+class LoopMonitor:
+    """Loop-lag sampler with an optional stack-capturing watchdog"""
+
+    def __init__(
+        self,
+        interval_ms: float = LOOP_LAG_INTERVAL_MS,
+        threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS,
+        debug: bool = LOOP_BLOCK_DEBUG
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.debug = debug
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.recent_blocks: Deque[Dict[str, Any]] = deque(maxlen=RECENT_BLOCKS)
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._stop = threading.Event()
+        self._lag_children = LOOP_LAG.labels()
+        self._sampler_blocks = LOOP_BLOCKS.labels("sampler")
+        self._watchdog_blocks = LOOP_BLOCKS.labels("watchdog")
+
+    def start(self):
+        """Start sampling on the running loop (call from the loop thread, e.g. a startup hook)"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._sample())
+        if self.debug:
+            self._beat()
+            threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+            logger.info(f"Loop block detection on: stacks captured for stalls over {self.threshold * 1000:.0f} ms")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._lag_children.observe(lag)
+            if lag > self.threshold:
+                self._sampler_blocks.inc()
+                if not self.debug:
+                    logger.warning(
+                        f"Event loop lag {lag * 1000:.0f} ms (threshold {self.threshold * 1000:.0f} ms); "
+                        f"set LOOP_BLOCK_DEBUG=true to capture the blocking stack"
+                    )
+
+    def _beat(self):
+        # Runs on the loop: each beat proves the loop got control back
+        self._last_beat = time.monotonic()
+        if not self._stop.is_set():
+            self._loop.call_later(self.threshold / 4, self._beat)
+
+    def _watchdog(self):
+        beat_interval = self.threshold / 4
+        reported_beat = None
+        while not self._stop.wait(beat_interval):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat - beat_interval
+            if stalled > self.threshold and last_beat != reported_beat:
+                # One report per stall: the stack is taken while the loop is still blocked
+                reported_beat = last_beat
+                self._report_block(stalled)
+
+    def _report_block(self, stalled: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame, limit=STACK_DEPTH) if frame is not None else []
+        block = {
+            "detected_at": time.time(),
+            "stalled_ms": round(stalled * 1000, 1),
+            "stack": [line.rstrip() for line in stack]
+        }
+        self.recent_blocks.append(block)
+        self._watchdog_blocks.inc()
+        logger.warning(
+            f"Event loop blocked for {block['stalled_ms']:.0f}+ ms; loop thread stack:\n" + "".join(stack)
+        )
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "debug": self.debug,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "recent_blocks": [
+                {"detected_at": b["detected_at"], "stalled_ms": b["stalled_ms"], "where": b["stack"][-1] if b["stack"] else None}
+                for b in self.recent_blocks
+            ]
+        }
+
+loop_monitor = LoopMonitor()
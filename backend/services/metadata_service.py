@@ -0,0 +1,83 @@
+"""
+Model Metadata Service
+Pre-serialized, change-aware responses for the model metrics endpoints
+
+A CachedResource builds its payload once and keeps the JSON bytes and ETag
+until its source changes: the watched file's mtime/size (stat'ed at most once
+per check interval) or a version token such as the live model's training
+timestamp. Polling dashboards get the cached bytes or a 304.
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional, Tuple
+import logging
+import os
+import threading
+import time
+from fastapi import Request, Response
+
+from services.fast_json import dumps
+from services.response_cache import conditional_response, etag_for
+
+logger = logging.getLogger(__name__)
+
+# Seconds between stat() calls on a watched file
+DEFAULT_CHECK_INTERVAL = 1.0
+
+class CachedResource:
+    """JSON payload rebuilt only when its watched file or version token changes"""
+
+    def __init__(
+        self,
+        build: Callable[[], Any],
+        watch_path: Optional[Path] = None,
+        version: Optional[Callable[[], Hashable]] = None,
+        check_interval: float = DEFAULT_CHECK_INTERVAL
+    ):
+        self.build = build
+        self.watch_path = Path(watch_path) if watch_path else None
+        self.version = version
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entry: Optional[Tuple[bytes, str]] = None
+        self._source_key = None
+        self._file_key = None
+        self._next_check = 0.0
+        self.rebuilds = 0
+
+    def _file_state(self) -> Optional[Tuple[int, int]]:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                stat = os.stat(self.watch_path)
+                self._file_key = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                self._file_key = None
+        return self._file_key
+
+    def invalidate(self):
+        """Force a rebuild on the next request (e.g. after a model swap)"""
+        with self._lock:
+            self._entry = None
+            self._next_check = 0.0
+
+    def get(self) -> Tuple[bytes, str]:
+        """Serialized payload and its ETag, rebuilt if the source changed"""
+        with self._lock:
+            source_key = (
+                self._file_state() if self.watch_path else None,
+                self.version() if self.version else None
+            )
+            if self._entry is None or source_key != self._source_key:
+                body = dumps(self.build())
+                self._entry = (body, etag_for(body))
+                self._source_key = source_key
+                self.rebuilds += 1
+                logger.debug(f"Rebuilt cached resource ({len(body)} bytes)")
+            return self._entry
+
+    def respond(self, request: Request) -> Response:
+        body, etag = self.get()
+        # Clients may keep the body but must revalidate, which costs at most a 304
+        return conditional_response(request, body, etag, "no-cache")
@@ -0,0 +1,364 @@
+"""
+Prometheus Metrics
+Process-wide counters, gauges and histograms rendered in the Prometheus text format
+
+Instruments are defined once at import time and their labelled children are
+created on first use, so recording a value is a dict lookup and a few adds on
+preallocated lists, without locks. Event-loop updates are serialized by the
+loop itself; updates from worker threads (model inference, training) rely on
+the GIL and can at worst drop an increment under contention, which is fine for
+monitoring. Point-in-time values (cache sizes, memory) are read at scrape time.
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import os
+import time
+import weakref
+
+from cachetools import TTLCache
+
+from services.edge import EdgeHook, route_path
+from services.tracing import span
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latencies (seconds): 1 ms .. 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upstream API calls are slower and bounded by their timeouts
+UPSTREAM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Per-hazard model inference (seconds): 50 us .. 1 s
+INFERENCE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Training jobs run for seconds to tens of minutes
+TRAINING_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    """Named instrument with lazily created children per label-value tuple"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        REGISTRY.register(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, values)} {_format_value(child.value)}"]
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+class Counter(_Metric):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+class CallbackGauge(_Metric):
+    """Gauge read at scrape time: callback returns {label-value tuple: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.callback().items():
+            lines.append(f"{self.name}{_label_text(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Histogram(_Metric):
+    """Bucketed distribution with fixed upper bounds"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        counts = list(child.counts)
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, values, le)} {cumulative}")
+        labels = _label_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    """All instruments of the process, in definition order"""
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric):
+        if any(existing.name == metric.name for existing in self.metrics):
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# HTTP
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+HTTP_REQUESTS = Counter("http_requests_total", "Requests served", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Request latency until the response completed", ("method", "route"))
+
+# Upstream APIs
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Calls to external APIs", ("service", "outcome"))
+UPSTREAM_LATENCY = Histogram("upstream_request_duration_seconds", "External API call latency", ("service",), UPSTREAM_BUCKETS)
+
+# Caches
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ("cache", "result"))
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries removed from caches", ("cache", "reason"))
+
+# Models
+INFERENCE_LATENCY = Histogram("model_inference_duration_seconds", "Model predict time per hazard", ("hazard",), INFERENCE_BUCKETS)
+TRAINING_JOBS = Counter("training_jobs_total", "Training jobs run", ("mode", "outcome"))
+TRAINING_DURATION = Histogram("training_job_duration_seconds", "Training job duration", ("mode",), TRAINING_BUCKETS)
+
+_caches: "weakref.WeakValueDictionary[str, TTLCache]" = weakref.WeakValueDictionary()
+
+CACHE_ENTRIES = CallbackGauge(
+    "cache_entries", "Entries currently held per cache", ("cache",),
+    lambda: {(name,): len(cache) for name, cache in list(_caches.items())}
+)
+
+_STARTED = time.time()
+
+def process_stats() -> Dict[Tuple[str, ...], float]:
+    stats = {("uptime_seconds",): time.time() - _STARTED}
+    try:
+        with open("/proc/self/statm", "r") as f:
+            stats[("resident_memory_bytes",)] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return stats
+
+PROCESS_STATS = CallbackGauge("process_stat", "Process uptime and resident memory", ("stat",), process_stats)
+
+class InstrumentedTTLCache(TTLCache):
+    """TTLCache that reports get() hits/misses, capacity evictions and expirations"""
+
+    def __init__(self, maxsize: int, ttl: float, name: str):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.name = name
+        self._hits = CACHE_REQUESTS.labels(name, "hit")
+        self._misses = CACHE_REQUESTS.labels(name, "miss")
+        self._evicted = CACHE_EVICTIONS.labels(name, "capacity")
+        self._expired = CACHE_EVICTIONS.labels(name, "expired")
+        _caches[name] = self
+
+    def get(self, key, default=None):
+        # One lookup: a separate `in` check could pass just before the entry expires
+        try:
+            value = self[key]
+        except KeyError:
+            self._misses.inc()
+            return default
+        self._hits.inc()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._evicted.inc()
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self._expired.inc(len(expired))
+        return expired
+
+class UpstreamCall:
+    """
+    Times one external API call: with UpstreamCall("usgs") as call: ...
+    Exceptions count as errors; set call.status to record an HTTP status
+    (anything but 2xx is an error). In a sampled trace the call is also an
+    upstream.<service> span. With a circuit breaker, entering raises
+    CircuitOpen while the breaker is open, and the outcome feeds its window.
+    With a quota, a call is charged to demand_key's budget only once the
+    breaker has let it through, so short-circuited calls cost nothing.
+    """
+
+    __slots__ = ("service", "status", "breaker", "quota", "demand_key", "_probe", "_start", "_span")
+
+    def __init__(self, service: str, breaker=None, quota=None, demand_key=None):
+        self.service = service
+        self.status: Optional[int] = None
+        self.breaker = breaker
+        self.quota = quota
+        self.demand_key = demand_key
+
+    def __enter__(self):
+        # Checked before timing, so short-circuited calls don't count as upstream calls
+        self._probe = self.breaker.before_call() if self.breaker is not None else False
+        if self.quota is not None:
+            try:
+                self.quota.acquire(self.demand_key)
+            except Exception:
+                if self._probe:
+                    self.breaker.release_probe()
+                raise
+        self._span = span(f"upstream.{self.service}").__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        UPSTREAM_LATENCY.labels(self.service).observe(elapsed)
+        ok = exc_type is None and (self.status is None or 200 <= self.status < 300)
+        UPSTREAM_REQUESTS.labels(self.service, "ok" if ok else "error").inc()
+        if self.breaker is not None:
+            if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+                # The request was cancelled, which says nothing about the upstream
+                if self._probe:
+                    self.breaker.release_probe()
+            else:
+                error = None if ok else (exc_type.__name__ if exc_type is not None else f"HTTP {self.status}")
+                self.breaker.record(ok, elapsed, probe=self._probe, error=error)
+        if self.status is not None:
+            self._span.set("http.status_code", self.status)
+        self._span.__exit__(exc_type, exc, tb)
+        return False
+
+class TrainingJob:
+    """Times a training job: with TrainingJob("full"): ..."""
+
+    __slots__ = ("mode", "_start")
+
+    def __init__(self, mode: str):
+        self.mode = mode
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        TRAINING_DURATION.labels(self.mode).observe(time.perf_counter() - self._start)
+        TRAINING_JOBS.labels(self.mode, "ok" if exc_type is None else "error").inc()
+        return False
+
+class MetricsHook(EdgeHook):
+    """Per-route latency histogram, request counter and in-flight gauge for EdgeMiddleware"""
+
+    def __init__(self):
+        self._in_flight = HTTP_IN_FLIGHT.labels()
+        self._status_text: Dict[int, str] = {}
+
+    def start(self, scope):
+        self._in_flight.inc()
+        return time.perf_counter()
+
+    def finish(self, scope, token, status):
+        self._in_flight.dec()
+        # Label by route template, not the raw path, to bound cardinality
+        path = route_path(scope)
+        method = scope["method"]
+        HTTP_LATENCY.labels(method, path).observe(time.perf_counter() - token)
+        status_text = self._status_text.get(status)
+        if status_text is None:
+            status_text = self._status_text[status] = str(status)
+        HTTP_REQUESTS.labels(method, path, status_text).inc()
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,218 @@
+"""
+Sampling Profiler
+On-demand statistical profiler producing collapsed (flamegraph-ready) stacks
+
+A sampler thread snapshots every thread's stack with sys._current_frames()
+at a fixed interval for the length of a session; nothing is instrumented, so
+the cost outside a session is nil and inside it is one stack walk per thread
+per tick. Each stack is prefixed with tags: thread, route, model version and
+the phase (feature assembly, scaling, tree traversal, serialization) marked
+by phase() blocks in the prediction path. Loop-thread samples are attributed
+to the request whose EdgeMiddleware frame is on the stack, which also lets a
+session profile only a sampled fraction of requests to one route.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from services.edge import EdgeHook, EdgeMiddleware, local_path, route_path
+
+logger = logging.getLogger(__name__)
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+MAX_PROFILE_SECONDS = 60.0
+MAX_STACK_DEPTH = 64
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Innermost frames in these files mean the thread is parked (selector, lock or queue wait)
+IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+EDGE_CALL_CODE = EdgeMiddleware.__call__.__code__
+
+# thread id -> active phase name; only written while a session is running
+_phases: Dict[int, str] = {}
+_active = False
+
+class phase:
+    """
+    Marks a synchronous block with a phase name in profiles: with phase("scaling"): ...
+    Free when no session is running. Do not await inside the block.
+    """
+
+    __slots__ = ("name", "_thread", "_previous")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._thread = None
+
+    def __enter__(self):
+        if _active:
+            self._thread = threading.get_ident()
+            self._previous = _phases.get(self._thread)
+            _phases[self._thread] = self.name
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._thread is not None:
+            if self._previous is None:
+                _phases.pop(self._thread, None)
+            else:
+                _phases[self._thread] = self._previous
+        return False
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(BACKEND_DIR):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    else:
+        filename = "/".join(filename.replace("\\", "/").split("/")[-2:])
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+class ProfileSession:
+    """One profiling window and its aggregated stacks"""
+
+    def __init__(self, seconds: float, interval_ms: float, route: Optional[str], fraction: float, model_version: str):
+        self.seconds = seconds
+        self.interval = interval_ms / 1000
+        # Matched against /api-stripped paths, so either app's spelling of the prefix works
+        self.route = local_path(route) if route else None
+        self.fraction = fraction
+        self.model_version = model_version
+        # Request mode: only requests marked by ProfilerHook are sampled on the loop thread
+        self.request_mode = route is not None or fraction < 1.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.ticks = 0
+        self.requests_profiled = 0
+        self.started_at = time.time()
+        self.elapsed = 0.0
+
+    def wants(self, path: str) -> bool:
+        return (self.route is None or path.startswith(self.route)) and random.random() < self.fraction
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "seconds": round(self.elapsed, 3),
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "route": self.route,
+            "fraction": self.fraction,
+            "requests_profiled": self.requests_profiled if self.request_mode else None,
+            "model_version": self.model_version,
+            "stacks": [{"stack": stack, "count": count} for stack, count in self.stacks.most_common()]
+        }
+
+class SamplingProfiler:
+    """Runs one ProfileSession at a time on a sampler thread"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval_ms = interval_ms
+        self.session: Optional[ProfileSession] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+
+    @property
+    def busy(self) -> bool:
+        return self.session is not None
+
+    async def run(
+        self,
+        seconds: float,
+        route: Optional[str] = None,
+        fraction: float = 1.0,
+        model_version: str = "unknown"
+    ) -> ProfileSession:
+        """Profile for `seconds` (call from the event loop); raises RuntimeError if a session is running"""
+        global _active
+        if self.session is not None:
+            raise RuntimeError("A profiling session is already running")
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        session = ProfileSession(seconds, self.interval_ms, route, min(max(fraction, 0.0), 1.0), model_version)
+        self.session = session
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        sampler = threading.Thread(target=self._sample, args=(session,), name="profiler-sampler", daemon=True)
+        _active = True
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self._stop.set()
+            await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+            _active = False
+            _phases.clear()
+            session.elapsed = time.perf_counter() - start
+            self.session = None
+        logger.info(f"Profile finished: {session.samples} samples over {session.elapsed:.1f}s")
+        return session
+
+    def _sample(self, session: ProfileSession):
+        me = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(session.interval):
+            session.ticks += 1
+            if session.ticks % 100 == 1:  # Refresh thread names now and then, not every tick
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = self._stack(session, thread_id, frame, names.get(thread_id, str(thread_id)))
+                if stack is not None:
+                    session.stacks[stack] += 1
+                    session.samples += 1
+
+    def _stack(self, session: ProfileSession, thread_id: int, frame, thread_name: str) -> Optional[str]:
+        if frame.f_code.co_filename.endswith(IDLE_FILES):
+            return None
+        labels: List[str] = []
+        scope = None
+        while frame is not None:
+            code = frame.f_code
+            if code is EDGE_CALL_CODE and scope is None:
+                scope = frame.f_locals.get("scope")
+            labels.append(_frame_label(code))
+            frame = frame.f_back
+        labels.reverse()
+        if len(labels) > MAX_STACK_DEPTH:
+            # Keep both ends: the root says where the work came from, the leaf what it was doing
+            keep = MAX_STACK_DEPTH // 2
+            labels = labels[:keep] + [f"[{len(labels) - 2 * keep} frames elided]"] + labels[-keep:]
+
+        thread_phase = _phases.get(thread_id)
+        if thread_id == self._loop_thread_id:
+            if session.request_mode and not (scope and scope.get("profile")):
+                return None
+            route = route_path(scope) if scope else "-"
+        else:
+            # Worker threads carry no request; in request mode keep only marked phases
+            if session.request_mode and thread_phase is None:
+                return None
+            route = "-"
+        tags = [thread_name, f"route={route}", f"model={session.model_version}"]
+        if thread_phase:
+            tags.append(f"phase={thread_phase}")
+        return ";".join(tags + labels)
+
+class ProfilerHook(EdgeHook):
+    """Marks a sampled fraction of matching requests for a request-mode profiling session"""
+
+    def start(self, scope):
+        session = profiler.session
+        if session is not None and session.request_mode and session.wants(local_path(scope["path"])):
+            scope["profile"] = True
+            session.requests_profiled += 1
+        return None
+
+profiler = SamplingProfiler()
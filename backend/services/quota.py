@@ -0,0 +1,215 @@
+"""
+Upstream Quotas
+Per-window call budgets for metered upstream APIs, with demand ranking and adaptive caching
+
+An UpstreamQuota counts calls in fixed wall-clock windows aligned the way
+the provider resets them (per minute, per UTC day). Its pressure is the
+larger of the used fraction and, for long windows, the projected fraction
+at the current rate of spending. Once a window is down to its reserve, a call
+goes out only if its cache cell is among the most-requested cells that the
+remaining calls can cover, so the scarce calls go where most users are
+waiting. CellCache holds upstream results by grid cell. As pressure rises it
+reads from coarser cells and accepts older entries, so more requests are
+answered from the cache and fewer calls are spent.
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import os
+import threading
+import time
+
+from services.metrics import CallbackGauge, Counter, InstrumentedTTLCache
+
+# OpenWeatherMap free tier: 60 calls/minute; 1,000 calls/day on One Call 3.0
+OWM_QUOTA_PER_MINUTE = int(os.getenv("OWM_QUOTA_PER_MINUTE", "60"))
+OWM_QUOTA_PER_DAY = int(os.getenv("OWM_QUOTA_PER_DAY", "1000"))
+# Share of each window kept for the most-requested cells
+QUOTA_RESERVE = float(os.getenv("QUOTA_RESERVE", "0.2"))
+
+# (minimum pressure, cell size in degrees, max entry age in seconds), narrowest first
+CACHE_TIERS: List[Tuple[float, float, float]] = [
+    (0.0, 0.01, 600),
+    (0.5, 0.05, 1800),
+    (0.75, 0.1, 3600),
+    (0.9, 0.25, 7200)
+]
+DEMAND_CELL = CACHE_TIERS[-1][1]
+
+QUOTA_DECISIONS = Counter(
+    "upstream_quota_decisions_total", "Upstream call budget decisions", ("service", "outcome")
+)
+
+class QuotaExhausted(Exception):
+    """No budget for this upstream call; serve cached or fallback data"""
+
+class QuotaWindow:
+    """Calls used in the current fixed window of `seconds`, aligned to the epoch (UTC)"""
+
+    __slots__ = ("name", "limit", "seconds", "used", "start")
+
+    def __init__(self, name: str, limit: int, seconds: float):
+        self.name = name
+        self.limit = limit
+        self.seconds = seconds
+        self.used = 0
+        self.start = 0.0
+
+    def roll(self, now: float):
+        if now - self.start >= self.seconds:
+            self.start = now - now % self.seconds
+            self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.used)
+
+    def pressure(self, now: float) -> float:
+        used = self.used / self.limit
+        if self.seconds <= 3600:
+            return min(1.0, used)
+        # Long windows: also how much would be used by the end at the current rate (first hour is noise)
+        elapsed = max((now - self.start) / self.seconds, 1 / 24)
+        return min(1.0, max(used, used / elapsed))
+
+class UpstreamQuota:
+    """Call budget for one upstream across its windows, plus recent demand per cache cell"""
+
+    def __init__(
+        self,
+        service: str,
+        windows: List[QuotaWindow],
+        reserve: float = QUOTA_RESERVE,
+        clock: Callable[[], float] = time.time
+    ):
+        self.service = service
+        self.windows = windows
+        self.reserve = reserve
+        # Wall-clock seconds: windows reset on UTC boundaries, as the provider's do
+        self.clock = clock
+        # Requests per cell, halved every minute so it tracks recent demand
+        self.demand: Dict[Hashable, float] = {}
+        self._next_decay = self.clock() + 60
+        self._lock = threading.Lock()
+        self._outcomes = {
+            outcome: QUOTA_DECISIONS.labels(service, outcome)
+            for outcome in ("allowed", "denied_exhausted", "denied_low_demand", "allowed_background", "skipped_background")
+        }
+
+    def note_demand(self, key: Hashable):
+        self.demand[key] = self.demand.get(key, 0.0) + 1
+        now = self.clock()
+        if now >= self._next_decay or len(self.demand) > 10000:
+            self._next_decay = now + 60
+            self.demand = {k: v / 2 for k, v in self.demand.items() if v >= 1}
+
+    def _rank(self, key: Optional[Hashable]) -> int:
+        """Cells with more recent demand than this one"""
+        mine = self.demand.get(key, 0.0)
+        return sum(1 for v in self.demand.values() if v > mine)
+
+    def pressure(self) -> float:
+        now = self.clock()
+        for window in self.windows:
+            window.roll(now)
+        return max((w.pressure(now) for w in self.windows), default=0.0)
+
+    def remaining(self) -> Dict[str, int]:
+        now = self.clock()
+        for window in self.windows:
+            window.roll(now)
+        return {w.name: w.remaining for w in self.windows}
+
+    def acquire(self, key: Optional[Hashable] = None):
+        """Spend one call on `key`'s cell, or raise QuotaExhausted"""
+        now = self.clock()
+        with self._lock:
+            for window in self.windows:
+                window.roll(now)
+            remaining = min((w.remaining for w in self.windows), default=1)
+            if remaining <= 0:
+                self._outcomes["denied_exhausted"].inc()
+                raise QuotaExhausted(f"{self.service} quota exhausted")
+            in_reserve = any(w.remaining <= w.limit * self.reserve for w in self.windows)
+            if in_reserve and self._rank(key) >= remaining:
+                self._outcomes["denied_low_demand"].inc()
+                raise QuotaExhausted(f"{self.service} quota low, saved for busier cells")
+            for window in self.windows:
+                window.used += 1
+        self._outcomes["allowed"].inc()
+
+    def spend_spare(self) -> bool:
+        """Spend one call for background work (health probes) only if no window is down to its reserve"""
+        now = self.clock()
+        with self._lock:
+            for window in self.windows:
+                window.roll(now)
+            if any(w.remaining <= w.limit * self.reserve for w in self.windows):
+                self._outcomes["skipped_background"].inc()
+                return False
+            for window in self.windows:
+                window.used += 1
+        self._outcomes["allowed_background"].inc()
+        return True
+
+    def cache_policy(self) -> Tuple[float, float]:
+        """(cell size in degrees, max entry age in seconds) for the current pressure"""
+        pressure = self.pressure()
+        cell, max_age = CACHE_TIERS[0][1:]
+        for threshold, tier_cell, tier_age in CACHE_TIERS:
+            if pressure >= threshold:
+                cell, max_age = tier_cell, tier_age
+        return cell, max_age
+
+    def status(self) -> Dict[str, Any]:
+        cell, max_age = self.cache_policy()
+        remaining = self.remaining()
+        return {
+            "pressure": round(self.pressure(), 3),
+            "windows": {w.name: {"limit": w.limit, "remaining": remaining[w.name]} for w in self.windows},
+            "cache_cell_degrees": cell,
+            "cache_max_age_s": max_age
+        }
+
+class CellCache:
+    """Upstream results by grid cell; cell size and acceptable age follow the quota's pressure"""
+
+    def __init__(self, name: str, quota: UpstreamQuota, maxsize: int = 2048):
+        self.quota = quota
+        # Each result is stored under every tier's cell, so a coarser lookup finds it too
+        self._entries = InstrumentedTTLCache(
+            maxsize=maxsize * len(CACHE_TIERS), ttl=max(age for _, _, age in CACHE_TIERS), name=name
+        )
+
+    @staticmethod
+    def cell_key(lat: float, lon: float, cell: float) -> Tuple[float, int, int]:
+        return (cell, round(lat / cell), round(lon / cell))
+
+    def get(self, lat: float, lon: float) -> Tuple[Optional[Any], Tuple[float, int, int]]:
+        """(cached value or None, the demand cell to charge a fetch to); counts as demand"""
+        # Demand is tracked on the coarsest grid, so it stays comparable when the cache cell size changes
+        demand_key = self.cell_key(lat, lon, DEMAND_CELL)
+        self.quota.note_demand(demand_key)
+        cell, max_age = self.quota.cache_policy()
+        entry = self._entries.get(self.cell_key(lat, lon, cell))
+        if entry is not None and time.monotonic() - entry[0] <= max_age:
+            return entry[1], demand_key
+        return None, demand_key
+
+    def put(self, lat: float, lon: float, value: Any):
+        now = time.monotonic()
+        for _, cell, _ in CACHE_TIERS:
+            self._entries[self.cell_key(lat, lon, cell)] = (now, value)
+
+owm_quota = UpstreamQuota("openweathermap", [
+    QuotaWindow("minute", OWM_QUOTA_PER_MINUTE, 60),
+    QuotaWindow("day", OWM_QUOTA_PER_DAY, 86400)
+])
+
+QUOTA_REMAINING = CallbackGauge(
+    "upstream_quota_remaining", "Upstream calls left in the current quota window", ("service", "window"),
+    lambda: {(owm_quota.service, window): left for window, left in owm_quota.remaining().items()}
+)
+QUOTA_PRESSURE = CallbackGauge(
+    "upstream_quota_pressure", "Quota pressure, 0 (idle) to 1 (exhausted or on pace to be)", ("service",),
+    lambda: {(owm_quota.service,): owm_quota.pressure()}
+)
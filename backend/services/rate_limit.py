@@ -0,0 +1,211 @@
+"""
+Rate Limiting
+Per-client token buckets in a sharded in-memory table, applied at the edge
+
+Clients are identified by a known API key (X-API-Key, listed in
+RATE_LIMIT_API_KEYS) or else by IP address. Each (client, rule) pair has a
+token bucket that is refilled lazily when the client next shows up, so
+idle clients cost nothing. Buckets live in a fixed number of dict shards.
+Every COMPACT_INTERVAL seconds one shard is swept for buckets that have
+refilled completely (indistinguishable from a new client) and they are
+dropped, which keeps memory proportional to recently active clients without
+a full-table pause. Responses carry RateLimit-* headers; a client over its
+limit gets 429 with Retry-After before the request reaches admission
+control or the router.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import os
+import time
+
+from services.edge import (
+    OPERATIONAL_PREFIXES, EdgeHook, EdgeReject, encode_headers, header_value, local_path
+)
+from services.fast_json import dumps
+from services.metrics import CallbackGauge, Counter
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Per-route overrides: "prefix=requests/unit[:burst]", e.g. "/weather=30/min:10,/predict=5/s"
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")
+# API keys that get their own buckets; any other X-API-Key is ignored (keys would be free new identities)
+RATE_LIMIT_API_KEYS = frozenset(k.strip() for k in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if k.strip())
+# Use the first X-Forwarded-For address (only behind a proxy that sets it, e.g. Railway)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+
+SHARDS = 16
+# One shard swept per interval, so the whole table every SHARDS * COMPACT_INTERVAL seconds
+COMPACT_INTERVAL = 1.0
+API_KEY_HEADER = b"x-api-key"
+FORWARDED_FOR_HEADER = b"x-forwarded-for"
+UNITS = {"s": 1.0, "sec": 1.0, "min": 60.0, "m": 60.0, "h": 3600.0, "hour": 3600.0}
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_requests_total", "Rate limiter decisions per rule", ("rule", "outcome")
+)
+
+class RateRule:
+    """Refill `rate` tokens per second up to `burst`; one token per request"""
+
+    __slots__ = ("name", "prefix", "rate", "burst", "window", "policy_header", "_allowed", "_limited")
+
+    def __init__(self, prefix: str, requests: float, per_seconds: float, burst: Optional[int] = None):
+        self.name = prefix or "default"
+        self.prefix = prefix
+        self.rate = requests / per_seconds
+        self.burst = int(burst if burst is not None else max(1, requests))
+        # Seconds for an empty bucket to refill completely
+        self.window = self.burst / self.rate
+        self.policy_header = (b"ratelimit-policy", f"{self.burst};w={math.ceil(self.window)}".encode())
+        self._allowed = RATE_LIMIT_DECISIONS.labels(self.name, "allowed")
+        self._limited = RATE_LIMIT_DECISIONS.labels(self.name, "limited")
+
+def parse_rate_limits(spec: str) -> List[RateRule]:
+    """"/weather=30/min:10,/predict=5/s" -> rules"""
+    rules = []
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        prefix, limit = (part.strip() for part in item.split("=", 1))
+        limit, _, burst = limit.partition(":")
+        requests, _, unit = limit.partition("/")
+        if unit not in UNITS:
+            raise ValueError(f"Unknown rate limit unit '{unit}' in '{item}' (use s, min or h)")
+        rules.append(RateRule(prefix, float(requests), UNITS[unit], int(burst) if burst else None))
+    return rules
+
+def default_rate_rules() -> List[RateRule]:
+    """Tight on routes that spend upstream quota, looser elsewhere; RATE_LIMITS overrides by prefix"""
+    rules = {
+        rule.prefix: rule for rule in [
+            RateRule("/weather", 60, 60, burst=20),
+            RateRule("/earthquakes", 60, 60, burst=20),
+            RateRule("/external", 60, 60, burst=20),
+            RateRule("/predict", 120, 60, burst=30),
+            RateRule("", 300, 60, burst=60)
+        ]
+    }
+    for rule in parse_rate_limits(RATE_LIMITS):
+        rules[rule.prefix] = rule
+    # Longest prefix first; the "" rule is the default
+    return sorted(rules.values(), key=lambda r: len(r.prefix), reverse=True)
+
+class RateLimiter:
+    """Token buckets keyed by (client, rule) in SHARDS dicts: key -> [tokens, last refill]"""
+
+    def __init__(self, rules: Optional[List[RateRule]] = None, shards: int = SHARDS):
+        self.rules = rules or default_rate_rules()
+        self.shards: List[Dict[Tuple[str, str], List[float]]] = [{} for _ in range(shards)]
+        self._windows = {rule.name: rule.window for rule in self.rules}
+        self._rule_cache: Dict[str, Optional[RateRule]] = {}
+        self._next_compaction = time.monotonic() + COMPACT_INTERVAL
+        self._next_shard = 0
+
+    def rule_for(self, path: str) -> Optional[RateRule]:
+        """Rule for a request path, or None for operational routes that are never limited"""
+        rule = self._rule_cache.get(path, False)
+        if rule is False:
+            local = local_path(path)
+            if local.startswith(OPERATIONAL_PREFIXES):
+                rule = None
+            else:
+                rule = next((r for r in self.rules if local.startswith(r.prefix)), None)
+            if len(self._rule_cache) < 4096:  # Path parameters make the key space open-ended
+                self._rule_cache[path] = rule
+        return rule
+
+    def take(self, client: str, rule: RateRule, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Spend one token; returns (allowed, tokens left) after a lazy refill"""
+        now = time.monotonic() if now is None else now
+        key = (client, rule.name)
+        shard = self.shards[hash(key) % len(self.shards)]
+        bucket = shard.get(key)
+        if bucket is None:
+            tokens = rule.burst
+            bucket = shard[key] = [tokens, now]
+        else:
+            tokens = min(rule.burst, bucket[0] + (now - bucket[1]) * rule.rate)
+            bucket[1] = now
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        bucket[0] = tokens
+
+        if now >= self._next_compaction:
+            self._next_compaction = now + COMPACT_INTERVAL
+            self.compact_shard(now)
+        return allowed, tokens
+
+    def compact_shard(self, now: Optional[float] = None) -> int:
+        """Drop fully refilled buckets from the next shard in turn; returns how many went"""
+        now = time.monotonic() if now is None else now
+        shard = self.shards[self._next_shard]
+        self._next_shard = (self._next_shard + 1) % len(self.shards)
+        windows = self._windows
+        stale = [key for key, (tokens, last) in shard.items() if now - last >= windows.get(key[1], 0)]
+        for key in stale:
+            del shard[key]
+        return len(stale)
+
+    def entries(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+def client_id(scope: Dict[str, Any]) -> str:
+    """Known API key, else the (optionally forwarded) client IP"""
+    api_key = header_value(scope, API_KEY_HEADER)
+    if api_key is not None:
+        key = api_key.decode("latin-1")
+        if key in RATE_LIMIT_API_KEYS:
+            return f"key:{key}"
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = header_value(scope, FORWARDED_FOR_HEADER)
+        if forwarded:
+            return forwarded.split(b",", 1)[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class RateLimitHook(EdgeHook):
+    """Applies the limiter in EdgeMiddleware: RateLimit-* headers, or 429 via EdgeReject"""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None):
+        self.limiter = limiter or rate_limiter
+        self._body = dumps({"detail": "Rate limit exceeded, slow down"})
+
+    def start(self, scope):
+        if not RATE_LIMIT_ENABLED or scope["method"] == "OPTIONS":
+            return None
+        rule = self.limiter.rule_for(scope["path"])
+        if rule is None:
+            return None
+        allowed, tokens = self.limiter.take(client_id(scope), rule)
+        token = (rule, tokens)
+        if allowed:
+            rule._allowed.inc()
+            return token
+        rule._limited.inc()
+        retry_after = math.ceil((1 - tokens) / rule.rate)
+        headers = encode_headers({
+            "Content-Type": "application/json",
+            "Content-Length": str(len(self._body)),
+            "Retry-After": str(retry_after)
+        })
+        raise EdgeReject(429, headers, self._body, token=token)
+
+    def response_headers(self, scope, token, status):
+        if token is None:
+            return None
+        rule, tokens = token
+        return [
+            (b"ratelimit-limit", b"%d" % rule.burst),
+            (b"ratelimit-remaining", b"%d" % int(tokens)),
+            # Seconds until the bucket is full again
+            (b"ratelimit-reset", b"%d" % math.ceil((rule.burst - tokens) / rule.rate)),
+            rule.policy_header
+        ]
+
+rate_limiter = RateLimiter()
+
+RATE_LIMIT_ENTRIES = CallbackGauge(
+    "rate_limit_buckets", "Client token buckets held in memory", (),
+    lambda: {(): rate_limiter.entries()}
+)
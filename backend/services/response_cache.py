@@ -0,0 +1,114 @@
+"""
+Prediction Response Cache
+Time-bucketed memoization and HTTP caching headers for the prediction routes
+
+With deterministic predictions enabled, the heuristic jitter is a hash of the
+request inputs and the current time bucket, so a response is stable until the
+bucket rolls over. Responses are serialized once per (route, inputs, bucket),
+served with a strong ETag and a Cache-Control max-age ending at the bucket
+boundary, and answered with 304 when the client already holds them. Only
+GET and HEAD responses carry validators: POST predictions are still memoized
+but are sent with no-store. Deterministic predictions are opt-in
+(DETERMINISTIC_PREDICTIONS=true), since they replace per-request jitter.
+"""
+
+from typing import Any, Callable, Dict, Hashable, Optional
+import hashlib
+import inspect
+import json
+import os
+import time
+from fastapi import Request, Response
+
+from services.fast_json import dumps
+from services.metrics import InstrumentedTTLCache
+from services.profiler import phase
+from services.tracing import span
+
+DETERMINISTIC_PREDICTIONS = os.getenv("DETERMINISTIC_PREDICTIONS", "false").lower() in ("1", "true", "yes")
+PREDICTION_BUCKET_SECONDS = int(os.getenv("PREDICTION_BUCKET_SECONDS", "900"))
+
+def current_bucket() -> int:
+    """Index of the current prediction time bucket"""
+    return int(time.time() // PREDICTION_BUCKET_SECONDS)
+
+def seconds_until_next_bucket() -> int:
+    return max(1, int(PREDICTION_BUCKET_SECONDS - time.time() % PREDICTION_BUCKET_SECONDS))
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag for a serialized response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match list names etag (weak comparison: W/ is ignored, * matches anything)"""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def conditional_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """
+    JSON response for pre-serialized bytes, or 304 when If-None-Match already holds the ETag
+    Only GET and HEAD are conditional; other methods get the body with no-store.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def request_key(payload: Any) -> str:
+    """Stable digest of a JSON-compatible request payload"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+async def _resolve(result: Any) -> Any:
+    return await result if inspect.isawaitable(result) else result
+
+class ResponseCache:
+    """Serialized responses keyed by (key, time bucket), with ETag revalidation"""
+
+    def __init__(self, name: str, maxsize: int = 1024):
+        self.entries = InstrumentedTTLCache(maxsize=maxsize, ttl=PREDICTION_BUCKET_SECONDS, name=name)
+        self.hits = 0
+        self.misses = 0
+
+    async def respond(self, request: Request, key: Hashable, compute: Callable[[], Any], bucket: Optional[int] = None) -> Response:
+        """
+        Serve compute()'s result for key, computing it at most once per bucket
+        compute (sync or async) runs only on a miss; pass the bucket it used so
+        a request that straddles a bucket boundary is cached under the right one.
+        """
+        if not DETERMINISTIC_PREDICTIONS:
+            payload = await _resolve(compute())
+            with phase("serialization"), span("response.serialize"):
+                body = dumps(payload)
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+        bucket = current_bucket() if bucket is None else bucket
+        with span("cache.lookup", cache=self.entries.name) as lookup:
+            entry = self.entries.get((key, bucket))
+            lookup.set("hit", entry is not None)
+        if entry is None:
+            self.misses += 1
+            payload = await _resolve(compute())
+            with phase("serialization"), span("response.serialize"):
+                body = dumps(payload)
+            entry = (body, etag_for(body))
+            self.entries[(key, bucket)] = entry
+        else:
+            self.hits += 1
+
+        body, etag = entry
+        return conditional_response(request, body, etag, f"public, max-age={seconds_until_next_bucket()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
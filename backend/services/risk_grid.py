@@ -0,0 +1,153 @@
+"""
+Risk Grid Service
+Dense per-hazard risk rasters over a bounding box, assembled from cached tiles
+
+Cells sit on a global lattice (multiples of the resolution), grouped into
+fixed-size tiles. Each tile is scored in one vectorized HazardAssessment pass
+and cached, so panning or zooming back over a viewport reuses computed cells.
+Requests are capped both in cells returned and in tiles touched, since the
+work (and the cache churn) follows the tiles rather than the cells.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import math
+import numpy as np
+
+from services.hazard_engine import HAZARDS, HazardAssessment, InputHashNoise
+from services.metrics import InstrumentedTTLCache
+from services.response_cache import PREDICTION_BUCKET_SECONDS, current_bucket
+
+# Cells per tile side
+TILE_CELLS = 64
+# Largest raster served in one response
+MAX_GRID_CELLS = 250_000
+# Most tiles scored or read for one response (a thin strip can touch many tiles for few cells)
+MAX_GRID_TILES = 64
+MIN_RESOLUTION = 0.01
+
+# Environmental conditions assumed for every cell unless overridden
+GRID_BASE_CONDITIONS = {
+    "temperature": 22.0,
+    "humidity": 55.0,
+    "wind_speed": 8.0,
+    "pressure": 1013.0
+}
+
+# Compact encodings: numpy dtype and the factor mapping stored values to probabilities
+ENCODINGS = {
+    "uint8": (np.uint8, 1 / 255),
+    "float32": (np.float32, 1.0)
+}
+
+# ~4096 cells x 4 hazards x 4 bytes = 64KB per tile; keys carry the time bucket
+tile_cache = InstrumentedTTLCache(maxsize=512, ttl=PREDICTION_BUCKET_SECONDS, name="risk_grid_tiles")
+
+def _cell_range(low: float, high: float, resolution: float) -> Tuple[int, int]:
+    """Indices of the first and last lattice cells inside [low, high]"""
+    first = math.ceil(low / resolution - 1e-9)
+    last = math.floor(high / resolution + 1e-9)
+    return first, last
+
+def _compute_tile(key: Tuple) -> np.ndarray:
+    """Probabilities for one tile as a (hazard, lat, lon) float32 array"""
+    tile_lat, tile_lon, resolution, month, bucket, conditions = key
+    lat = (tile_lat * TILE_CELLS + np.arange(TILE_CELLS)) * resolution
+    lon = (tile_lon * TILE_CELLS + np.arange(TILE_CELLS)) * resolution
+    lat_grid, lon_grid = np.meshgrid(lat, lon, indexing='ij')
+    cells = {**dict(conditions), "latitude": lat_grid.ravel(), "longitude": lon_grid.ravel()}
+
+    # Input-derived jitter: a cell scores the same as a point prediction with the same inputs
+    assessment = HazardAssessment(cells, month=month, rng=InputHashNoise(cells, bucket))
+    return np.stack([
+        assessment.probabilities[hazard].reshape(TILE_CELLS, TILE_CELLS) for hazard in HAZARDS
+    ]).astype(np.float32)
+
+def _get_tile(key: Tuple) -> Tuple[np.ndarray, bool]:
+    tile = tile_cache.get(key)
+    if tile is not None:
+        return tile, True
+    tile = _compute_tile(key)
+    tile_cache[key] = tile
+    return tile, False
+
+def risk_grid(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    resolution: float,
+    conditions: Dict[str, float],
+    encoding: str = "uint8",
+    bucket: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Per-hazard risk raster for the lattice cells inside a bounding box
+    Rows run south to north and columns west to east; each hazard's raster is
+    base64-encoded little-endian in the requested encoding. Jitter is derived
+    from each cell's inputs and the time bucket. Raises ValueError for invalid
+    or oversized requests.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {sorted(ENCODINGS)}")
+    if resolution < MIN_RESOLUTION:
+        raise ValueError(f"resolution must be at least {MIN_RESOLUTION} degrees")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        raise ValueError("bbox must satisfy -90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180")
+
+    lat_first, lat_last = _cell_range(min_lat, max_lat, resolution)
+    lon_first, lon_last = _cell_range(min_lon, max_lon, resolution)
+    rows, cols = lat_last - lat_first + 1, lon_last - lon_first + 1
+    if rows <= 0 or cols <= 0:
+        raise ValueError("bbox contains no grid cells at this resolution")
+    if rows * cols > MAX_GRID_CELLS:
+        raise ValueError(f"grid of {rows}x{cols} cells exceeds the {MAX_GRID_CELLS} cell limit")
+    tile_rows = lat_last // TILE_CELLS - lat_first // TILE_CELLS + 1
+    tile_cols = lon_last // TILE_CELLS - lon_first // TILE_CELLS + 1
+    if tile_rows * tile_cols > MAX_GRID_TILES:
+        raise ValueError(
+            f"grid spans {tile_rows}x{tile_cols} tiles of {TILE_CELLS} cells, exceeding the {MAX_GRID_TILES} tile limit; "
+            "use a coarser resolution or a smaller bbox"
+        )
+
+    month = datetime.now().month
+    bucket = current_bucket() if bucket is None else bucket
+    frozen_conditions = tuple(sorted(conditions.items()))
+    grid = np.empty((len(HAZARDS), rows, cols), dtype=np.float32)
+    tiles: List[bool] = []
+
+    for tile_lat in range(lat_first // TILE_CELLS, lat_last // TILE_CELLS + 1):
+        for tile_lon in range(lon_first // TILE_CELLS, lon_last // TILE_CELLS + 1):
+            tile, cached = _get_tile((tile_lat, tile_lon, resolution, month, bucket, frozen_conditions))
+            tiles.append(cached)
+
+            # Overlap of this tile with the requested cell range, in global cell indices
+            lat_start = max(lat_first, tile_lat * TILE_CELLS)
+            lat_end = min(lat_last, (tile_lat + 1) * TILE_CELLS - 1) + 1
+            lon_start = max(lon_first, tile_lon * TILE_CELLS)
+            lon_end = min(lon_last, (tile_lon + 1) * TILE_CELLS - 1) + 1
+            grid[:, lat_start - lat_first:lat_end - lat_first, lon_start - lon_first:lon_end - lon_first] = tile[
+                :,
+                lat_start - tile_lat * TILE_CELLS:lat_end - tile_lat * TILE_CELLS,
+                lon_start - tile_lon * TILE_CELLS:lon_end - tile_lon * TILE_CELLS
+            ]
+
+    dtype, scale = ENCODINGS[encoding]
+    encoded = np.rint(grid / scale).astype(dtype) if dtype is np.uint8 else grid.astype(dtype)
+    little_endian = encoded.astype(np.dtype(dtype).newbyteorder('<'), copy=False)
+
+    return {
+        "bbox": [min_lat, min_lon, max_lat, max_lon],
+        "resolution": resolution,
+        "origin": [round(lat_first * resolution, 6), round(lon_first * resolution, 6)],
+        "shape": [rows, cols],
+        "hazards": HAZARDS,
+        "encoding": encoding,
+        "scale": scale,
+        "data": {
+            hazard: base64.b64encode(little_endian[h].tobytes()).decode('ascii')
+            for h, hazard in enumerate(HAZARDS)
+        },
+        "tiles": {"total": len(tiles), "cached": sum(tiles)}
+    }
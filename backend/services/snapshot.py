@@ -0,0 +1,101 @@
+"""
+Background Snapshots
+Global payloads rebuilt on an interval and served as pre-serialized bytes
+
+A Snapshot runs its build function on a daemon thread every interval and
+keeps the result as JSON bytes with a version number and an ETag. Requests
+never build anything: they get the current bytes, or 304 when the client
+already holds that version, so the endpoint's cost does not grow with
+traffic or with how slow the sources behind it are. A failed rebuild keeps
+serving the previous version.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+import math
+import threading
+import time
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from services.fast_json import dumps
+from services.metrics import CallbackGauge
+from services.response_cache import conditional_response, etag_for
+
+logger = logging.getLogger(__name__)
+
+_snapshots: Dict[str, "Snapshot"] = {}
+
+class Snapshot:
+    """Payload from build(), refreshed every `interval` seconds in the background"""
+
+    def __init__(self, name: str, build: Callable[[], Dict[str, Any]], interval: float):
+        self.name = name
+        self.build = build
+        self.interval = interval
+        self.version = 0
+        self.built_at: Optional[float] = None
+        self.failures = 0
+        # (body, etag), swapped in whole so readers never see a half-updated pair
+        self._entry: Optional[Tuple[bytes, str]] = None
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        _snapshots[name] = self
+
+    def refresh(self, only_if_empty: bool = False):
+        """Build and publish a new version; on failure the previous one stays"""
+        with self._refresh_lock:
+            if only_if_empty and self._entry is not None:
+                return  # Another request built it while this one waited
+            start = time.perf_counter()
+            try:
+                payload = self.build()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Snapshot {self.name} refresh failed: {e}")
+                return
+            payload["version"] = self.version + 1
+            body = dumps(payload)
+            self._entry = (body, etag_for(body))
+            self.version += 1
+            self.built_at = time.monotonic()
+            logger.debug(f"Snapshot {self.name} v{self.version} built in {(time.perf_counter() - start) * 1000:.0f} ms ({len(body)} bytes)")
+
+    def start(self):
+        """Refresh on a daemon thread every interval (no-op if already started)"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"snapshot-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def age(self) -> Optional[float]:
+        return None if self.built_at is None else time.monotonic() - self.built_at
+
+    async def respond(self, request: Request) -> Response:
+        entry = self._entry
+        if entry is None:
+            # Only before the first background build (or without one): build once, off the loop
+            await run_in_threadpool(self.refresh, True)
+            entry = self._entry
+            if entry is None:
+                return Response(status_code=503, headers={"Retry-After": "5"})
+        body, etag = entry
+        # Shared caches may hold it until the next refresh is due
+        max_age = max(0, math.ceil(self.interval - (self.age() or 0)))
+        return conditional_response(request, body, etag, f"public, max-age={max_age}")
+
+SNAPSHOT_AGE = CallbackGauge(
+    "snapshot_age_seconds", "Seconds since each background snapshot was rebuilt", ("snapshot",),
+    lambda: {(name,): s.age() for name, s in list(_snapshots.items()) if s.built_at is not None}
+)
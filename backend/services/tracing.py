@@ -0,0 +1,295 @@
+"""
+Request Tracing
+Lightweight in-process span tracing with ring-buffer and Zipkin file exporters
+
+A sampled request gets a trace whose root span covers the whole request;
+span() blocks inside it (cache lookups, upstream calls, feature building,
+scaling, each model's predict, response building) become child spans,
+with parents tracked through a ContextVar so they follow awaits, gathered
+tasks and threadpool calls. Unsampled requests pay one ContextVar lookup
+per span() and get a shared no-op span. Requests are sampled at
+TRACE_SAMPLE_RATE, or always when the caller sends a W3C traceparent header
+with the sampled flag; sampled responses carry traceparent so the trace can
+be looked up under /debug/traces.
+"""
+
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Sequence
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from services.edge import EdgeHook, header_value, route_path
+from services.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+# Finished traces kept in memory for /debug/traces
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "256"))
+# Optional Zipkin v2 JSON export: one JSON array of spans per line
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "alert-aid-backend")
+MAX_SPANS_PER_TRACE = 500
+
+TRACEPARENT_HEADER = b"traceparent"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation in a trace; use as a context manager via span()"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "duration_ns", "attributes", "error", "_token")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.duration_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.duration_ns is None:
+            self.duration_ns = time.time_ns() - self.start_ns
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.end()
+        _current_span.reset(self._token)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_us": self.start_ns // 1000,
+            "duration_ms": round(self.duration_ns / 1e6, 3) if self.duration_ns is not None else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+class _NoopSpan:
+    """Returned by span() outside a sampled trace; every operation is a no-op"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+class Trace:
+    """The spans recorded for one sampled request"""
+
+    def __init__(self, trace_id: Optional[str] = None, remote_parent_id: Optional[str] = None):
+        self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+        self.remote_parent_id = remote_parent_id
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+
+    def start_span(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> Span:
+        new_span = Span(self, name, parent_id, attributes)
+        # list.append is atomic, so spans from threadpool calls need no lock
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append(new_span)
+        else:
+            self.dropped_spans += 1
+        return new_span
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    def summary(self) -> Dict[str, Any]:
+        root = self.root
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "route": root.attributes.get("http.route"),
+            "status": root.attributes.get("http.status_code"),
+            "started_at": root.start_ns / 1e9,
+            "duration_ms": round(root.duration_ns / 1e6, 3) if root.duration_ns is not None else None,
+            "spans": len(self.spans),
+            "error": any(s.error for s in self.spans)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.summary(), "dropped_spans": self.dropped_spans, "span_list": [s.to_dict() for s in self.spans]}
+
+    def to_zipkin(self, service_name: str = TRACE_SERVICE_NAME) -> List[Dict[str, Any]]:
+        """Zipkin v2 JSON spans (accepted by Zipkin, Jaeger and most trace viewers)"""
+        endpoint = {"serviceName": service_name}
+        spans = []
+        for s in self.spans:
+            tags = {k: str(v) for k, v in s.attributes.items()}
+            if s.error:
+                tags["error"] = s.error
+            entry = {
+                "traceId": self.trace_id,
+                "id": s.span_id,
+                "name": s.name,
+                "timestamp": s.start_ns // 1000,
+                "duration": max(1, (s.duration_ns or 0) // 1000),
+                "localEndpoint": endpoint,
+                "tags": tags
+            }
+            parent_id = s.parent_id or (self.remote_parent_id if s is self.root else None)
+            if parent_id:
+                entry["parentId"] = parent_id
+            if s is self.root:
+                entry["kind"] = "SERVER"
+            spans.append(entry)
+        return spans
+
+def span(name: str, **attributes) -> Any:
+    """
+    Child span of the current span: with span("model.predict", hazard="flood"): ...
+    Outside a sampled trace this returns NOOP_SPAN, so callers never branch.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return parent.trace.start_span(name, parent.span_id, attributes)
+
+def current_span() -> Any:
+    """The innermost active span, or NOOP_SPAN, for adding attributes"""
+    return _current_span.get() or NOOP_SPAN
+
+def parse_traceparent(value: Optional[bytes]):
+    """(trace_id, parent_id, sampled) from a W3C traceparent header, or None if malformed"""
+    if not value:
+        return None
+    parts = value.decode("latin-1").strip().lower().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+class RingBufferExporter:
+    """Keeps the most recent finished traces in memory"""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        self.traces: Deque[Trace] = deque(maxlen=size)
+
+    def export(self, trace: Trace):
+        self.traces.append(trace)
+
+    def find(self, trace_id: str) -> Optional[Trace]:
+        for trace in reversed(self.traces):
+            if trace.trace_id == trace_id:
+                return trace
+        return None
+
+class ZipkinFileExporter:
+    """Appends each trace as a Zipkin v2 JSON array line, written on a background thread"""
+
+    def __init__(self, path: str, service_name: str = TRACE_SERVICE_NAME):
+        self.path = path
+        self.service_name = service_name
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._write, name="trace-file-exporter", daemon=True).start()
+
+    def export(self, trace: Trace):
+        self._queue.put(trace)
+
+    def _write(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                with open(self.path, "ab") as f:
+                    f.write(dumps(trace.to_zipkin(self.service_name)) + b"\n")
+            except Exception as e:
+                logger.warning(f"Trace export to {self.path} failed: {e}")
+
+class Tracer:
+    """Sampling decision and export for request traces"""
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, exporters: Sequence[Any] = ()):
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters)
+        self.sampled = 0
+
+    def start_trace(self, name: str, traceparent: Optional[bytes] = None, **attributes) -> Optional[Span]:
+        """Root span for a new trace if the request is sampled, else None"""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id = parent_id = None
+            sampled = False
+        if not sampled and random.random() >= self.sample_rate:
+            return None
+        self.sampled += 1
+        trace = Trace(trace_id, parent_id)
+        return trace.start_span(name, None, attributes)
+
+    def finish_trace(self, root: Span):
+        root.end()
+        for exporter in self.exporters:
+            exporter.export(root.trace)
+
+recent_traces = RingBufferExporter()
+tracer = Tracer(exporters=[recent_traces] + ([ZipkinFileExporter(TRACE_FILE)] if TRACE_FILE else []))
+
+class TracingHook(EdgeHook):
+    """Opens a root span for sampled requests and echoes traceparent on their responses"""
+
+    def __init__(self, active_tracer: Optional[Tracer] = None):
+        self.tracer = active_tracer or tracer
+
+    def start(self, scope):
+        root = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}", header_value(scope, TRACEPARENT_HEADER),
+            **{"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        if root is None:
+            return None
+        root.__enter__()
+        return root
+
+    def response_headers(self, scope, token, status):
+        if token is None:
+            return None
+        return [(TRACEPARENT_HEADER, f"00-{token.trace.trace_id}-{token.span_id}-01".encode())]
+
+    def finish(self, scope, token, status):
+        if token is None:
+            return
+        route = route_path(scope)
+        token.name = f"{scope['method']} {route}"
+        token.set("http.route", route)
+        token.set("http.status_code", status)
+        request_id = scope.get("state", {}).get("request_id")
+        if request_id:
+            token.set("request_id", request_id)
+        token.__exit__(None, None, None)
+        self.tracer.finish_trace(token)
@@ -0,0 +1,181 @@
+"""
+Upstream Health Probing
+Scheduled background checks of external APIs, served from memory
+
+Each upstream registers a cheap check (one small request returning an HTTP
+status). A daemon thread runs every check on its own interval, keeps the last
+UPSTREAM_PROBE_WINDOW results, and after each probe rebuilds that upstream's
+snapshot: status, availability, and p50/p95/p99 latency. Status endpoints
+read the snapshots, so a status poll costs no upstream round trip and never
+blocks the event loop. Probes bypass the circuit breakers so they keep
+checking while a breaker is open; the two views are reported side by side.
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from services.metrics import CallbackGauge, UpstreamCall
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_PROBE_ENABLED = os.getenv("UPSTREAM_PROBE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Results kept per upstream for availability and percentiles
+UPSTREAM_PROBE_WINDOW = int(os.getenv("UPSTREAM_PROBE_WINDOW", "20"))
+UPSTREAM_PROBE_TIMEOUT = float(os.getenv("UPSTREAM_PROBE_TIMEOUT", "5"))
+
+# Consecutive failures before an upstream is reported offline rather than degraded
+OFFLINE_AFTER_FAILURES = 3
+
+def _percentile(ordered, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class ProbeTarget:
+    """One upstream check and its recent results: (ok, seconds) per probe"""
+
+    def __init__(
+        self,
+        name: str,
+        service: str,
+        check: Callable[[float], int],
+        interval: float,
+        timeout: float,
+        slow_seconds: float,
+        budget: Optional[Callable[[], bool]] = None
+    ):
+        self.name = name
+        self.service = service
+        self.check = check
+        self.budget = budget
+        self.skipped = 0
+        self.interval = interval
+        self.timeout = timeout
+        self.slow_seconds = slow_seconds
+        self.results: Deque[Tuple[bool, float]] = deque(maxlen=UPSTREAM_PROBE_WINDOW)
+        self.consecutive_failures = 0
+        self.next_due = 0.0
+        self.snapshot: Dict[str, Any] = {"status": "unknown", "note": "Not probed yet", "interval_s": interval}
+
+    def probe(self):
+        if self.budget is not None and not self.budget():
+            # No spare upstream quota: keep the last result rather than spend calls users need
+            self.skipped += 1
+            self.snapshot = {**self.snapshot, "skipped_probes": self.skipped}
+            return
+        error = None
+        status_code = None
+        start = time.perf_counter()
+        try:
+            with UpstreamCall(self.service) as call:
+                status_code = call.status = self.check(self.timeout)
+            ok = 200 <= status_code < 300
+            if not ok:
+                error = f"HTTP {status_code}"
+        except Exception as e:
+            ok = False
+            # The class name only: messages can carry the request URL, API key included
+            error = type(e).__name__
+        elapsed = time.perf_counter() - start
+        self.results.append((ok, elapsed))
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+        self.snapshot = self._build_snapshot(ok, elapsed, status_code, error)
+
+    def _build_snapshot(self, ok: bool, elapsed: float, status_code: Optional[int], error: Optional[str]) -> Dict[str, Any]:
+        successes = [seconds for result_ok, seconds in self.results if result_ok]
+        availability = len(successes) / len(self.results)
+        latency = sorted(successes)
+        p95 = _percentile(latency, 0.95) if latency else None
+        if not ok:
+            status = "offline" if self.consecutive_failures >= OFFLINE_AFTER_FAILURES or availability < 0.5 else "degraded"
+        elif availability < 0.9 or (p95 is not None and p95 >= self.slow_seconds):
+            status = "degraded"
+        else:
+            status = "operational"
+        snapshot = {
+            "status": status,
+            "response_time_ms": round(elapsed * 1000, 1),
+            "availability": round(availability, 3),
+            "latency_ms": {
+                "p50": round(_percentile(latency, 0.5) * 1000, 1),
+                "p95": round(p95 * 1000, 1),
+                "p99": round(_percentile(latency, 0.99) * 1000, 1)
+            } if latency else None,
+            "samples": len(self.results),
+            "interval_s": self.interval,
+            "last_checked": datetime.now().isoformat()
+        }
+        if status_code is not None:
+            snapshot["http_status"] = status_code
+        if error is not None:
+            snapshot["error"] = error
+        return snapshot
+
+class UpstreamProber:
+    """Runs registered probes on a daemon thread; status() only reads the latest snapshots"""
+
+    def __init__(self):
+        self.targets: Dict[str, ProbeTarget] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register(
+        self,
+        name: str,
+        service: str,
+        check: Callable[[float], int],
+        interval: float,
+        timeout: float = UPSTREAM_PROBE_TIMEOUT,
+        slow_seconds: Optional[float] = None,
+        budget: Optional[Callable[[], bool]] = None
+    ):
+        """
+        check(timeout) makes one request and returns its HTTP status; exceptions count as failures
+        budget(), if given, is asked before each probe; False skips it (e.g. a metered API running low)
+        """
+        self.targets[name] = ProbeTarget(name, service, check, interval, timeout, slow_seconds or timeout / 2, budget)
+
+    def start(self):
+        """Start probing in the background (no-op if disabled or already started)"""
+        if not UPSTREAM_PROBE_ENABLED or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="upstream-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            for target in list(self.targets.values()):
+                if time.monotonic() >= target.next_due:
+                    target.probe()
+                    target.next_due = time.monotonic() + target.interval
+                    if target.snapshot["status"] != "operational":
+                        logger.warning(f"Upstream {target.name} is {target.snapshot['status']}: {target.snapshot.get('error', 'slow')}")
+                if self._stop.is_set():
+                    return
+            next_due = min((t.next_due for t in self.targets.values()), default=time.monotonic() + 1)
+            self._stop.wait(max(0.1, next_due - time.monotonic()))
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: target.snapshot for name, target in self.targets.items()}
+
+upstream_prober = UpstreamProber()
+
+UPSTREAM_AVAILABILITY = CallbackGauge(
+    "upstream_probe_availability", "Share of recent background probes that succeeded", ("upstream",),
+    lambda: {(name,): t.snapshot["availability"] for name, t in upstream_prober.targets.items() if "availability" in t.snapshot}
+)
+UPSTREAM_PROBE_P95 = CallbackGauge(
+    "upstream_probe_latency_p95_seconds", "95th percentile latency of recent successful probes", ("upstream",),
+    lambda: {
+        (name,): t.snapshot["latency_ms"]["p95"] / 1000
+        for name, t in upstream_prober.targets.items() if t.snapshot.get("latency_ms")
+    }
+)
@@ -0,0 +1,73 @@
+"""
+Background Warmup
+Deferred startup work that runs after the server is accepting connections
+
+Expensive initialization (model loading, heavy imports, index building) is
+registered as named tasks and executed on a background thread, so the port
+binds immediately. Readiness reports each task's state and duration, letting
+health checks distinguish "live" (process serving) from "warm" (all tasks done).
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+    """Ordered warmup tasks run once on a daemon thread"""
+
+    def __init__(self):
+        self.tasks: List[Tuple[str, Callable[[], Any]]] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+        self._done = threading.Event()
+
+    def register(self, name: str, task: Callable[[], Any]):
+        self.tasks.append((name, task))
+        self.results[name] = {"state": "pending"}
+
+    def start(self):
+        """Run all registered tasks in the background (no-op if already started)"""
+        if self._thread is not None:
+            return
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self.run, name="startup-warmup", daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Run all tasks in the calling thread; a failing task does not stop the rest"""
+        self.started_at = self.started_at or time.monotonic()
+        for name, task in self.tasks:
+            self.results[name] = {"state": "running"}
+            start = time.perf_counter()
+            try:
+                task()
+                self.results[name] = {"state": "done"}
+            except Exception as e:
+                logger.error(f"Warmup task {name} failed: {e}")
+                self.results[name] = {"state": "failed", "error": str(e)}
+            self.results[name]["seconds"] = round(time.perf_counter() - start, 3)
+        self.finished_at = time.monotonic()
+        self._done.set()
+        states = ', '.join(f"{name}={result['state']}" for name, result in self.results.items())
+        logger.info(f"Warmup finished: {states}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "seconds": round(self.finished_at - self.started_at, 3) if self.finished_at and self.started_at else None,
+            "tasks": {name: dict(result) for name, result in self.results.items()}
+        }
+
+warmup = Warmup()
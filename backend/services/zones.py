@@ -0,0 +1,259 @@
+"""
+Hazard Zone Registry
+Shared lookup of seismic and regional hazard zones behind a uniform grid index
+
+Zones are lat/lon boxes or GeoJSON polygons tagged with a category (seismic,
+pacific_ring, tornado_alley, ...) and arbitrary properties such as a risk
+weight. Each zone is registered in every grid cell its bounding box touches,
+so a query only tests the zones sharing a cell with each point. Batch queries
+take coordinate arrays and return (point, zone) hit pairs.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Grid index cell size in degrees
+DEFAULT_CELL_SIZE = 1.0
+# Upper bound on the point x edge matrix tested per polygon chunk
+POLYGON_CHUNK_ELEMENTS = 4_000_000
+
+# Optional GeoJSON FeatureCollection of extra zones loaded into the shared registry
+ZONES_GEOJSON_PATH = os.getenv("HAZARD_ZONES_GEOJSON")
+
+# Built-in zones: (category, name, lat_range, lon_range, inclusive bounds, properties)
+BUILTIN_ZONES = [
+    # Known high-risk seismic zones (simplified)
+    ('seismic', 'california', (32, 42), (-125, -114), True, {'risk': 0.4}),
+    ('seismic', 'japan', (35, 45), (135, 145), True, {'risk': 0.5}),
+    ('seismic', 'new_zealand', (-45, -35), (165, 180), True, {'risk': 0.3}),
+    ('seismic', 'turkey_greece', (36, 42), (25, 35), True, {'risk': 0.25}),
+    # Tectonic plate boundaries used by the synthetic training data (simplified)
+    ('pacific_ring', 'alaska_aleutians', (30, 60), (-180, -120), False, {}),
+    ('pacific_ring', 'japan_philippines', (10, 40), (120, 150), False, {}),
+    ('pacific_ring', 'chile_peru', (-40, -10), (-80, -60), False, {}),
+    ('mediterranean_himalayan', 'mediterranean_himalayan_belt', (20, 45), (-10, 70), False, {}),
+    # Storm regions used by the synthetic training data
+    ('tropical_cyclone', 'tropics', (-30, 30), (-181, 181), False, {}),  # every longitude
+    ('tornado_alley', 'us_great_plains', (30, 45), (-110, -90), False, {}),
+]
+
+class ZoneRegistry:
+    """Box and polygon hazard zones with grid-indexed point and batch queries"""
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.rows = int(np.ceil(180 / cell_size))
+        self.cols = int(np.ceil(360 / cell_size))
+        self.zones: List[Dict[str, Any]] = []
+        # Per-zone (min_lat, max_lat, min_lon, max_lon), inclusive flag and polygon edges (None for boxes)
+        self._bounds: List[Tuple[float, float, float, float]] = []
+        self._inclusive: List[bool] = []
+        self._edges: List[Optional[np.ndarray]] = []
+        self._index = None
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def add_box(self, category: str, name: str, lat_range: Tuple[float, float], lon_range: Tuple[float, float],
+                inclusive: bool = True, **properties) -> int:
+        """Register a lat/lon box; inclusive controls whether points on the edge are inside"""
+        bounds = (lat_range[0], lat_range[1], lon_range[0], lon_range[1])
+        return self._add(category, name, bounds, inclusive, None, properties)
+
+    def add_polygon(self, category: str, name: str, rings: List[List[List[float]]], **properties) -> int:
+        """
+        Register a polygon from GeoJSON-style rings of [lon, lat] positions
+        Rings are combined with the even-odd rule, so holes and multi-part
+        polygons can be passed as extra rings.
+        """
+        edges = []
+        for ring in rings:
+            ring = np.asarray(ring, dtype=np.float64)[:, :2]
+            if len(ring) < 3:
+                continue
+            # Close the ring and turn it into (lon1, lat1, lon2, lat2) edges
+            closed = np.vstack([ring, ring[:1]]) if not np.array_equal(ring[0], ring[-1]) else ring
+            edges.append(np.hstack([closed[:-1], closed[1:]]))
+        if not edges:
+            raise ValueError(f"Zone '{name}' has no valid rings")
+        edges = np.vstack(edges)
+        bounds = (
+            float(min(edges[:, 1].min(), edges[:, 3].min())), float(max(edges[:, 1].max(), edges[:, 3].max())),
+            float(min(edges[:, 0].min(), edges[:, 2].min())), float(max(edges[:, 0].max(), edges[:, 2].max()))
+        )
+        return self._add(category, name, bounds, True, edges, properties)
+
+    def _add(self, category: str, name: str, bounds, inclusive: bool, edges, properties: Dict[str, Any]) -> int:
+        self.zones.append({'name': name, 'category': category, **properties})
+        self._bounds.append(bounds)
+        self._inclusive.append(inclusive)
+        self._edges.append(edges)
+        self._index = None
+        return len(self.zones) - 1
+
+    def load_geojson(self, path: str, default_category: str = 'seismic') -> int:
+        """
+        Load Polygon/MultiPolygon features from a GeoJSON FeatureCollection
+        Feature properties become zone properties; 'category' and 'name' are
+        taken from them when present. Returns the number of zones added.
+        """
+        with open(path, 'r') as f:
+            collection = json.load(f)
+
+        added = 0
+        for i, feature in enumerate(collection.get('features', [])):
+            geometry = feature.get('geometry') or {}
+            properties = dict(feature.get('properties') or {})
+            category = properties.pop('category', default_category)
+            name = properties.pop('name', f"{os.path.basename(path)}#{i}")
+            if geometry.get('type') == 'Polygon':
+                rings = geometry['coordinates']
+            elif geometry.get('type') == 'MultiPolygon':
+                rings = [ring for polygon in geometry['coordinates'] for ring in polygon]
+            else:
+                logger.warning(f"Skipping zone '{name}': unsupported geometry {geometry.get('type')}")
+                continue
+            self.add_polygon(category, name, rings, **properties)
+            added += 1
+
+        logger.info(f"Loaded {added} hazard zones from {path}")
+        return added
+
+    def _cells(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        row = np.clip(((lat + 90) // self.cell_size).astype(np.intp), 0, self.rows - 1)
+        col = np.clip(((lon + 180) // self.cell_size).astype(np.intp), 0, self.cols - 1)
+        return row * self.cols + col
+
+    def _build_index(self):
+        """CSR table of zone ids per grid cell, covering each zone's bounding box"""
+        cells, zone_ids = [], []
+        for zone_id, (min_lat, max_lat, min_lon, max_lon) in enumerate(self._bounds):
+            first = self._cells(np.array([min_lat, max_lat]), np.array([min_lon, max_lon]))
+            row0, col0 = divmod(int(first[0]), self.cols)
+            row1, col1 = divmod(int(first[1]), self.cols)
+            rows, cols = np.meshgrid(np.arange(row0, row1 + 1), np.arange(col0, col1 + 1), indexing='ij')
+            covered = (rows * self.cols + cols).ravel()
+            cells.append(covered)
+            zone_ids.append(np.full(len(covered), zone_id, dtype=np.intp))
+
+        cells = np.concatenate(cells) if cells else np.empty(0, dtype=np.intp)
+        zone_ids = np.concatenate(zone_ids) if zone_ids else np.empty(0, dtype=np.intp)
+        order = np.argsort(cells, kind='stable')
+        self._index = {
+            'start': np.searchsorted(cells[order], np.arange(self.rows * self.cols + 1)),
+            'zones': zone_ids[order],
+            'bounds': np.array(self._bounds, dtype=np.float64).reshape(-1, 4),
+            'inclusive': np.array(self._inclusive, dtype=bool),
+            'polygon': np.array([edges is not None for edges in self._edges], dtype=bool),
+            'categories': np.array([zone['category'] for zone in self.zones], dtype=object)
+        }
+
+    def query(self, lat, lon, category: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        All (point index, zone id) pairs where a point lies inside a zone
+        lat and lon are scalars or equal-length arrays; category restricts the
+        zones considered.
+        """
+        if self._index is None:
+            self._build_index()
+        index = self._index
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+
+        # Expand every point into (point, candidate zone) pairs from its grid cell
+        cells = self._cells(lat, lon)
+        starts = index['start'][cells]
+        counts = index['start'][cells + 1] - starts
+        points = np.repeat(np.arange(len(lat)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        zones = index['zones'][np.repeat(starts, counts) + offsets]
+
+        if category is not None:
+            keep = index['categories'][zones] == category
+            points, zones = points[keep], zones[keep]
+
+        # Bounding-box test (exact for box zones)
+        bounds = index['bounds'][zones]
+        p_lat, p_lon = lat[points], lon[points]
+        inclusive = index['inclusive'][zones]
+        inside = np.where(
+            inclusive,
+            (bounds[:, 0] <= p_lat) & (p_lat <= bounds[:, 1]) & (bounds[:, 2] <= p_lon) & (p_lon <= bounds[:, 3]),
+            (bounds[:, 0] < p_lat) & (p_lat < bounds[:, 1]) & (bounds[:, 2] < p_lon) & (p_lon < bounds[:, 3])
+        )
+        points, zones = points[inside], zones[inside]
+
+        # Polygon zones: even-odd ray casting, grouped by zone
+        polygon_pairs = index['polygon'][zones]
+        if polygon_pairs.any():
+            keep = ~polygon_pairs
+            for zone_id in np.unique(zones[polygon_pairs]):
+                pair_ids = np.flatnonzero(polygon_pairs & (zones == zone_id))
+                keep[pair_ids] = self._in_polygon(self._edges[zone_id], lat[points[pair_ids]], lon[points[pair_ids]])
+            points, zones = points[keep], zones[keep]
+
+        return points, zones
+
+    @staticmethod
+    def _in_polygon(edges: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        inside = np.empty(len(lat), dtype=bool)
+        chunk = max(1, POLYGON_CHUNK_ELEMENTS // len(edges))
+        x1, y1, x2, y2 = edges.T
+        for start in range(0, len(lat), chunk):
+            py = lat[start:start + chunk, None]
+            px = lon[start:start + chunk, None]
+            straddles = (y1 > py) != (y2 > py)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                crossing_x = (x2 - x1) * (py - y1) / (y2 - y1) + x1
+            inside[start:start + chunk] = np.count_nonzero(straddles & (px < crossing_x), axis=1) % 2 == 1
+        return inside
+
+    def contains(self, lat, lon, category: Optional[str] = None) -> np.ndarray:
+        """Boolean array: whether each point lies in any zone (of the category)"""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        points, _ = self.query(lat, lon, category)
+        result = np.zeros(len(lat), dtype=bool)
+        result[points] = True
+        return result
+
+    def max_property(self, lat, lon, key: str, default: float, category: Optional[str] = None) -> np.ndarray:
+        """Largest numeric property among the zones containing each point, at least default"""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        points, zones = self.query(lat, lon, category)
+        cache_key = ('property', key, default)
+        if cache_key not in self._index:
+            self._index[cache_key] = np.array([float(zone.get(key, default)) for zone in self.zones])
+        values = self._index[cache_key]
+        result = np.full(len(lat), default, dtype=np.float64)
+        np.maximum.at(result, points, values[zones])
+        return result
+
+    def zones_at(self, lat: float, lon: float, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Properties of every zone containing a single point"""
+        _, zones = self.query(lat, lon, category)
+        return [self.zones[z] for z in zones]
+
+def _default_registry() -> ZoneRegistry:
+    registry = ZoneRegistry()
+    for category, name, lat_range, lon_range, inclusive, properties in BUILTIN_ZONES:
+        registry.add_box(category, name, lat_range, lon_range, inclusive, **properties)
+    if ZONES_GEOJSON_PATH:
+        try:
+            registry.load_geojson(ZONES_GEOJSON_PATH)
+        except Exception as e:
+            logger.error(f"Failed to load hazard zones from {ZONES_GEOJSON_PATH}: {e}")
+    return registry
+
+_registry: Optional[ZoneRegistry] = None
+
+def get_zone_registry() -> ZoneRegistry:
+    """Shared registry with the built-in zones plus any zones from HAZARD_ZONES_GEOJSON"""
+    global _registry
+    if _registry is None:
+        _registry = _default_registry()
+    return _registry
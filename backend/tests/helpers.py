@@ -0,0 +1,15 @@
+"""
+Shared test helpers
+"""
+
+class FakeClock:
+    """Callable clock for components that take `clock`; time only moves when a test advances it"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
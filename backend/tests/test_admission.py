@@ -0,0 +1,80 @@
+"""
+Admission controller tests: priority wake-up, queue limits and queue timeouts
+"""
+
+import asyncio
+import unittest
+
+from services.admission import AdmissionController, RouteClass
+
+class AdmissionControllerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.urgent = RouteClass("urgent", 0, 1, queue_size=2, queue_timeout=1.0, rules=[(None, "/predict")])
+        self.bulk = RouteClass("bulk", 1, 2, queue_size=1, queue_timeout=0.05)
+        self.controller = AdmissionController([self.urgent, self.bulk], max_concurrency=2)
+
+    async def queue(self, route_class: RouteClass) -> asyncio.Task:
+        task = asyncio.create_task(self.controller.acquire(route_class))
+        await asyncio.sleep(0)  # Let it reach the queue
+        self.assertFalse(task.done())
+        return task
+
+    async def test_admits_until_the_limit_then_queues_then_rejects(self):
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        waiting = await self.queue(self.bulk)
+        self.assertFalse(await self.controller.acquire(self.bulk))  # Queue of 1 is full
+        self.controller.release(self.bulk)
+        self.assertTrue(await waiting)
+        self.assertEqual(self.controller.in_flight, 2)
+
+    async def test_release_wakes_the_highest_priority_first(self):
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        bulk_waiter = await self.queue(self.bulk)
+        urgent_waiter = await self.queue(self.urgent)
+        self.controller.release(self.bulk)
+        # The slot went to urgent, which queued later
+        self.assertEqual((self.urgent.in_flight, self.bulk.in_flight), (1, 1))
+        self.assertTrue(await urgent_waiter)
+        self.assertFalse(bulk_waiter.done())
+        self.controller.release(self.bulk)
+        self.assertTrue(await bulk_waiter)
+
+    async def test_free_slot_is_not_held_for_a_class_at_its_own_limit(self):
+        self.assertTrue(await self.controller.acquire(self.urgent))
+        urgent_waiter = await self.queue(self.urgent)
+        # urgent is at its limit of 1, so the second global slot goes to bulk right away
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        self.controller.release(self.urgent)
+        self.assertTrue(await urgent_waiter)
+
+    async def test_new_request_does_not_jump_a_queued_higher_class(self):
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        urgent_waiter = await self.queue(self.urgent)
+        self.controller.release(self.bulk)
+        self.assertTrue(await urgent_waiter)
+        self.assertFalse(await self.controller.acquire(self.bulk))  # Times out behind the full controller
+
+    async def test_queue_timeout_rejects_and_frees_the_place(self):
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        self.assertFalse(await self.controller.acquire(self.bulk))
+        self.assertEqual(self.controller.status()["classes"]["bulk"]["queued"], 0)
+        self.assertEqual(self.controller.in_flight, 2)
+
+    async def test_cancelled_waiter_is_skipped(self):
+        self.assertTrue(await self.controller.acquire(self.urgent))
+        self.assertTrue(await self.controller.acquire(self.bulk))
+        first = await self.queue(self.urgent)
+        second = await self.queue(self.urgent)
+        first.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+        self.controller.release(self.urgent)
+        self.assertTrue(await second)
+        self.assertEqual(self.urgent.in_flight, 1)
+
+if __name__ == "__main__":
+    unittest.main()
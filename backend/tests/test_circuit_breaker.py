@@ -0,0 +1,95 @@
+"""
+Circuit breaker state machine tests
+"""
+
+import unittest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from tests.helpers import FakeClock
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            "test", slow_call_seconds=1.0, window_seconds=10, min_calls=4,
+            failure_ratio=0.5, slow_ratio=0.5, open_seconds=5, max_open_seconds=12, clock=self.clock
+        )
+
+    def fail(self, times: int = 1):
+        for _ in range(times):
+            self.breaker.record(False, 0.1, error="HTTP 500")
+
+    def trip(self):
+        self.fail(4)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_stays_closed_below_min_calls(self):
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertFalse(self.breaker.before_call())
+
+    def test_opens_on_failure_ratio(self):
+        self.breaker.record(True, 0.1)
+        self.breaker.record(True, 0.1)
+        self.fail(2)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpen) as raised:
+            self.breaker.before_call()
+        self.assertAlmostEqual(raised.exception.retry_in, 5)
+        self.assertEqual(self.breaker.status()["last_failure"], "HTTP 500")
+
+    def test_opens_on_slow_successes(self):
+        for _ in range(4):
+            self.breaker.record(True, 1.5)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_failures_age_out_of_the_window(self):
+        self.fail(3)
+        self.clock.advance(11)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.status()["window_calls"], 1)
+
+    def test_half_open_lets_one_probe_through(self):
+        self.trip()
+        self.clock.advance(5)
+        self.assertTrue(self.breaker.before_call())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before_call()
+
+    def test_successful_probe_closes_and_clears_the_window(self):
+        self.trip()
+        self.clock.advance(5)
+        probe = self.breaker.before_call()
+        self.breaker.record(True, 0.1, probe=probe)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.status()["window_calls"], 0)
+        self.assertFalse(self.breaker.before_call())
+
+    def test_slow_probe_counts_as_failed(self):
+        self.trip()
+        self.clock.advance(5)
+        self.breaker.record(True, 1.5, probe=self.breaker.before_call())
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_failed_probe_backs_off_up_to_the_cap(self):
+        self.trip()
+        for expected in (10, 12, 12):
+            self.clock.advance(self.breaker.open_seconds)
+            self.breaker.record(False, 0.1, probe=self.breaker.before_call())
+            self.assertEqual(self.breaker.state, OPEN)
+            self.assertEqual(self.breaker.open_seconds, expected)
+        self.clock.advance(12)
+        self.breaker.record(True, 0.1, probe=self.breaker.before_call())
+        self.assertEqual(self.breaker.open_seconds, 5)
+
+    def test_released_probe_lets_another_caller_probe(self):
+        self.trip()
+        self.clock.advance(5)
+        self.assertTrue(self.breaker.before_call())
+        self.breaker.release_probe()
+        self.assertTrue(self.breaker.before_call())
+
+if __name__ == "__main__":
+    unittest.main()
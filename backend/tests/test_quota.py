@@ -0,0 +1,93 @@
+"""
+Upstream quota tests
+"""
+
+import unittest
+
+from services.quota import CACHE_TIERS, QuotaExhausted, QuotaWindow, UpstreamQuota
+from tests.helpers import FakeClock
+
+DAY = 86400.0
+
+class QuotaWindowTest(unittest.TestCase):
+    def test_roll_aligns_to_the_window_and_resets(self):
+        window = QuotaWindow("minute", 10, 60)
+        window.roll(1000 * 60 + 15)
+        self.assertEqual(window.start, 1000 * 60)
+        window.used = 4
+        window.roll(1000 * 60 + 59)
+        self.assertEqual(window.remaining, 6)
+        window.roll(1001 * 60)
+        self.assertEqual((window.start, window.used), (1001 * 60, 0))
+
+    def test_long_window_pressure_projects_the_current_rate(self):
+        window = QuotaWindow("day", 1000, DAY)
+        window.roll(100 * DAY)
+        window.used = 100
+        # A tenth of the budget in a tenth of the day is on pace to use all of it
+        self.assertAlmostEqual(window.pressure(100 * DAY + DAY / 10), 1.0)
+        self.assertAlmostEqual(window.pressure(100 * DAY + DAY / 2), 0.2)
+        # Within the first hour the elapsed share is floored at 1/24
+        self.assertAlmostEqual(window.pressure(100 * DAY + 60), 1.0)
+        window.used = 10
+        self.assertAlmostEqual(window.pressure(100 * DAY + 60), 0.24)
+
+class UpstreamQuotaTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(100 * DAY + 5)
+        self.quota = UpstreamQuota(
+            "test", [QuotaWindow("minute", 10, 60), QuotaWindow("day", 1000, DAY)], reserve=0.2, clock=self.clock
+        )
+
+    def note(self, key, times: int):
+        for _ in range(times):
+            self.quota.note_demand(key)
+
+    def test_exhausted_until_the_window_rolls(self):
+        for _ in range(10):
+            self.quota.acquire()
+        with self.assertRaises(QuotaExhausted):
+            self.quota.acquire()
+        self.assertEqual(self.quota.remaining(), {"minute": 0, "day": 990})
+        self.clock.advance(60)
+        self.quota.acquire()
+        self.assertEqual(self.quota.remaining(), {"minute": 9, "day": 989})
+
+    def test_reserve_goes_to_the_busiest_cells(self):
+        self.note("busy", 5)
+        self.note("warm", 3)
+        self.note("quiet", 1)
+        for _ in range(8):
+            self.quota.acquire("busy")
+        # Two calls left, both inside the reserve: only the two busiest cells can have them
+        with self.assertRaises(QuotaExhausted):
+            self.quota.acquire("quiet")
+        self.quota.acquire("busy")
+        with self.assertRaises(QuotaExhausted):
+            self.quota.acquire("warm")
+        self.quota.acquire("busy")
+        self.assertEqual(self.quota.remaining()["minute"], 0)
+
+    def test_demand_decays_every_minute(self):
+        self.note("old", 4)
+        self.clock.advance(61)
+        self.note("new", 1)
+        self.assertEqual(self.quota.demand, {"old": 2.0, "new": 0.5})
+
+    def test_spare_spending_stops_at_the_reserve(self):
+        spent = 0
+        while self.quota.spend_spare():
+            spent += 1
+        self.assertEqual(spent, 8)
+        # The reserve is left for user requests
+        self.assertEqual(self.quota.remaining()["minute"], 2)
+        self.quota.acquire()
+
+    def test_cache_policy_widens_with_pressure(self):
+        self.assertEqual(self.quota.cache_policy(), tuple(CACHE_TIERS[0][1:]))
+        for _ in range(9):
+            self.quota.acquire()
+        self.assertEqual(self.quota.cache_policy(), tuple(CACHE_TIERS[-1][1:]))
+
+if __name__ == "__main__":
+    unittest.main()
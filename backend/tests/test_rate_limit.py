@@ -0,0 +1,68 @@
+"""
+Rate limiter token bucket tests
+"""
+
+import unittest
+
+from services.rate_limit import RateLimiter, RateRule, parse_rate_limits
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        # 1 token/s, burst 3; a single shard so one sweep covers every bucket
+        self.rule = RateRule("/weather", 60, 60, burst=3)
+        self.limiter = RateLimiter([self.rule, RateRule("", 600, 60)], shards=1)
+        # Sweeps are scheduled on the real clock; only test_take_compacts_on_its_interval wants one
+        self.limiter._next_compaction = float("inf")
+
+    def test_burst_then_limited(self):
+        results = [self.limiter.take("a", self.rule, now=0.0) for _ in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertEqual(results[-1][1], 0)
+
+    def test_tokens_refill_at_the_rate_up_to_the_burst(self):
+        for _ in range(3):
+            self.limiter.take("a", self.rule, now=0.0)
+        allowed, tokens = self.limiter.take("a", self.rule, now=1.5)
+        self.assertTrue(allowed)
+        self.assertAlmostEqual(tokens, 0.5)
+        allowed, tokens = self.limiter.take("a", self.rule, now=100.0)
+        self.assertAlmostEqual(tokens, 2)
+
+    def test_clients_have_separate_buckets(self):
+        for _ in range(3):
+            self.limiter.take("a", self.rule, now=0.0)
+        self.assertFalse(self.limiter.take("a", self.rule, now=0.0)[0])
+        self.assertTrue(self.limiter.take("b", self.rule, now=0.0)[0])
+
+    def test_compaction_drops_only_refilled_buckets(self):
+        self.limiter.take("a", self.rule, now=0.0)
+        self.limiter.take("b", self.rule, now=2.0)
+        # The bucket of "a" is full again once a whole window (3 s) has passed
+        self.assertEqual(self.limiter.compact_shard(now=2.9), 0)
+        self.assertEqual(self.limiter.compact_shard(now=3.0), 1)
+        self.assertEqual(self.limiter.entries(), 1)
+        # A dropped client starts over with a full bucket, as it would have anyway
+        self.assertAlmostEqual(self.limiter.take("a", self.rule, now=3.0)[1], 2)
+
+    def test_take_compacts_on_its_interval(self):
+        self.limiter.take("a", self.rule, now=0.0)
+        self.limiter._next_compaction = 10.0
+        self.limiter.take("b", self.rule, now=9.0)
+        self.assertEqual(self.limiter.entries(), 2)
+        self.limiter.take("b", self.rule, now=10.0)
+        self.assertEqual(self.limiter.entries(), 1)
+        self.assertEqual(self.limiter._next_compaction, 11.0)
+
+    def test_rule_for_uses_the_longest_prefix_without_api(self):
+        self.assertIs(self.limiter.rule_for("/api/weather/1/2"), self.rule)
+        self.assertEqual(self.limiter.rule_for("/predict/disaster").name, "default")
+        self.assertIsNone(self.limiter.rule_for("/api/health"))
+
+    def test_parse_rate_limits(self):
+        rule, = parse_rate_limits("/weather=30/min:10")
+        self.assertEqual((rule.prefix, rule.rate, rule.burst), ("/weather", 0.5, 10))
+        with self.assertRaises(ValueError):
+            parse_rate_limits("/weather=30/week")
+
+if __name__ == "__main__":
+    unittest.main()